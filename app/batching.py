@@ -0,0 +1,94 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Deque, List, Optional, Sequence, Tuple
+
+from app.logger import logger
+
+
+class OrderedBatches:
+    """
+    Runs a function over batches of items in an executor, delivering results in submission order.
+
+    Items are collected until batch_size of them are waiting or batch_delay has passed, then the
+    batch is handed to `function` in one executor call, so a process pool pays the pickling
+    overhead once per batch. Up to max_in_flight batches run at once. on_results is called on the
+    event loop once per batch, oldest first, with its items, their contexts and their results,
+    or None for every item of a batch whose call failed.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        function: Callable[[Sequence[Any]], List[Any]],
+        on_results: Callable[[List[Any], List[Any], List[Any]], None],
+        batch_size: int,
+        batch_delay: float,
+        max_in_flight: int,
+    ):
+        self.executor = executor
+        self.function = function
+        self.on_results = on_results
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_in_flight = max_in_flight
+        self.items: List[Any] = []
+        self.contexts: List[Any] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.in_flight: Deque[Tuple[asyncio.Future, List[Any], List[Any]]] = deque()
+
+    def __len__(self) -> int:
+        """Items submitted and not yet delivered."""
+        return len(self.items) + sum(len(contexts) for _, _, contexts in self.in_flight)
+
+    async def submit(self, item: Any, context: Any):
+        self.items.append(item)
+        self.contexts.append(context)
+        if len(self.items) >= self.batch_size:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.batch_delay, self.flush_later)
+
+    def flush_later(self):
+        self.timer = None
+        asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """Send the waiting items to the executor, waiting while too many batches are in flight."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while len(self.in_flight) >= self.max_in_flight:
+            await asyncio.wait([self.in_flight[0][0]])
+        if not self.items:
+            return
+        # Taking the batch and queueing it without an await in between keeps batches in order
+        items, contexts = self.items, self.contexts
+        self.items, self.contexts = [], []
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.function, items)
+        self.in_flight.append((future, items, contexts))
+        future.add_done_callback(self.deliver)
+
+    def deliver(self, _: asyncio.Future):
+        while self.in_flight and self.in_flight[0][0].done():
+            future, items, contexts = self.in_flight.popleft()
+            if future.cancelled() or future.exception() is not None:
+                logger.error(f"Batch of {len(contexts)} failed: {future!r}")
+                results = [None] * len(contexts)
+            else:
+                results = future.result()
+            self.on_results(items, contexts, results)
+
+    async def drain(self):
+        """Run everything submitted so far and wait for it to be delivered."""
+        await self.flush()
+        while self.in_flight:
+            await asyncio.wait([future for future, _, _ in self.in_flight])
+            # Let the done callbacks deliver
+            await asyncio.sleep(0)
+
+    def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.executor.shutdown(cancel_futures=True)
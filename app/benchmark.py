@@ -0,0 +1,654 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pyln.proto.primitives import PrivateKey
+from pyln.proto.wire import connect
+
+from app.capture import INBOUND, CaptureWriter
+from app.corpus import (
+    channel_updates,
+    message_samples,
+    signed_channel,
+    synthetic_gossip,
+    synthetic_messages,
+)
+from app.dedup import GossipDeduplicator
+from app.gossip_server import GossipServer
+from app.gossip_store import GossipStore
+from app.gossip_sync import GossipSync
+from app.graph import NetworkGraph
+from app.handlers import HandlerRegistry
+from app.logger import logger
+from app.message_decoder import MESSAGE_MAP, MessageDecoder
+from app.message_elements import (
+    ENCODING_ZLIB,
+    QUERY_OPTION_CHECKSUMS,
+    QUERY_OPTION_TIMESTAMPS,
+    RemainderElement,
+)
+from app.messages import (
+    ChannelAnnouncementMessage,
+    ChannelUpdateMessage,
+    Message,
+    MessageProperty,
+    PingMessage,
+    PongMessage,
+    QueryChannelRangeMessage,
+    QueryShortChannelIDsMessage,
+    ReplyChannelRangeMessage,
+    ReplyShortChannelIDsMessage,
+)
+from app.pipeline import DecodePipeline
+from app.replay import replay
+from app.transport import AsyncLightningConnection
+from app.verify import GossipVerifier
+
+EXAMPLES_PATH = "data/examples"
+STREAM_CHUNK = 100_000
+# Short channel ids per reply_channel_range in --range-sync, with timestamps and checksums
+REPLY_IDS = 2000
+
+
+def load_examples(path: str = EXAMPLES_PATH) -> List[bytes]:
+    with open(path, "r") as f:
+        return [bytes.fromhex(line) for line in f if line.strip()]
+
+
+def decode_by_slicing(data: bytes) -> Message:
+    """Decode through the chained SerializedElement.from_bytes API, which slices per field."""
+    message_class = MESSAGE_MAP.get(int.from_bytes(data[:2], byteorder="big"), Message)
+    properties = {}
+    chunked = data
+    for key, feature in message_class.features():
+        properties[key], chunked = feature.from_bytes(chunked)
+    if chunked:
+        properties[MessageProperty.REMAINDER] = RemainderElement.from_bytes(chunked)[0]
+    type_element = properties[MessageProperty.TYPE]
+    return message_class(type_element.id, type_element.name, properties)
+
+
+def measure(function: Callable[[Any], Any], data: Any, rounds: int) -> Tuple[float, int]:
+    """Returns (seconds per call, peak bytes allocated by one call)."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function(data)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    function(data)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run(rounds: int):
+    decoders = {
+        "slicing": decode_by_slicing,
+        "compiled": MessageDecoder.from_bytes,
+        "lazy": lambda data: MessageDecoder.from_bytes(data, lazy=True),
+    }
+    samples = [("example", data) for data in load_examples()]
+    samples += [("synthetic", data) for data in synthetic_messages()]
+    print(
+        f"{'source':<10} {'type':<24} {'bytes':>6} {'decoder':<11} {'us/decode':>10} {'peak B':>8}"
+    )
+    for source, data in samples:
+        name = MessageDecoder.from_bytes(data).name
+        for decoder_name, decode in decoders.items():
+            elapsed, peak = measure(decode, data, rounds)
+            print(
+                f"{source:<10} {name:<24} {len(data):>6} {decoder_name:<11} "
+                f"{elapsed * 1e6:>10.2f} {peak:>8}"
+            )
+
+
+def environment() -> Dict[str, Any]:
+    """What the results were measured on, to tell runs apart when comparing them."""
+    try:
+        package_version = version("lmppy")
+    except PackageNotFoundError:
+        package_version = None
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "version": package_version,
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+
+
+def result(benchmark: str, sample: str, size: int, count: int, elapsed: float, peak: int):
+    return {
+        "benchmark": benchmark,
+        "sample": sample,
+        "bytes": size,
+        "count": count,
+        "seconds_per_op": elapsed / count,
+        "ops_per_second": count / elapsed,
+        "mb_per_second": size * count / elapsed / 1e6,
+        "peak_bytes": peak,
+    }
+
+
+def decode_stream(count: int, seed: int) -> Tuple[float, int, int]:
+    """Decode `count` distinct channel_updates, returns (seconds, total bytes, peak bytes)."""
+    elapsed = 0.0
+    size = 0
+    updates = channel_updates(count, seed)
+    # Generated in chunks so millions of frames never need to be in memory at once
+    while chunk := list(islice(updates, STREAM_CHUNK)):
+        size += sum(len(frame) for frame in chunk)
+        start = time.perf_counter()
+        for frame in chunk:
+            MessageDecoder.from_bytes(frame)
+        elapsed += time.perf_counter() - start
+    _, peak = measure(MessageDecoder.from_bytes, next(channel_updates(1, seed)), 1)
+    return elapsed, size, peak
+
+
+def run_suite(rounds: int, updates: int, seed: int, json_path: Optional[str]):
+    """Decode and encode throughput and allocations for every message class."""
+    results = []
+    for sample, frame in message_samples(seed):
+        decoded = MessageDecoder.from_bytes(frame)
+        operations = {
+            "decode": (MessageDecoder.from_bytes, frame),
+            "decode_lazy": (lambda data: MessageDecoder.from_bytes(data, lazy=True), frame),
+            "encode": (Message.to_bytes, decoded),
+        }
+        for benchmark, (function, data) in operations.items():
+            elapsed, peak = measure(function, data, rounds)
+            results.append(result(benchmark, sample, len(frame), 1, elapsed, peak))
+    if updates:
+        elapsed, size, peak = decode_stream(updates, seed)
+        results.append(
+            result("decode_stream", "channel_update", size // updates, updates, elapsed, peak)
+        )
+
+    report = {"environment": environment(), "rounds": rounds, "seed": seed, "results": results}
+    if json_path == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    print(f"{'benchmark':<14} {'sample':<26} {'bytes':>6} {'ops/s':>12} {'MB/s':>8} {'peak B':>8}")
+    for r in results:
+        print(
+            f"{r['benchmark']:<14} {r['sample']:<26} {r['bytes']:>6} "
+            f"{r['ops_per_second']:>12.0f} {r['mb_per_second']:>8.1f} {r['peak_bytes']:>8}"
+        )
+
+
+async def transport_round_trips(rounds: int) -> Dict[str, float]:
+    """Seconds per ping/pong round trip over loopback, for a thread hop per frame vs asyncio."""
+    server_key, client_key = PrivateKey(os.urandom(32)), PrivateKey(os.urandom(32))
+
+    async def echo(reader, writer):
+        conn = await AsyncLightningConnection.accept(reader, writer, server_key)
+        try:
+            while True:
+                await conn.send_message(await conn.read_message())
+        except asyncio.IncompleteReadError:
+            await conn.close()
+
+    server = await asyncio.start_server(echo, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    ping = PingMessage.create(10, b"\xaa").to_bytes()
+    results = {}
+
+    lc = await asyncio.to_thread(connect, client_key, server_key.public_key(), "127.0.0.1", port)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.to_thread(lc.send_message, ping)
+        await asyncio.to_thread(lc.read_message)
+    results["to_thread"] = (time.perf_counter() - start) / rounds
+    lc.connection.close()
+
+    conn = await AsyncLightningConnection.connect(
+        client_key, server_key.public_key(), "127.0.0.1", port
+    )
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await conn.send_message(ping)
+        await conn.read_message()
+    results["asyncio"] = (time.perf_counter() - start) / rounds
+    await conn.close()
+
+    server.close()
+    return results
+
+
+BURST_MESSAGES = 64 * 256
+
+
+async def transport_bursts(count: int, burst: int = 64) -> Dict[str, float]:
+    """Outbound messages per second for bursts of pongs, one write per message vs per burst."""
+    server_key, client_key = PrivateKey(os.urandom(32)), PrivateKey(os.urandom(32))
+    received = asyncio.Queue()
+
+    async def sink(reader, writer):
+        conn = await AsyncLightningConnection.accept(reader, writer, server_key)
+        try:
+            while True:
+                for _ in range(count):
+                    await conn.read_message()
+                received.put_nowait(None)
+        except asyncio.IncompleteReadError:
+            await conn.close()
+
+    server = await asyncio.start_server(sink, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    pong = PongMessage.create_from_ping(PingMessage.create(1000, b"\xaa"))
+    conn = await AsyncLightningConnection.connect(
+        client_key, server_key.public_key(), "127.0.0.1", port
+    )
+    results = {}
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await conn.send_message(pong.to_bytes())
+    await received.get()
+    results["per_message"] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(0, count, burst):
+        await conn.send_messages([pong.to_bytes() for _ in range(burst)])
+    await received.get()
+    results["coalesced"] = count / (time.perf_counter() - start)
+
+    await conn.close()
+    server.close()
+    return results
+
+
+def run_transport(rounds: int):
+    print(f"{'transport':<10} {'us/round trip':>14}")
+    for name, elapsed in asyncio.run(transport_round_trips(rounds)).items():
+        print(f"{name:<10} {elapsed * 1e6:>14.2f}")
+    print(f"{'writes':<12} {'messages/s':>12}")
+    for name, rate in asyncio.run(transport_bursts(BURST_MESSAGES)).items():
+        print(f"{name:<12} {rate:>12.0f}")
+
+
+def run_graph(num_channels: int, num_nodes: int, gossip_store: Optional[str]):
+    if gossip_store:
+        store = GossipStore(gossip_store)
+        frames = [record.frame for record in store]
+        store.close()
+    else:
+        frames = synthetic_gossip(num_channels, num_nodes)
+
+    def load() -> NetworkGraph:
+        graph = NetworkGraph()
+        for frame in frames:
+            graph.ingest(MessageDecoder.from_bytes(frame, lazy=True))
+        return graph
+
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    graph = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    directions = 2 * len(graph)
+    print(f"frames: {len(frames)}, channels: {len(graph)}, nodes: {graph.num_nodes}")
+    print(f"load: {elapsed:.2f}s, {len(frames) / elapsed:.0f} frames/s")
+    print(f"memory: {size / 1e6:.1f} MB, {size / max(directions, 1):.0f} bytes per direction")
+
+
+def run_dedup(num_channels: int, num_nodes: int, copies: int):
+    """Decode gossip that arrives `copies` times, with and without the duplicate filter."""
+    frames = synthetic_gossip(num_channels, num_nodes) * copies
+    random.Random(0).shuffle(frames)
+
+    start = time.perf_counter()
+    for frame in frames:
+        MessageDecoder.from_bytes(frame)
+    plain = time.perf_counter() - start
+
+    dedup = GossipDeduplicator()
+    start = time.perf_counter()
+    for frame in frames:
+        if not dedup.is_duplicate(frame):
+            MessageDecoder.from_bytes(frame)
+    filtered = time.perf_counter() - start
+
+    unique = len(frames) // copies
+    print(f"frames: {len(frames)}, unique: {unique}, copies: {copies}")
+    print(f"decode all:   {plain:.2f}s, {plain / unique * 1e6:.2f} us per unique frame")
+    print(f"dedup+decode: {filtered:.2f}s, {filtered / unique * 1e6:.2f} us per unique frame")
+
+
+def run_verify(num_channels: int, max_workers: int):
+    """Verify signed gossip through a GossipVerifier with 1 to max_workers processes."""
+    rng = random.Random(num_channels)
+    nodes = [rng.randbytes(32) for _ in range(max(num_channels // 5, 2))]
+    frames = []
+    for i in range(num_channels):
+        keys = rng.sample(nodes, 2) + [rng.randbytes(32), rng.randbytes(32)]
+        frames += signed_channel((500_000 + i) << 40, keys, 1_700_000_000)
+    messages = [MessageDecoder.from_bytes(frame, lazy=True) for frame in frames]
+
+    async def verify(workers: int) -> float:
+        graph = NetworkGraph()
+        verifier = GossipVerifier(graph.nodes_of, ProcessPoolExecutor(workers))
+        start = time.perf_counter()
+        for message, frame in zip(messages, frames):
+            await verifier.submit(message, frame, graph.ingest)
+        await verifier.drain()
+        elapsed = time.perf_counter() - start
+        verifier.close()
+        assert verifier.verified == len(frames)
+        return elapsed
+
+    print(f"frames: {len(frames)}, signatures: {num_channels * 6}")
+    for workers in range(1, max_workers + 1):
+        elapsed = asyncio.run(verify(workers))
+        print(f"workers: {workers:>2}, {elapsed:.2f}s, {len(frames) / elapsed:.0f} frames/s")
+
+
+def run_pipeline(
+    num_channels: int, num_nodes: int, max_workers: int, capture: Optional[str] = None
+):
+    """
+    Replay a capture through PeerConnection into a graph (see app.replay), decoding on the loop
+    and then in 1 to max_workers processes. Without a capture, synthetic gossip from 8 peers is
+    captured first.
+
+    Besides throughput, the CPU time the event loop itself spends per frame is reported: the
+    loop submits, delivers and applies every frame, so however many workers decode, throughput
+    can not exceed one frame per that much loop time.
+    """
+    # Per message info logs would dominate what is measured
+    logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        if capture is None:
+            capture = os.path.join(directory, "gossip.capture")
+            peers = [PrivateKey(bytes([i + 1]) * 32).public_key().to_bytes() for i in range(8)]
+            with CaptureWriter(capture) as writer:
+                for i, frame in enumerate(synthetic_gossip(num_channels, num_nodes)):
+                    # Each channel's frames come from one peer, so they arrive in order
+                    writer.record(frame, peers[i // 3 % len(peers)], INBOUND)
+
+        async def run(pipeline: Optional[DecodePipeline]) -> Tuple[int, float, float, int]:
+            if pipeline is not None:
+                # Start the workers before timing
+                await pipeline.submit(synthetic_gossip(1, 2)[0], lambda frame, summary: None)
+                await pipeline.drain()
+            graph = NetworkGraph()
+            start, cpu = time.perf_counter(), time.process_time()
+            count, _ = await replay(capture, graph=graph, pipeline=pipeline)  # pyright: ignore
+            if pipeline is not None:
+                await pipeline.drain()
+                pipeline.close()
+            return count, time.perf_counter() - start, time.process_time() - cpu, len(graph)
+
+        count, elapsed, cpu, channels = asyncio.run(run(None))
+        loop_only = cpu / count
+        print(f"frames: {count}, channels: {channels}")
+        print(
+            f"event loop:  {elapsed:.2f}s, {count / elapsed:.0f} frames/s, "
+            f"loop {loop_only * 1e6:.1f} us per frame"
+        )
+        for workers in range(1, max_workers + 1):
+            count, elapsed, cpu, _ = asyncio.run(run(DecodePipeline(workers)))
+            print(
+                f"workers: {workers:>2}, {elapsed:.2f}s, {count / elapsed:.0f} frames/s, "
+                f"loop {cpu / count * 1e6:.1f} us per frame, "
+                f"at most {loop_only / (cpu / count):.1f}x the event loop"
+            )
+
+
+def run_dispatch(num_channels: int, num_nodes: int):
+    """Dispatch gossip through a registry which only has channel_update handlers."""
+    frames = synthetic_gossip(num_channels, num_nodes)
+    received = []
+
+    async def on_update(peer, message):
+        received.append(message.timestamp.value)
+
+    async def on_announcement(peer, message):
+        pass
+
+    async def dispatch(handlers: HandlerRegistry) -> float:
+        start = time.perf_counter()
+        for frame in frames:
+            await handlers.dispatch(None, frame, MessageDecoder.from_bytes)
+        return time.perf_counter() - start
+
+    everything, updates_only = HandlerRegistry(), HandlerRegistry()
+    everything.subscribe(ChannelAnnouncementMessage.id, on_announcement)
+    everything.subscribe(ChannelUpdateMessage.id, on_update)
+    updates_only.subscribe(ChannelUpdateMessage.id, on_update)
+
+    all_types = asyncio.run(dispatch(everything))
+    subscribed = asyncio.run(dispatch(updates_only))
+    print(f"frames: {len(frames)}, channel_updates: {len(received) // 2}")
+    print(
+        f"every type:          {all_types:.2f}s, {all_types / len(frames) * 1e6:.2f} us per frame"
+    )
+    print(
+        f"channel_update only: {subscribed:.2f}s, {subscribed / len(frames) * 1e6:.2f} us per frame"
+    )
+
+
+def run_range_sync(num_channels: int, num_nodes: int, changed: float = 0.05):
+    """
+    A warm resync against a peer holding the same channels, `changed` of whose updates have new
+    fees and as many again only a refreshed timestamp, compared with fetching every channel.
+    """
+    frames = synthetic_gossip(num_channels, num_nodes)
+    local, remote = NetworkGraph(), NetworkGraph()
+    for frame in frames:
+        local.ingest(MessageDecoder.from_bytes(frame, lazy=True))
+        remote.ingest(MessageDecoder.from_bytes(frame, lazy=True))
+    rng = random.Random(0)
+    ids = sorted(local.short_channel_ids)
+    picked = rng.sample(ids, 2 * int(len(ids) * changed))
+    for i, short_channel_id in enumerate(picked):
+        d = remote.direction(short_channel_id, rng.getrandbits(1))
+        fee_base_msat = d.fee_base_msat + 1 if i % 2 else d.fee_base_msat
+        remote.update_direction(
+            short_channel_id,
+            d.timestamp + 3600,
+            d.message_flags,
+            d.channel_flags,
+            d.cltv_expiry_delta,
+            d.htlc_minimum_msat,
+            fee_base_msat,
+            d.fee_proportional_millionths,
+            d.htlc_maximum_msat,
+        )
+    chain_hash = bytes(32)
+    update_size = len(next(f for f in frames if f[:2] == b"\x01\x02"))
+
+    class Peer:
+        node_id_bytes = bytes(33)
+
+        def __init__(self):
+            self.sent: List[Message] = []
+
+        async def send(self, message: Message):
+            self.sent.append(message)
+
+    async def resync() -> Tuple[float, int, int]:
+        sync = GossipSync(local.has_channel, chain_hash, channel_state=local.channel_state)
+        peer = Peer()
+        received = requested = 0
+        start = time.perf_counter()
+        await sync.add_peer(peer, chain_hash)
+        while peer.sent:
+            message = peer.sent.pop(0)
+            received += len(message.to_bytes())
+            if isinstance(message, QueryChannelRangeMessage):
+                first = message.first_block_num.value
+                end = first + message.number_of_blocks.value
+                chunk = [i for i in ids if first <= i >> 40 < end]
+                # Replies of REPLY_IDS ids each, so every reply fits in a frame
+                for i in range(0, max(len(chunk), 1), REPLY_IDS):
+                    reply_ids = chunk[i : i + REPLY_IDS]
+                    reply_first = first if i == 0 else reply_ids[0] >> 40
+                    reply_end = chunk[i + REPLY_IDS] >> 40 if i + REPLY_IDS < len(chunk) else end
+                    timestamps, checksums = remote.channel_state(reply_ids, chain_hash)
+                    reply = ReplyChannelRangeMessage.create(
+                        chain_hash,
+                        reply_first,
+                        reply_end - reply_first,
+                        True,
+                        reply_ids,
+                        ENCODING_ZLIB,
+                        timestamps,
+                        checksums,
+                    )
+                    received += len(reply.to_bytes())
+                    await sync.handle_reply_channel_range(peer, reply)
+            elif isinstance(message, QueryShortChannelIDsMessage):
+                flags = message.query_flags() or []
+                requested += sum(bin(f & 0b110).count("1") for f in flags)
+                await sync.handle_reply_short_channel_ids_end(
+                    peer, ReplyShortChannelIDsMessage.create(chain_hash)
+                )
+        return time.perf_counter() - start, received + requested * update_size, requested
+
+    elapsed, warm_bytes, requested = asyncio.run(resync())
+    full_bytes = sum(len(frame) for frame in frames)
+    print(
+        f"channels: {len(ids)}, updates changed: {len(picked) // 2}, refreshed: {len(picked) // 2}"
+    )
+    print(f"full fetch: {full_bytes / 1e6:.1f} MB, {len(frames)} frames to decode")
+    print(
+        f"warm resync: {warm_bytes / 1e6:.2f} MB, {requested} frames to decode, "
+        f"compared in {elapsed:.2f}s"
+    )
+
+
+def run_serve(num_channels: int, num_nodes: int, peers: int = 100):
+    """Answer a whole chain query_channel_range, with timestamps and checksums, for many peers."""
+    graph = NetworkGraph()
+    for frame in synthetic_gossip(num_channels, num_nodes):
+        graph.ingest(MessageDecoder.from_bytes(frame, lazy=True))
+    server = GossipServer(graph)
+    chain_hash = bytes(32)
+    query_option = QUERY_OPTION_TIMESTAMPS | QUERY_OPTION_CHECKSUMS
+
+    start = time.perf_counter()
+    frames = server.channel_range_replies(chain_hash, 0, 10**6, query_option)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(peers):
+        server.channel_range_replies(chain_hash, 0, 10**6, query_option)
+    warm = (time.perf_counter() - start) / peers
+    print(
+        f"channels: {len(graph)}, replies: {len(frames)}, "
+        f"{sum(len(frame) for frame in frames) / 1e6:.2f} MB"
+    )
+    print(f"first peer: {cold * 1e3:.1f} ms, next {peers} peers: {warm * 1e3:.3f} ms each")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message decoding")
+    parser.add_argument("--rounds", type=int, default=1000, help="decodes per sample")
+    parser.add_argument(
+        "--suite",
+        action="store_true",
+        help="decode and encode every message class over a synthetic corpus",
+    )
+    parser.add_argument(
+        "--updates", type=int, default=1_000_000, help="channel_updates decoded by --suite"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument("--json", help="write --suite results as JSON to this file, - for stdout")
+    parser.add_argument(
+        "--transport", action="store_true", help="benchmark Bolt 8 round trips instead"
+    )
+    parser.add_argument(
+        "--graph", action="store_true", help="benchmark loading gossip into a NetworkGraph instead"
+    )
+    parser.add_argument(
+        "--dedup", action="store_true", help="benchmark decoding repeated gossip with dedup"
+    )
+    parser.add_argument("--copies", type=int, default=5, help="copies of each gossip frame")
+    parser.add_argument(
+        "--verify", action="store_true", help="benchmark gossip signature verification"
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="benchmark replaying gossip through worker processes",
+    )
+    parser.add_argument(
+        "--dispatch",
+        action="store_true",
+        help="benchmark dispatching gossip to channel_update handlers only",
+    )
+    parser.add_argument(
+        "--range-sync",
+        action="store_true",
+        help="benchmark a warm resync with channel_update timestamps and checksums",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="benchmark answering query_channel_range from cached replies",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="most worker processes"
+    )
+    parser.add_argument("--channels", type=int, default=80_000, help="synthetic graph channels")
+    parser.add_argument("--nodes", type=int, default=15_000, help="synthetic graph nodes")
+    parser.add_argument("--gossip-store", help="load a recorded gossip store into the graph")
+    parser.add_argument("--capture", help="replay this capture for --pipeline")
+    args = parser.parse_args()
+    if args.suite:
+        run_suite(args.rounds, args.updates, args.seed, args.json)
+    elif args.pipeline:
+        run_pipeline(args.channels, args.nodes, args.workers, args.capture)
+    elif args.verify:
+        run_verify(args.channels, args.workers)
+    elif args.dispatch:
+        run_dispatch(args.channels, args.nodes)
+    elif args.range_sync:
+        run_range_sync(args.channels, args.nodes)
+    elif args.serve:
+        run_serve(args.channels, args.nodes)
+    elif args.dedup:
+        run_dedup(args.channels, args.nodes, args.copies)
+    elif args.graph:
+        run_graph(args.channels, args.nodes, args.gossip_store)
+    elif args.transport:
+        run_transport(args.rounds)
+    else:
+        run(args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+# File header: magic, wall clock time and monotonic time when the capture was opened, so record
+# timestamps (monotonic) can be placed in real time
+MAGIC = b"LMPCAP\x00\x01"
+FILE_HEADER = struct.Struct(">8sdd")
+# Record: monotonic timestamp, direction, peer node id, frame length, then the frame itself
+RECORD_HEADER = struct.Struct(">dB33sH")
+INBOUND = 0
+OUTBOUND = 1
+# Appending to a capture starts a session with a record of this direction, whose frame holds
+# the wall clock and monotonic times of the new process like the file header does
+SESSION = 2
+SESSION_TIMES = struct.Struct(">dd")
+
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+@dataclass
+class CaptureRecord:
+    timestamp: float
+    direction: int
+    peer_id: bytes
+    frame: bytes
+    # Counts the times the capture was opened before this record, timestamps of different
+    # sessions come from different monotonic clocks
+    session: int = 0
+
+
+class CaptureWriter:
+    """
+    Records decrypted frames to a compact binary file.
+
+    Records are packed with struct into a large write buffer, so capturing costs a couple of
+    buffered writes per frame and no string formatting. Opening an existing capture appends to
+    it, starting a new session.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab", buffering=WRITE_BUFFER_SIZE)
+        if new:
+            self.file.write(FILE_HEADER.pack(MAGIC, time.time(), time.monotonic()))
+        else:
+            times = SESSION_TIMES.pack(time.time(), time.monotonic())
+            self.file.write(RECORD_HEADER.pack(0.0, SESSION, bytes(33), len(times)) + times)
+
+    def record(
+        self, frame: bytes, peer_id: bytes, direction: int, timestamp: Optional[float] = None
+    ):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.file.write(RECORD_HEADER.pack(timestamp, direction, peer_id, len(frame)))
+        self.file.write(frame)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """
+    Stream the records of a capture, stopping at a record that was not written completely.
+
+    Session records are not yielded, the records after one carry the next session number.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < FILE_HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, _, _ = FILE_HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a capture file")
+            offset = FILE_HEADER.size
+            session = 0
+            while offset + RECORD_HEADER.size <= len(mm):
+                timestamp, direction, peer_id, length = RECORD_HEADER.unpack_from(mm, offset)
+                start = offset + RECORD_HEADER.size
+                if start + length > len(mm):
+                    return
+                if direction == SESSION:
+                    session += 1
+                else:
+                    frame = mm[start : start + length]
+                    yield CaptureRecord(timestamp, direction, peer_id, frame, session)
+                offset = start + length
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the inbound frames of captures as hex")
+    parser.add_argument("captures", nargs="+")
+    args = parser.parse_args()
+    for path in args.captures:
+        for record in read_capture(path):
+            if record.direction == INBOUND:
+                print(record.frame.hex())
+
+
+if __name__ == "__main__":
+    main()
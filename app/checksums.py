@@ -0,0 +1,72 @@
+from array import array
+from typing import Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, rows are then checksummed one at a time
+    np = None
+
+# CRC32C, the Castagnoli polynomial of RFC 3720, reflected
+POLYNOMIAL = 0x82F63B78
+
+
+def build_table() -> array:
+    table = array("I")
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ POLYNOMIAL if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+TABLE = build_table()
+
+# Offsets into a raw channel_update, see Bolt 7: the checksum skips the type, the signature and
+# the timestamp, so it covers chain_hash and short_channel_id, then everything after timestamp
+CHANNEL_UPDATE_CHECKSUMMED = slice(2 + 64, 2 + 64 + 40)
+CHANNEL_UPDATE_AFTER_TIMESTAMP = 2 + 64 + 40 + 4
+
+
+def crc32c(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    table = TABLE
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def checksummed_part(frame: bytes) -> bytes:
+    return frame[CHANNEL_UPDATE_CHECKSUMMED] + frame[CHANNEL_UPDATE_AFTER_TIMESTAMP:]
+
+
+def channel_update_checksum(frame: bytes) -> int:
+    """The checksum of a raw channel_update as carried in checksums_tlv."""
+    return crc32c(checksummed_part(frame))
+
+
+def crc32c_many(rows: Sequence[bytes]) -> array:
+    """
+    The CRC32C of each row, as array("I").
+
+    With numpy, rows of the same length are stacked into a matrix and checksummed together, one
+    table lookup per byte column for all of them, rather than one per byte of each row.
+    """
+    result = array("I", bytes(4 * len(rows)))
+    if np is None:
+        for i, row in enumerate(rows):
+            result[i] = crc32c(row)
+        return result
+    by_length: Dict[int, List[int]] = {}
+    for i, row in enumerate(rows):
+        by_length.setdefault(len(row), []).append(i)
+    table = np.frombuffer(TABLE, dtype=np.uint32)
+    checksums = np.frombuffer(result, dtype=np.uint32)
+    for length, indices in by_length.items():
+        matrix = np.frombuffer(b"".join(rows[i] for i in indices), dtype=np.uint8)
+        matrix = matrix.reshape(len(indices), length)
+        crc = np.full(len(indices), 0xFFFFFFFF, dtype=np.uint32)
+        for column in range(length):
+            crc = table[(crc ^ matrix[:, column]) & 0xFF] ^ (crc >> 8)
+        checksums[indices] = crc ^ 0xFFFFFFFF
+    return result
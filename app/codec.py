@@ -0,0 +1,148 @@
+import struct
+from enum import Enum
+from typing import Dict, List, Tuple, Type
+
+from app.message_elements import SerializedElement
+
+
+class MessageCodec:
+    """
+    A message layout compiled once per message class.
+
+    The leading run of fixed width elements is packed and unpacked with a single struct.Struct,
+    the variable length tail that follows is decoded element by element.
+    """
+
+    def __init__(self, features: List[Tuple[Enum, Type[SerializedElement]]]):
+        num_fixed = 0
+        for _, feature in features:
+            if feature.struct_format is None:
+                break
+            num_fixed += 1
+
+        self.features = features
+        self.prefix = features[:num_fixed]
+        self.tail = features[num_fixed:]
+        self.prefix_keys = [key for key, _ in self.prefix]
+        self.prefix_constructors = [
+            (key, self.constructor(feature)) for key, feature in self.prefix
+        ]
+        self.layout = struct.Struct(">" + "".join(f.struct_format for _, f in self.prefix))  # pyright: ignore
+
+        # Position of each feature in the value lists of decode_values
+        self.index = {key: i for i, (key, _) in enumerate(features)}
+        self.constructors = [make for _, make in self.prefix_constructors]
+
+        self.prefix_offsets = {}
+        offset = 0
+        for key, feature in self.prefix:
+            end = offset + struct.calcsize(">" + feature.struct_format)  # pyright: ignore
+            self.prefix_offsets[key] = (feature, offset, end)
+            offset = end
+
+    @staticmethod
+    def constructor(feature: Type[SerializedElement]):
+        """Calls the class directly unless it overrides from_struct, saving a call per field."""
+        if feature.from_struct.__func__ is SerializedElement.from_struct.__func__:  # pyright: ignore
+            return feature
+        return feature.from_struct
+
+    @property
+    def is_fixed_width(self) -> bool:
+        return not self.tail
+
+    def decode(self, view: memoryview) -> Tuple[Dict[Enum, SerializedElement], int]:
+        """Decode all features from the view and return them with the offset just past them."""
+        if len(view) < self.layout.size:
+            # Truncated frame: walk element by element, which tolerates short fields.
+            return self.decode_from(view, 0, self.features)
+
+        values = self.layout.unpack_from(view, 0)
+        properties = {
+            key: make(value) for (key, make), value in zip(self.prefix_constructors, values)
+        }
+        tail, offset = self.decode_from(view, self.layout.size, self.tail)
+        properties.update(tail)
+        return properties, offset
+
+    def decode_values(self, view: memoryview) -> Tuple[List, int]:
+        """
+        Decode all features into a list in feature order, and the offset just past them.
+
+        Fixed width features are left as the raw values struct unpacked, which element_at turns
+        into elements when they are read, the variable length tail is decoded into elements.
+        """
+        if len(view) < self.layout.size:
+            properties, offset = self.decode_from(view, 0, self.features)
+            return [properties[key] for key, _ in self.features], offset
+        values = list(self.layout.unpack_from(view, 0))
+        offset = self.layout.size
+        for _, feature in self.tail:
+            element, offset = feature.from_view(view, offset)
+            values.append(element)
+        return values, offset
+
+    def element_at(self, values: List, index: int) -> SerializedElement:
+        """The element at index of a decode_values list, built from its raw value the first time."""
+        value = values[index]
+        if not isinstance(value, SerializedElement):
+            value = values[index] = self.constructors[index](value)
+        return value
+
+    @staticmethod
+    def decode_from(
+        view: memoryview, offset: int, features: List[Tuple[Enum, Type[SerializedElement]]]
+    ) -> Tuple[Dict[Enum, SerializedElement], int]:
+        properties = {}
+        for key, feature in features:
+            properties[key], offset = feature.from_view(view, offset)
+        return properties, offset
+
+    def offsets(
+        self, view: memoryview
+    ) -> Tuple[Dict[Enum, Tuple[Type[SerializedElement], int, int]], int]:
+        """
+        Locate each feature as (element class, start, end) without decoding any of them.
+
+        Fixed width layouts return the same shared dict for every frame, copy it before changing it.
+        """
+        if len(view) < self.layout.size:
+            offsets, offset = {}, 0
+            features = self.features
+        elif not self.tail:
+            return self.prefix_offsets, self.layout.size
+        else:
+            offsets, offset = dict(self.prefix_offsets), self.layout.size
+            features = self.tail
+        for key, feature in features:
+            end = feature.skip(view, offset)
+            offsets[key] = (feature, offset, end)
+            offset = end
+        return offsets, offset
+
+    def encode_parts(self, properties: Dict[Enum, SerializedElement], parts: List[bytes]):
+        """Append the encoded features to parts, the fixed width prefix packed in one piece."""
+        parts.append(
+            self.layout.pack(*[properties[key].struct_value() for key in self.prefix_keys])
+        )
+        for key, _ in self.tail:
+            properties[key].write_parts(parts)
+
+    def encode_values(self, values: List, parts: List[bytes]):
+        """Like encode_parts for a decode_values list."""
+        num_fixed = len(self.prefix)
+        parts.append(
+            self.layout.pack(
+                *[
+                    value.struct_value() if isinstance(value, SerializedElement) else value
+                    for value in values[:num_fixed]
+                ]
+            )
+        )
+        for element in values[num_fixed:]:
+            element.write_parts(parts)
+
+    def encode(self, properties: Dict[Enum, SerializedElement]) -> bytes:
+        parts = []
+        self.encode_parts(properties, parts)
+        return b"".join(parts)
@@ -0,0 +1,143 @@
+"""
+Columnar batch decoding of gossip messages into NumPy record arrays.
+
+Requires the optional numpy dependency (`uv sync --extra analytics`).
+"""
+
+from typing import List, Sequence, Tuple, Type, Union
+
+import numpy as np
+
+from app.message_elements import SerializedElement, ShortChannelIDElement, U16VarBytesElement
+from app.messages import ChannelAnnouncementMessage, ChannelUpdateMessage, Message
+
+Frames = Union[Sequence[bytes], bytes, bytearray, memoryview]
+
+
+def numpy_format(feature: Type[SerializedElement]):
+    """Map an element to the big-endian NumPy format of its bytes."""
+    if issubclass(feature, ShortChannelIDElement):
+        return ">u8"
+    struct_format: str = feature.struct_format  # pyright: ignore
+    if struct_format.endswith("s"):
+        size = int(struct_format[:-1])
+        return "u1" if size == 1 else ("u1", (size,))
+    return {"H": ">u2", "I": ">u4", "Q": ">u8"}[struct_format]
+
+
+class BatchLayout:
+    """
+    The wire layout of a message class, as NumPy dtypes for each fixed width run of features().
+
+    Runs are separated by u16 length prefixed elements, which are skipped and not kept as columns.
+    """
+
+    def __init__(self, message_class: Type[Message]):
+        self.message_class = message_class
+        self.segments: List[np.dtype] = []
+        fields: List[Tuple[str, object]] = []
+        for key, feature in message_class.features():
+            if feature.struct_format is not None:
+                fields.append((key.value, numpy_format(feature)))
+            elif issubclass(feature, U16VarBytesElement):
+                self.segments.append(np.dtype(fields))
+                fields = []
+            else:
+                raise ValueError(f"{feature.__name__} has no batch layout")
+        self.segments.append(np.dtype(fields))
+        self.dtype = np.dtype(
+            [
+                (name, dt.newbyteorder("="))
+                for s in self.segments
+                for name, (dt, _) in s.fields.items()
+            ]  # pyright: ignore
+        )
+
+    def decode(self, frames: Frames) -> np.ndarray:
+        buffer, starts, ends = frame_offsets(frames)
+        result = np.empty(len(starts), dtype=self.dtype)
+        if len(starts) == 0:
+            return result
+
+        type_ids = buffer[starts].astype(np.uint16) << 8 | buffer[starts + 1]
+        if np.any(type_ids != self.message_class.id):
+            raise ValueError(f"Batch contains frames which are not {self.message_class.name}")
+
+        offsets = starts.copy()
+        for i, segment in enumerate(self.segments):
+            if i > 0:
+                # Skip the u16 length prefixed element which precedes this segment
+                if np.any(offsets + 2 > ends):
+                    raise ValueError(f"Frame is shorter than the {self.message_class.name} layout")
+                lengths = buffer[offsets].astype(np.int64) << 8 | buffer[offsets + 1]
+                offsets += 2 + lengths
+            if np.any(offsets + segment.itemsize > ends):
+                raise ValueError(f"Frame is shorter than the {self.message_class.name} layout")
+            rows = gather(buffer, offsets, segment.itemsize).view(segment).reshape(-1)
+            for name in segment.names:  # pyright: ignore
+                result[name] = rows[name]
+            offsets += segment.itemsize
+        return result
+
+
+def frame_offsets(frames: Frames) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the frames as one uint8 buffer and the start and end offsets of each frame in it.
+
+    A list of frames is joined. A single buffer is read as frames each prefixed by a u16 length.
+    """
+    if isinstance(frames, (bytes, bytearray, memoryview)):
+        view = memoryview(frames)
+        starts = []
+        offset = 0
+        while offset < len(view):
+            length = int.from_bytes(view[offset : offset + 2], byteorder="big")
+            starts.append(offset + 2)
+            offset += 2 + length
+        if offset != len(view):
+            raise ValueError("Truncated frame at the end of the buffer")
+        starts = np.array(starts, dtype=np.int64)
+        ends = np.append(starts[1:] - 2, len(view))
+        return np.frombuffer(view, dtype=np.uint8), starts, ends
+
+    lengths = np.fromiter((len(f) for f in frames), dtype=np.int64, count=len(frames))
+    starts = np.zeros(len(frames), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return np.frombuffer(b"".join(frames), dtype=np.uint8), starts, starts + lengths
+
+
+def gather(buffer: np.ndarray, offsets: np.ndarray, size: int) -> np.ndarray:
+    """Copy size bytes from each offset into a contiguous (len(offsets), size) array."""
+    return buffer[offsets[:, None] + np.arange(size)]
+
+
+_LAYOUTS = {}
+
+
+def batch_layout(message_class: Type[Message]) -> BatchLayout:
+    layout = _LAYOUTS.get(message_class)
+    if layout is None:
+        layout = _LAYOUTS[message_class] = BatchLayout(message_class)
+    return layout
+
+
+def decode_channel_updates(frames: Frames) -> np.ndarray:
+    """Decode raw channel_update frames into a record array with one row per message."""
+    return batch_layout(ChannelUpdateMessage).decode(frames)
+
+
+def decode_channel_announcements(frames: Frames) -> np.ndarray:
+    """Decode raw channel_announcement frames, channel features are skipped."""
+    return batch_layout(ChannelAnnouncementMessage).decode(frames)
+
+
+def split_short_channel_ids(
+    short_channel_ids: Union[np.ndarray, Sequence[int]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split short channel ids into (block height, transaction index, output index) arrays."""
+    ids = np.asarray(short_channel_ids, dtype=np.uint64)
+    return (
+        (ids >> np.uint64(40)).astype(np.uint32),
+        ((ids >> np.uint64(16)) & np.uint64(0xFFFFFF)).astype(np.uint32),
+        (ids & np.uint64(0xFFFF)).astype(np.uint16),
+    )
@@ -0,0 +1,285 @@
+import base64
+import hashlib
+import random
+from ipaddress import IPv4Address, IPv6Address
+from typing import Iterator, List, Tuple
+
+from ecdsa import SECP256k1
+from ecdsa.util import sigdecode_der, sigencode_string
+from pyln.proto.primitives import PrivateKey
+
+from app.gossip_sync import BITCOIN_CHAIN_HASH
+from app.message_elements import (
+    ADDRESS_DNS,
+    ADDRESS_IPV4,
+    ADDRESS_IPV6,
+    ADDRESS_TOR_V3,
+    ENCODING_UNCOMPRESSED,
+    ENCODING_ZLIB,
+    Address,
+)
+from app.messages import (
+    ChannelAnnouncementMessage,
+    ChannelUpdateMessage,
+    GossipTimestampFilterMessage,
+    InitMessage,
+    NodeAnnouncementMessage,
+    PingMessage,
+    PongMessage,
+    QueryChannelRangeMessage,
+    QueryShortChannelIDsMessage,
+    ReplyChannelRangeMessage,
+    ReplyShortChannelIDsMessage,
+)
+
+# Deterministic synthetic Lightning messages for benchmarks and tests. Everything here is built
+# from a seed, so the same arguments always give the same bytes.
+
+MAX_FRAME_SIZE = 65535
+SYNTHETIC_SIZE = 64 * 1024
+
+
+def short_channel_id(block: int, transaction: int, output: int = 0) -> int:
+    return block << 40 | transaction << 16 | output
+
+
+def synthetic_messages() -> List[bytes]:
+    """Large messages, close to the 65535 byte frame limit, which stress the per-field copies."""
+    # reply_channel_range carrying ~64 KB of uncompressed short channel ids
+    num_ids = (SYNTHETIC_SIZE - 2 - 32 - 4 - 4 - 1 - 2 - 1) // 8
+    encoded = b"\x00" + b"".join(
+        (700_000 << 40 | i << 16).to_bytes(8, "big") for i in range(num_ids)
+    )
+    reply = (
+        ReplyChannelRangeMessage.id.to_bytes(2, "big")
+        + bytes(32)
+        + (0).to_bytes(4, "big")
+        + (10**6).to_bytes(4, "big")
+        + b"\x01"
+        + len(encoded).to_bytes(2, "big")
+        + encoded
+    )
+    # ping with ~64 KB of ignored bytes
+    ignored = bytes(SYNTHETIC_SIZE - 6)
+    ping = (
+        PingMessage.id.to_bytes(2, "big")
+        + (0).to_bytes(2, "big")
+        + len(ignored).to_bytes(2, "big")
+        + ignored
+    )
+    return [reply, ping]
+
+
+def synthetic_channel_announcement(short_channel_id: int, node_1: bytes, node_2: bytes) -> bytes:
+    return (
+        ChannelAnnouncementMessage.id.to_bytes(2, "big")
+        + bytes(4 * 64)
+        + (0).to_bytes(2, "big")
+        + bytes(32)
+        + short_channel_id.to_bytes(8, "big")
+        + node_1
+        + node_2
+        + bytes(2 * 33)
+    )
+
+
+def synthetic_channel_update(
+    short_channel_id: int,
+    direction: int,
+    timestamp: int,
+    signature: bytes = bytes(64),
+    chain_hash: bytes = bytes(32),
+    message_flags: int = 1,
+    cltv_expiry_delta: int = 144,
+    htlc_minimum_msat: int = 1000,
+    fee_base_msat: int = 1000,
+    fee_proportional_millionths: int = 100,
+    htlc_maximum_msat: int = 10**9,
+) -> bytes:
+    return (
+        ChannelUpdateMessage.id.to_bytes(2, "big")
+        + signature
+        + chain_hash
+        + short_channel_id.to_bytes(8, "big")
+        + timestamp.to_bytes(4, "big")
+        + bytes([message_flags, direction])
+        + cltv_expiry_delta.to_bytes(2, "big")
+        + htlc_minimum_msat.to_bytes(8, "big")
+        + fee_base_msat.to_bytes(4, "big")
+        + fee_proportional_millionths.to_bytes(4, "big")
+        + htlc_maximum_msat.to_bytes(8, "big")
+    )
+
+
+def synthetic_node_announcements(count: int, seed: int = 0) -> Iterator[bytes]:
+    """Stream node_announcements with a mainnet-like mix of feature vectors and addresses."""
+    rng = random.Random(seed)
+    feature_vectors = [bytes.fromhex(f) for f in ("0800000000a069a2", "88a0880a8a59a1", "02a2a1")]
+    for i in range(count):
+        node_id = b"\x02" + rng.randbytes(32)
+        addresses = []
+        if rng.random() < 0.6:
+            addresses.append(Address(ADDRESS_IPV4, str(IPv4Address(rng.getrandbits(32))), 9735))
+        if rng.random() < 0.2:
+            addresses.append(Address(ADDRESS_IPV6, str(IPv6Address(rng.getrandbits(128))), 9735))
+        if rng.random() < 0.5:
+            onion = base64.b32encode(rng.randbytes(35)).decode().lower() + ".onion"
+            addresses.append(Address(ADDRESS_TOR_V3, onion, 9735))
+        if rng.random() < 0.05:
+            addresses.append(Address(ADDRESS_DNS, f"node{i}.example.com", 9735))
+        yield NodeAnnouncementMessage.create(
+            node_id,
+            rng.randrange(1_690_000_000, 1_730_000_000),
+            rng.choice(feature_vectors),
+            rng.getrandbits(24),
+            f"node-{i}",
+            addresses,
+            signature=rng.randbytes(64),
+        ).to_bytes()
+
+
+def sign(frame: bytes, keys: List[bytes], signed_from: int) -> bytes:
+    """Fill in the signatures at the start of a frame, one per private key, see Bolt 7."""
+    digest = hashlib.sha256(hashlib.sha256(frame[signed_from:]).digest()).digest()
+    signatures = b"".join(
+        sigencode_string(
+            *sigdecode_der(PrivateKey(key).key.sign(digest, hasher=None), SECP256k1.order),
+            SECP256k1.order,
+        )
+        for key in keys
+    )
+    return frame[:2] + signatures + frame[2 + len(signatures) :]
+
+
+def signed_channel(short_channel_id: int, keys: List[bytes], timestamp: int) -> List[bytes]:
+    """A channel_announcement signed by four private keys and two signed channel_updates."""
+    node_1, node_2 = (PrivateKey(key).public_key().to_bytes() for key in keys[:2])
+    bitcoin_keys = b"".join(PrivateKey(key).public_key().to_bytes() for key in keys[2:])
+    announcement = synthetic_channel_announcement(short_channel_id, node_1, node_2)
+    announcement = announcement[: -2 * 33] + bitcoin_keys
+    return [
+        sign(announcement, keys, 2 + 4 * 64),
+        sign(synthetic_channel_update(short_channel_id, 0, timestamp), keys[:1], 2 + 64),
+        sign(synthetic_channel_update(short_channel_id, 1, timestamp), keys[1:2], 2 + 64),
+    ]
+
+
+def synthetic_gossip(num_channels: int, num_nodes: int) -> List[bytes]:
+    """A channel_announcement and two channel_updates per channel, between random nodes."""
+    rng = random.Random(num_channels)
+    node_ids = [b"\x02" + rng.randbytes(32) for _ in range(num_nodes)]
+    frames = []
+    for i in range(num_channels):
+        scid = (500_000 + i // 1000) << 40 | (i % 1000) << 16
+        node_1, node_2 = rng.sample(node_ids, 2)
+        frames.append(synthetic_channel_announcement(scid, node_1, node_2))
+        frames.append(synthetic_channel_update(scid, 0, 1_700_000_000 + i))
+        frames.append(synthetic_channel_update(scid, 1, 1_700_000_000 + i))
+    return frames
+
+
+def channel_updates(count: int, seed: int = 0) -> Iterator[bytes]:
+    """
+    Stream channel_updates with mainnet-like spreads of channels, fees and limits.
+
+    Frames are generated one at a time, so millions can be benchmarked without holding them all.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        scid = short_channel_id(
+            rng.randrange(500_000, 870_000), rng.randrange(4000), rng.randrange(4)
+        )
+        yield synthetic_channel_update(
+            scid,
+            rng.getrandbits(1) | (2 if rng.random() < 0.05 else 0),
+            rng.randrange(1_690_000_000, 1_730_000_000),
+            signature=rng.randbytes(64),
+            chain_hash=BITCOIN_CHAIN_HASH,
+            cltv_expiry_delta=rng.choice((18, 34, 40, 80, 144)),
+            htlc_minimum_msat=rng.choice((1, 1000)),
+            fee_base_msat=rng.choice((0, 0, 1, 1000)),
+            fee_proportional_millionths=int(rng.expovariate(1 / 300)),
+            htlc_maximum_msat=rng.randrange(1, 1 << 40),
+        )
+
+
+def sorted_short_channel_ids(count: int, seed: int = 0) -> List[int]:
+    """Unique short channel ids spread over the blocks of a mainnet sized graph, sorted."""
+    rng = random.Random(seed)
+    ids = set()
+    while len(ids) < count:
+        ids.add(short_channel_id(rng.randrange(500_000, 870_000), rng.randrange(4000)))
+    return sorted(ids)
+
+
+def reply_channel_range(
+    num_ids: int = 12_000, seed: int = 0, encoding: int = ENCODING_ZLIB
+) -> bytes:
+    """A reply_channel_range covering every block, with num_ids short channel ids."""
+    ids = sorted_short_channel_ids(num_ids, seed)
+    try:
+        frame = ReplyChannelRangeMessage.create(
+            BITCOIN_CHAIN_HASH, 0, 1_000_000, True, ids, encoding
+        ).to_bytes()
+    except OverflowError:
+        frame = b""
+    if not frame or len(frame) > MAX_FRAME_SIZE:
+        raise ValueError(f"{num_ids} short channel ids do not fit in one frame")
+    return frame
+
+
+def init_message(feature_bytes: int = 1024, seed: int = 0) -> bytes:
+    """An init message with a local feature vector of feature_bytes random bytes."""
+    rng = random.Random(seed)
+    global_features = b"\x22\x00"
+    local_features = rng.randbytes(feature_bytes)
+    return (
+        InitMessage.id.to_bytes(2, "big")
+        + len(global_features).to_bytes(2, "big")
+        + global_features
+        + len(local_features).to_bytes(2, "big")
+        + local_features
+    )
+
+
+def message_samples(seed: int = 0) -> List[Tuple[str, bytes]]:
+    """(label, frame) pairs covering every message class, small and large variants."""
+    rng = random.Random(seed)
+    node_1, node_2 = b"\x02" + rng.randbytes(32), b"\x03" + rng.randbytes(32)
+    ids = sorted_short_channel_ids(2_000, seed)
+    ping = PingMessage.create(1000, rng.randbytes(32)).to_bytes()
+    return [
+        ("init", init_message(8, seed)),
+        ("init_large_features", init_message(8 * 1024, seed)),
+        ("ping", ping),
+        ("ping_64k", synthetic_messages()[1]),
+        ("pong", PongMessage.create_from_ping(PingMessage.from_bytes(ping)).to_bytes()),
+        ("channel_announcement", synthetic_channel_announcement(ids[0], node_1, node_2)),
+        ("channel_update", next(channel_updates(1, seed))),
+        ("node_announcement", next(synthetic_node_announcements(1, seed))),
+        (
+            "gossip_timestamp_filter",
+            GossipTimestampFilterMessage.id.to_bytes(2, "big")
+            + BITCOIN_CHAIN_HASH
+            + (1_700_000_000).to_bytes(4, "big")
+            + (0xFFFFFFFF).to_bytes(4, "big"),
+        ),
+        (
+            "query_short_channel_ids",
+            QueryShortChannelIDsMessage.create(BITCOIN_CHAIN_HASH, ids, ENCODING_ZLIB).to_bytes(),
+        ),
+        (
+            "reply_short_channel_ids",
+            ReplyShortChannelIDsMessage.create(BITCOIN_CHAIN_HASH).to_bytes(),
+        ),
+        (
+            "query_channel_range",
+            QueryChannelRangeMessage.create(BITCOIN_CHAIN_HASH, 0, 1_000_000).to_bytes(),
+        ),
+        (
+            "reply_channel_range",
+            reply_channel_range(1_000, seed, ENCODING_UNCOMPRESSED),
+        ),
+        ("reply_channel_range_zlib", reply_channel_range(seed=seed)),
+        ("reply_channel_range_64k", synthetic_messages()[0]),
+    ]
@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set
+
+from app.gossip_store import CHANNEL_UPDATE_SCID, GOSSIP_TYPE_PREFIXES
+from app.messages import ChannelUpdateMessage
+
+CHANNEL_UPDATE_PREFIX = ChannelUpdateMessage.id.to_bytes(2, byteorder="big")
+
+DEFAULT_MAX_ENTRIES = 1 << 20
+# A 64 bit int plus its share of a set's hash table
+APPROX_BYTES_PER_ENTRY = 64
+
+
+@dataclass
+class DedupCounters:
+    hits: int = 0
+    misses: int = 0
+
+
+class GossipDeduplicator:
+    """
+    Drops gossip frames which were already received, before they are decoded.
+
+    Frames are keyed by the hash() of their raw bytes, a 64 bit SipHash with a per process key, and
+    remembered in two generations of sets: once the current generation holds max_entries / 2
+    frames it becomes the old one and the previous old generation is discarded. At most
+    max_entries hashes are held, about max_entries * APPROX_BYTES_PER_ENTRY bytes, and a frame is
+    forgotten only after at least max_entries / 2 newer unique frames.
+
+    With channel_known, a channel_update for a channel it does not know is let through without
+    being remembered: the graph drops it, and a copy arriving after the channel_announcement
+    must not be dropped as a repeat.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        channel_known: Optional[Callable[[int], bool]] = None,
+    ):
+        self.generation_size = max(max_entries // 2, 1)
+        self.channel_known = channel_known
+        self.current: Set[int] = set()
+        self.previous: Set[int] = set()
+        self.counters: Dict[str, DedupCounters] = {}
+
+    def __len__(self) -> int:
+        return len(self.current) + len(self.previous)
+
+    def is_duplicate(self, frame: bytes, source: str = "") -> bool:
+        """Whether a gossip frame was seen before, remembering it if not. Other types never are."""
+        if frame[:2] not in GOSSIP_TYPE_PREFIXES:
+            return False
+        counters = self.counters.get(source)
+        if counters is None:
+            counters = self.counters[source] = DedupCounters()
+        digest = hash(frame)
+        if digest in self.current or digest in self.previous:
+            counters.hits += 1
+            return True
+        counters.misses += 1
+        if (
+            self.channel_known is not None
+            and frame[:2] == CHANNEL_UPDATE_PREFIX
+            and not self.channel_known(int.from_bytes(frame[CHANNEL_UPDATE_SCID], byteorder="big"))
+        ):
+            return False
+        if len(self.current) >= self.generation_size:
+            self.previous = self.current
+            self.current = set()
+        self.current.add(digest)
+        return False
+
+    def remove_source(self, source: str):
+        """Drop the counters of a source which went away."""
+        self.counters.pop(source, None)
@@ -0,0 +1,325 @@
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.gossip_store import (
+    CHANNEL_ANNOUNCEMENT_FEATURES_LEN,
+    CHANNEL_UPDATE_CHANNEL_FLAGS,
+    GossipStore,
+    gossip_timestamp,
+)
+from app.gossip_sync import QUERY_FLAGS_ALL
+from app.graph import NetworkGraph
+from app.handlers import HandlerRegistry
+from app.logger import logger
+from app.message_decoder import MessageDecoder
+from app.message_elements import (
+    ENCODING_UNCOMPRESSED,
+    QUERY_OPTION_CHECKSUMS,
+    QUERY_OPTION_TIMESTAMPS,
+)
+from app.messages import (
+    ChannelAnnouncementMessage,
+    ChannelUpdateMessage,
+    GossipChannelIDQueryFlags,
+    NodeAnnouncementMessage,
+    QueryChannelRangeMessage,
+    QueryShortChannelIDsMessage,
+    ReplyChannelRangeMessage,
+    ReplyShortChannelIDsMessage,
+)
+
+# Replies are cached per bucket of this many blocks, aligned to multiples of it. Our own sync
+# queries chunks of the same size, and most implementations ask for the whole chain at once.
+BUCKET_BLOCKS = 10_000
+# Replies with timestamps or checksums go stale as updates arrive, they are rebuilt this often.
+# Replies with ids alone only change when channels are added, which the cache notices itself.
+REPLY_CACHE_SECONDS = 60
+MAX_FRAME_SIZE = 65535
+# reply_channel_range without ids: type, chain_hash, first_blocknum, number_of_blocks,
+# sync_complete, the length and encoding of the ids and the headers of the two TLVs, with room
+# for zlib growing what it can not compress
+REPLY_OVERHEAD = 256
+
+QUERY_ANNOUNCEMENT = 1 << GossipChannelIDQueryFlags.CHANNEL_ANNOUNCEMENTS.value
+QUERY_UPDATES = (
+    1 << GossipChannelIDQueryFlags.CHANNEL_UPDATES_NODE_1.value,
+    1 << GossipChannelIDQueryFlags.CHANNEL_UPDATES_NODE_2.value,
+)
+QUERY_NODES = (
+    1 << GossipChannelIDQueryFlags.NODE_ANNOUNCEMENTS_NODE_1.value,
+    1 << GossipChannelIDQueryFlags.NODE_ANNOUNCEMENTS_NODE_2.value,
+)
+
+
+def block_of(short_channel_id: int) -> int:
+    return short_channel_id >> 40
+
+
+def announcement_node_ids(frame: bytes) -> Tuple[bytes, bytes]:
+    """node_id_1 and node_id_2 of a raw channel_announcement."""
+    start = CHANNEL_ANNOUNCEMENT_FEATURES_LEN
+    node_1 = start + 2 + int.from_bytes(frame[start : start + 2], byteorder="big") + 32 + 8
+    return frame[node_1 : node_1 + 33], frame[node_1 + 33 : node_1 + 66]
+
+
+def newest(held: Optional[bytes], frame: bytes) -> bytes:
+    """The newer of two raw channel_updates or node_announcements, the later one on a tie."""
+    if held is None or gossip_timestamp(frame) >= gossip_timestamp(held):  # pyright: ignore
+        return frame
+    return held
+
+
+class GossipServer:
+    """
+    Answers the gossip queries of peers from the local graph and gossip store.
+
+    query_channel_range is answered from a sorted index of the graph's short channel ids, split
+    into reply_channel_range frames that fit the 65535 byte limit. Replies end at a block
+    boundary, unless one block holds more channels than fit in a frame: as BOLT 7 allows, its
+    channels are then spread over several replies, which each cover at least that block. The
+    encoded frames of whole buckets of BUCKET_BLOCKS blocks are cached, so the same range asked
+    for by many peers is served by handing out the same bytes. A bucket is rebuilt when channels
+    were added to it, and when it carries timestamps or checksums, once it is
+    REPLY_CACHE_SECONDS old.
+
+    query_short_channel_ids is answered with the stored channel_announcement, latest
+    channel_update of each direction and latest node_announcements of each channel, as far as
+    query_flags ask for them. Without a gossip store there are no signed messages to send, so
+    queries are answered with full_information unset.
+
+    With chain_hash None, queries for any chain are answered: the graph holds whichever chain
+    our peers gossip about.
+    """
+
+    def __init__(
+        self,
+        graph: NetworkGraph,
+        gossip_store: Optional[GossipStore] = None,
+        chain_hash: Optional[bytes] = None,
+        encoding: int = ENCODING_UNCOMPRESSED,
+    ):
+        self.graph = graph
+        self.gossip_store = gossip_store
+        self.chain_hash = chain_hash
+        self.encoding = encoding
+        self.sorted_ids = array("Q")
+        self.indexed = 0
+        # (chain_hash, bucket first block, query_option) to (channels, built at, frames)
+        self.cache: Dict[Tuple[bytes, int, int], Tuple[int, float, List[bytes]]] = {}
+        self.range_queries = 0
+        self.short_channel_id_queries = 0
+        self.buckets_cached = 0
+        self.buckets_built = 0
+        self.replies_sent = 0
+        self.gossip_sent = 0
+
+    def subscribe(self, handlers: HandlerRegistry):
+        handlers.subscribe(QueryChannelRangeMessage.id, self.handle_query_channel_range)
+        handlers.subscribe(QueryShortChannelIDsMessage.id, self.handle_query_short_channel_ids)
+
+    def serves(self, chain_hash: bytes) -> bool:
+        return self.chain_hash is None or chain_hash == self.chain_hash
+
+    def index(self) -> array:
+        """The graph's short channel ids in ascending order, merging in channels added since."""
+        short_channel_ids = self.graph.short_channel_ids
+        if len(short_channel_ids) > self.indexed:
+            added = short_channel_ids[self.indexed :]
+            if self.sorted_ids and min(added) < self.sorted_ids[-1]:
+                # Two sorted runs, which sorted() merges in linear time
+                self.sorted_ids = array("Q", sorted(self.sorted_ids + array("Q", sorted(added))))
+            else:
+                self.sorted_ids.extend(sorted(added))
+            self.indexed = len(short_channel_ids)
+        return self.sorted_ids
+
+    async def handle_query_channel_range(self, peer: Any, message: QueryChannelRangeMessage):
+        self.range_queries += 1
+        chain_hash = message.chain_hash.to_bytes()
+        first = message.first_block_num.value
+        number = message.number_of_blocks.value
+        try:
+            query_option = message.query_option
+        except ValueError:
+            query_option = 0
+        if self.serves(chain_hash):
+            frames = self.channel_range_replies(chain_hash, first, number, query_option)
+        else:
+            logger.info(f"{peer} Asked for blocks {first}+{number} of a chain we do not follow")
+            frames = [
+                ReplyChannelRangeMessage.create(chain_hash, first, number, False, []).to_bytes()
+            ]
+        for frame in frames:
+            await peer.send(ReplyChannelRangeMessage.lazy_from_bytes(frame))
+        self.replies_sent += len(frames)
+
+    def channel_range_replies(
+        self, chain_hash: bytes, first: int, number: int, query_option: int = 0
+    ) -> List[bytes]:
+        """
+        reply_channel_range frames covering first to first + number in order and without gaps,
+        a run of blocks without channels being answered by a single empty reply.
+        """
+        # first + number may overflow the u32 of the last reply's number_of_blocks
+        end = min(first + number, 0xFFFFFFFF)
+        ids = self.index()
+        frames: List[bytes] = []
+        empty_from: Optional[int] = None
+        block = first
+        while block < end:
+            bucket = block - block % BUCKET_BLOCKS
+            bucket_end = min(bucket + BUCKET_BLOCKS, end)
+            lo = bisect_left(ids, block << 40)
+            hi = bisect_left(ids, bucket_end << 40)
+            if lo == hi:
+                if empty_from is None:
+                    empty_from = block
+                # Skip straight to the bucket of the next channel
+                following = block_of(ids[lo]) if lo < len(ids) else end
+                block = max(bucket_end, min(end, following - following % BUCKET_BLOCKS))
+                continue
+            if empty_from is not None:
+                frames += self.build(chain_hash, empty_from, block, ids[0:0], query_option)
+                empty_from = None
+            if block == bucket and bucket_end == bucket + BUCKET_BLOCKS:
+                frames += self.cached(chain_hash, bucket, ids[lo:hi], query_option)
+            else:
+                frames += self.build(chain_hash, block, bucket_end, ids[lo:hi], query_option)
+            block = bucket_end
+        if empty_from is not None or not frames:
+            start = first if empty_from is None else empty_from
+            frames += self.build(chain_hash, start, end, ids[0:0], query_option)
+        return frames
+
+    def cached(
+        self, chain_hash: bytes, bucket: int, short_channel_ids: array, query_option: int
+    ) -> List[bytes]:
+        key = (chain_hash, bucket, query_option)
+        entry = self.cache.get(key)
+        now = time.monotonic()
+        if (
+            entry is not None
+            and entry[0] == len(short_channel_ids)
+            and (not query_option or now - entry[1] < REPLY_CACHE_SECONDS)
+        ):
+            self.buckets_cached += 1
+            return entry[2]
+        self.buckets_built += 1
+        frames = self.build(
+            chain_hash, bucket, bucket + BUCKET_BLOCKS, short_channel_ids, query_option
+        )
+        self.cache[key] = (len(short_channel_ids), now, frames)
+        return frames
+
+    def build(
+        self, chain_hash: bytes, first: int, end: int, short_channel_ids: array, query_option: int
+    ) -> List[bytes]:
+        """
+        Encode the replies for the sorted ids of the blocks from first to end.
+
+        A block with more ids than fit in one reply is split. Every part but the last covers the
+        blocks up to and including it, and the next reply starts at the block again.
+        """
+        with_timestamps = bool(query_option & QUERY_OPTION_TIMESTAMPS)
+        with_checksums = bool(query_option & QUERY_OPTION_CHECKSUMS)
+        timestamps = checksums = None
+        if with_timestamps or with_checksums:
+            timestamps, checksums = self.graph.channel_state(short_channel_ids, chain_hash)
+        per_id = 8 + 8 * with_timestamps + 8 * with_checksums
+        limit = (MAX_FRAME_SIZE - REPLY_OVERHEAD) // per_id
+
+        frames = []
+        i = 0
+        while True:
+            j = min(i + limit, len(short_channel_ids))
+            if j == len(short_channel_ids):
+                reply_end = end
+            else:
+                # Back off to the first channel of the block, unless the reply holds only that block
+                block = block_of(short_channel_ids[j])
+                k = bisect_left(short_channel_ids, block << 40, i, j)
+                if k > i:
+                    j, reply_end = k, block
+                else:
+                    reply_end = block + 1
+            frames.append(
+                ReplyChannelRangeMessage.create(
+                    chain_hash,
+                    first,
+                    reply_end - first,
+                    True,
+                    short_channel_ids[i:j],
+                    self.encoding,
+                    timestamps[2 * i : 2 * j] if with_timestamps else None,  # pyright: ignore
+                    checksums[2 * i : 2 * j] if with_checksums else None,  # pyright: ignore
+                ).to_bytes()
+            )
+            if j == len(short_channel_ids):
+                return frames
+            i, first = j, block_of(short_channel_ids[j])
+
+    async def handle_query_short_channel_ids(self, peer: Any, message: QueryShortChannelIDsMessage):
+        self.short_channel_id_queries += 1
+        chain_hash = message.chain_hash.to_bytes()
+        if self.gossip_store is None or not self.serves(chain_hash):
+            await peer.send(ReplyShortChannelIDsMessage.create(chain_hash, False))
+            return
+        short_channel_ids = message.encoded_short_channel_ids.short_channel_ids()
+        try:
+            query_flags = message.query_flags()
+        except ValueError:
+            query_flags = None
+        if query_flags is not None and len(query_flags) != len(short_channel_ids):
+            query_flags = None
+        nodes_sent: Set[bytes] = set()
+        for i, short_channel_id in enumerate(short_channel_ids):
+            flags = QUERY_FLAGS_ALL if query_flags is None else query_flags[i]
+            for frame in self.channel_gossip(short_channel_id, flags, nodes_sent):
+                await peer.send(MessageDecoder.from_bytes(frame, lazy=True))
+                self.gossip_sent += 1
+        await peer.send(ReplyShortChannelIDsMessage.create(chain_hash, True))
+
+    def channel_gossip(self, short_channel_id: int, flags: int, nodes_sent: Set[bytes]):
+        """
+        The stored frames of a channel that flags ask for, announcement first. A node's
+        announcement is sent once per query, however many of the channels it is on.
+        """
+        store: GossipStore = self.gossip_store  # pyright: ignore
+        announcement = None
+        updates: List[Optional[bytes]] = [None, None]
+        for record in store.by_short_channel_id(short_channel_id.to_bytes(8, byteorder="big")):
+            if record.type_id == ChannelAnnouncementMessage.id:
+                announcement = record.frame
+            elif record.type_id == ChannelUpdateMessage.id:
+                direction = record.frame[CHANNEL_UPDATE_CHANNEL_FLAGS] & 1
+                updates[direction] = newest(updates[direction], record.frame)
+        if announcement is None:
+            return []
+        frames = [announcement] if flags & QUERY_ANNOUNCEMENT else []
+        for direction in (0, 1):
+            update = updates[direction]
+            if update is not None and flags & QUERY_UPDATES[direction]:
+                frames.append(update)
+        for node_id, flag in zip(announcement_node_ids(announcement), QUERY_NODES):
+            if not flags & flag or node_id in nodes_sent:
+                continue
+            nodes_sent.add(node_id)
+            latest = None
+            for record in store.by_node_id(node_id):
+                if record.type_id == NodeAnnouncementMessage.id:
+                    latest = newest(latest, record.frame)
+            if latest is not None:
+                frames.append(latest)
+        return frames
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channel_range_queries": self.range_queries,
+            "short_channel_id_queries": self.short_channel_id_queries,
+            "reply_buckets_cached": self.buckets_cached,
+            "reply_buckets_built": self.buckets_built,
+            "replies_sent": self.replies_sent,
+            "gossip_sent": self.gossip_sent,
+        }
@@ -0,0 +1,341 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.messages import ChannelAnnouncementMessage, ChannelUpdateMessage, NodeAnnouncementMessage
+
+GOSSIP_MESSAGE_TYPES = {
+    ChannelAnnouncementMessage.id,
+    NodeAnnouncementMessage.id,
+    ChannelUpdateMessage.id,
+}
+# The first two bytes of gossip frames, to spot them before decoding
+GOSSIP_TYPE_PREFIXES = {type_id.to_bytes(2, byteorder="big") for type_id in GOSSIP_MESSAGE_TYPES}
+
+# Log record: frame length, crc32 of everything after the crc, receive time, source peer node id
+RECORD_HEADER = struct.Struct(">IId33s")
+# Index entry: key kind, key (left aligned, zero padded), offset of the record in the log.
+# Packed big endian, byte order is (kind, key, offset) order.
+INDEX_ENTRY = struct.Struct(">B33sQ")
+# Index file header: magic and the log size the entries cover
+INDEX_MAGIC = b"LMPIDX\x00\x02"
+INDEX_HEADER = struct.Struct(">8sQ")
+# Index entries of appended records held in memory before being merged into the index file
+TAIL_MERGE_ENTRIES = 1 << 16
+INDEX_SHORT_CHANNEL_ID = 0
+INDEX_NODE_ID = 1
+
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Fixed offsets into raw frames, see Bolt 7
+CHANNEL_UPDATE_SCID = slice(98, 106)
+CHANNEL_UPDATE_TIMESTAMP = slice(106, 110)
+CHANNEL_UPDATE_CHANNEL_FLAGS = 111
+CHANNEL_ANNOUNCEMENT_FEATURES_LEN = 258
+NODE_ANNOUNCEMENT_FEATURES_LEN = 66
+
+
+@dataclass
+class GossipRecord:
+    """A stored frame, peer_id is all zeros when the source peer is unknown."""
+
+    offset: int
+    received_at: float
+    peer_id: bytes
+    frame: bytes
+
+    @property
+    def type_id(self) -> int:
+        return int.from_bytes(self.frame[:2], byteorder="big")
+
+
+def channel_announcement_ids(frame: bytes) -> Tuple[bytes, bytes, bytes]:
+    """short_channel_id, node_id_1 and node_id_2 of a raw channel_announcement."""
+    start = CHANNEL_ANNOUNCEMENT_FEATURES_LEN
+    scid = start + 2 + int.from_bytes(frame[start : start + 2], byteorder="big") + 32
+    return frame[scid : scid + 8], frame[scid + 8 : scid + 41], frame[scid + 41 : scid + 74]
+
+
+def index_keys(frame: bytes) -> List[Tuple[int, bytes]]:
+    """The (kind, key) index entries of a raw gossip frame, read at fixed offsets."""
+    type_id = int.from_bytes(frame[:2], byteorder="big")
+    if type_id == ChannelUpdateMessage.id:
+        return [(INDEX_SHORT_CHANNEL_ID, frame[CHANNEL_UPDATE_SCID])]
+    if type_id == ChannelAnnouncementMessage.id:
+        scid, node_id_1, node_id_2 = channel_announcement_ids(frame)
+        return [
+            (INDEX_SHORT_CHANNEL_ID, scid),
+            (INDEX_NODE_ID, node_id_1),
+            (INDEX_NODE_ID, node_id_2),
+        ]
+    if type_id == NodeAnnouncementMessage.id:
+        start = NODE_ANNOUNCEMENT_FEATURES_LEN
+        flen = int.from_bytes(frame[start : start + 2], byteorder="big")
+        node_id = start + 2 + flen + 4
+        return [(INDEX_NODE_ID, frame[node_id : node_id + 33])]
+    return []
+
+
+def gossip_timestamp(frame: bytes) -> Optional[int]:
+    """The timestamp of a raw channel_update or node_announcement, None for other frames."""
+    type_id = int.from_bytes(frame[:2], byteorder="big")
+    if type_id == ChannelUpdateMessage.id:
+        return int.from_bytes(frame[CHANNEL_UPDATE_TIMESTAMP], byteorder="big")
+    if type_id == NodeAnnouncementMessage.id:
+        start = NODE_ANNOUNCEMENT_FEATURES_LEN
+        timestamp = start + 2 + int.from_bytes(frame[start : start + 2], byteorder="big")
+        return int.from_bytes(frame[timestamp : timestamp + 4], byteorder="big")
+    return None
+
+
+class IndexEntries:
+    """The sorted entries of a mapped index file, as a sequence bisect can search."""
+
+    def __init__(self, data=b""):
+        self.data = data
+        self.count = max(len(data) - INDEX_HEADER.size, 0) // INDEX_ENTRY.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        start = INDEX_HEADER.size + i * INDEX_ENTRY.size
+        return self.data[start : start + INDEX_ENTRY.size]
+
+
+class GossipStore:
+    """
+    An append-only log of raw gossip frames with an index by short_channel_id and node_id.
+
+    The log at path holds length prefixed, checksummed records. The index at path + ".idx" holds
+    fixed size (kind, key, log offset) entries sorted by key, and the log size they cover. It is
+    mapped on open and searched by bisection, so opening costs the same whatever the store's
+    size. Entries of records appended since are held in a small in memory tail, which is merged
+    into the file once it reaches TAIL_MERGE_ENTRIES and on close.
+
+    On reopen, records past what the index covers are verified and indexed again, and records
+    which did not make it to disk completely are truncated away. A missing or damaged index is
+    rebuilt from the log.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.index_map: Optional[mmap.mmap] = None
+        self.entries = IndexEntries()
+        self.tail: Dict[bytes, List[int]] = {}
+        self.tail_entries: List[bytes] = []
+        self._mmap: Optional[mmap.mmap] = None
+        self._mmap_size = 0
+        self.open()
+
+    def open(self):
+        # Left behind by a crash during compact() or merge_index(), the originals are intact
+        for leftover in (self.path + ".compact", self.index_path + ".tmp"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        if not os.path.exists(self.path):
+            open(self.path, "wb").close()
+        self.size = self.recover_log(self.load_index())
+        self.log = open(self.path, "ab", buffering=WRITE_BUFFER_SIZE)
+        if self.tail_entries:
+            # Write out what recovery indexed, so the next open does not repeat it
+            self.merge_index()
+
+    def load_index(self) -> int:
+        """Map the index and return the log size it covers, 0 when it has to be rebuilt."""
+        self.close_index()
+        log_size = os.path.getsize(self.path)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size >= INDEX_HEADER.size and (size - INDEX_HEADER.size) % INDEX_ENTRY.size == 0:
+                    magic, indexed_to = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                    if magic == INDEX_MAGIC and indexed_to <= log_size:
+                        self.index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        self.entries = IndexEntries(self.index_map)
+                        return indexed_to
+        # Torn, of an older format, or covering more log than there is
+        return 0
+
+    def close_index(self):
+        self.entries = IndexEntries()
+        if self.index_map is not None:
+            self.index_map.close()
+            self.index_map = None
+
+    def recover_log(self, offset: int) -> int:
+        """Verify records from offset on, index them and truncate any torn tail."""
+        log_size = os.path.getsize(self.path)
+        if log_size == offset:
+            return offset
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                while offset + RECORD_HEADER.size <= log_size:
+                    length, crc, _, _ = RECORD_HEADER.unpack_from(mm, offset)
+                    end = offset + RECORD_HEADER.size + length
+                    if end > log_size or zlib.crc32(mm[offset + 8 : end]) != crc:
+                        break
+                    self.add_to_index(mm[offset + RECORD_HEADER.size : end], offset)
+                    offset = end
+        if offset != log_size:
+            os.truncate(self.path, offset)
+        return offset
+
+    def add_to_index(self, frame: bytes, offset: int):
+        for kind, key in index_keys(frame):
+            self.tail.setdefault(key, []).append(offset)
+            self.tail_entries.append(INDEX_ENTRY.pack(kind, key, offset))
+
+    def merge_index(self):
+        """Rewrite the index with the tail merged in, covering the log as it is now."""
+        # The index must not cover records which are not durable yet
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        entries, old = sorted(self.tail_entries), self.entries
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.size))
+            if not len(old):
+                f.write(b"".join(entries))
+            else:
+                # Copy the old entries in runs between the places the new ones go
+                data, position, i = old.data, INDEX_HEADER.size, 0
+                for entry in entries:
+                    i = bisect_left(old, entry, i)
+                    end = INDEX_HEADER.size + i * INDEX_ENTRY.size
+                    f.write(data[position:end])
+                    f.write(entry)
+                    position = end
+                f.write(data[position:])
+            f.flush()
+            os.fsync(f.fileno())
+        self.close_index()
+        os.replace(temporary, self.index_path)
+        self.tail, self.tail_entries = {}, []
+        self.load_index()
+
+    def lookup(self, kind: int, key: bytes) -> List[int]:
+        """Log offsets of the records with an index key, in append order."""
+        prefix = INDEX_ENTRY.pack(kind, key, 0)[:-8]
+        entries = self.entries
+        offsets = []
+        for i in range(bisect_left(entries, prefix), len(entries)):
+            entry = entries[i]
+            if entry[:-8] != prefix:
+                break
+            offsets.append(int.from_bytes(entry[-8:], byteorder="big"))
+        return offsets + self.tail.get(key, [])
+
+    def append(
+        self, frame: bytes, peer_id: bytes = b"", received_at: Optional[float] = None
+    ) -> int:
+        """Append a raw gossip frame and return the offset of its record."""
+        if int.from_bytes(frame[:2], byteorder="big") not in GOSSIP_MESSAGE_TYPES:
+            raise ValueError("Only channel_announcement, node_announcement and channel_update")
+        if received_at is None:
+            received_at = time.time()
+        body = struct.pack(">d33s", received_at, peer_id) + frame
+        offset = self.size
+        self.log.write(struct.pack(">II", len(frame), zlib.crc32(body)) + body)
+        self.size += RECORD_HEADER.size + len(frame)
+        self.add_to_index(frame, offset)
+        if len(self.tail_entries) >= TAIL_MERGE_ENTRIES:
+            self.merge_index()
+        return offset
+
+    def flush(self, sync: bool = False):
+        self.log.flush()
+        if sync:
+            os.fsync(self.log.fileno())
+
+    def close(self):
+        if self.tail_entries:
+            self.merge_index()
+        self.release()
+
+    def release(self):
+        """Close the files without writing the tail, which reopening indexes again."""
+        self.flush(sync=True)
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self.close_index()
+        self.log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def view(self) -> mmap.mmap:
+        """A read only map of the log, remapped when it has grown."""
+        if self._mmap is None or self._mmap_size != self.size:
+            self.flush()
+            if self._mmap is not None:
+                self._mmap.close()
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmap_size = self.size
+        return self._mmap
+
+    def read(self, offset: int) -> GossipRecord:
+        mm = self.view()
+        length, _, received_at, peer_id = RECORD_HEADER.unpack_from(mm, offset)
+        start = offset + RECORD_HEADER.size
+        return GossipRecord(offset, received_at, peer_id, mm[start : start + length])
+
+    def __iter__(self) -> Iterator[GossipRecord]:
+        """Stream every record in append order, without reading the file into memory."""
+        if self.size == 0:
+            return
+        offset = 0
+        end = self.size
+        while offset < end:
+            record = self.read(offset)
+            yield record
+            offset += RECORD_HEADER.size + len(record.frame)
+
+    def by_short_channel_id(self, short_channel_id: bytes) -> List[GossipRecord]:
+        """channel_announcement and channel_update records for a channel, oldest first."""
+        return [self.read(o) for o in self.lookup(INDEX_SHORT_CHANNEL_ID, short_channel_id)]
+
+    def by_node_id(self, node_id: bytes) -> List[GossipRecord]:
+        """channel_announcement and node_announcement records for a node, oldest first."""
+        return [self.read(offset) for offset in self.lookup(INDEX_NODE_ID, node_id)]
+
+    def compact(self):
+        """Rewrite the log keeping only the newest channel_update per channel direction."""
+        latest: Dict[Tuple[bytes, int], Tuple[int, int]] = {}
+        for record in self:
+            if record.type_id == ChannelUpdateMessage.id:
+                frame = record.frame
+                direction = (frame[CHANNEL_UPDATE_SCID], frame[CHANNEL_UPDATE_CHANNEL_FLAGS] & 1)
+                timestamp = int.from_bytes(frame[CHANNEL_UPDATE_TIMESTAMP], byteorder="big")
+                if direction not in latest or timestamp >= latest[direction][0]:
+                    latest[direction] = (timestamp, record.offset)
+        keep = {offset for _, offset in latest.values()}
+
+        compact_path = self.path + ".compact"
+        with open(compact_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            for record in self:
+                if record.type_id != ChannelUpdateMessage.id or record.offset in keep:
+                    body = struct.pack(">d33s", record.received_at, record.peer_id) + record.frame
+                    f.write(struct.pack(">II", len(record.frame), zlib.crc32(body)) + body)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.release()
+        # Without an index the next open rebuilds it from the log, so a crash between these steps
+        # leaves either the old or the new log, indexed correctly.
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        os.replace(compact_path, self.path)
+        self.tail, self.tail_entries = {}, []
+        self.open()
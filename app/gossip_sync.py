@@ -0,0 +1,338 @@
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Protocol, Sequence, Set, Tuple
+
+from app.gossip_store import gossip_timestamp
+from app.handlers import HandlerRegistry
+from app.logger import logger
+from app.message_elements import ENCODING_ZLIB, QUERY_OPTION_CHECKSUMS, QUERY_OPTION_TIMESTAMPS
+from app.messages import (
+    GossipChannelIDQueryFlags,
+    GossipTimestampFilterMessage,
+    Message,
+    QueryChannelRangeMessage,
+    QueryShortChannelIDsMessage,
+    ReplyChannelRangeMessage,
+    ReplyShortChannelIDsMessage,
+)
+from app.sync_marks import SyncMarks
+
+# Bitcoin mainnet genesis block hash, in the byte order Lightning uses
+BITCOIN_CHAIN_HASH = bytes.fromhex(
+    "6fe28c0ab6f1b372c1a6a246ae63f74f931e8365e15a089c68d6190000000000"
+)
+DEFAULT_FIRST_BLOCK = 0
+DEFAULT_NUMBER_OF_BLOCKS = 10**6
+DEFAULT_CHUNK_BLOCKS = 10_000
+DEFAULT_BATCH_SIZE = 2_000
+# Bolt 7 allows one query_short_channel_ids in flight per peer, raise only for peers known to cope
+DEFAULT_QUERY_WINDOW = 1
+# When resuming, blocks and gossip this far behind the marks are asked for again: channels are
+# announced some blocks after they confirm, and gossip does not arrive in timestamp order
+RESUME_BLOCK_MARGIN = 144
+RESUME_TIMESTAMP_MARGIN = 2 * 3600
+
+# query_flags for a channel we do not hold, and for each direction's channel_update alone
+QUERY_FLAGS_ALL = sum(1 << flag.value for flag in GossipChannelIDQueryFlags)
+QUERY_FLAGS_UPDATES = (
+    1 << GossipChannelIDQueryFlags.CHANNEL_UPDATES_NODE_1.value,
+    1 << GossipChannelIDQueryFlags.CHANNEL_UPDATES_NODE_2.value,
+)
+
+# Our timestamps and checksums of the channel_updates of some channels, two per channel
+ChannelState = Callable[[Sequence[int], bytes], Tuple[array, array]]
+
+
+class SyncPeer(Protocol):
+    node_id_bytes: bytes
+
+    async def send(self, message: Message): ...
+
+
+@dataclass
+class PeerSyncState:
+    # (first_block, number_of_blocks) of the query_channel_range awaiting replies
+    range_query: Optional[Tuple[int, int]] = None
+    # Ids waiting to be queried, and the batches sent and awaiting reply_short_channel_ids_end
+    short_channel_ids: Deque[int] = field(default_factory=deque)
+    queries: Deque[List[int]] = field(default_factory=deque)
+    # query_flags of queued ids which only need part of what the peer holds for them
+    query_flags: Dict[int, int] = field(default_factory=dict)
+    # Highest block of the short channel ids the peer listed
+    highest_block: int = 0
+
+
+class GossipSync:
+    """
+    Syncs the channel graph from many peers at once.
+
+    The block range is split into chunks which are handed out to peers as query_channel_range,
+    one chunk in flight per peer. Short channel ids from the replies that we do not already hold are
+    requested back from the same peer in batches of query_short_channel_ids, with up to `window`
+    batches in flight per peer.
+
+    With channel_state, range queries ask for the timestamps and checksums of the peer's
+    channel_updates. Channels we already hold are then only requested when one of their updates
+    is newer than ours and differs from it in more than its timestamp, with query_flags asking
+    for just those updates.
+
+    With marks, the sync resumes where the last one stopped: only blocks from a little before the
+    chain's block mark are queried, and each peer is sent a gossip_timestamp_filter starting a
+    little before its newest gossip timestamp, so a restart fetches what changed in the meantime
+    rather than the whole graph.
+    """
+
+    def __init__(
+        self,
+        is_known: Callable[[int], bool],
+        chain_hash: Optional[bytes] = None,
+        first_block: int = DEFAULT_FIRST_BLOCK,
+        number_of_blocks: int = DEFAULT_NUMBER_OF_BLOCKS,
+        chunk_blocks: int = DEFAULT_CHUNK_BLOCKS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        window: int = DEFAULT_QUERY_WINDOW,
+        marks: Optional[SyncMarks] = None,
+        channel_state: Optional[ChannelState] = None,
+    ):
+        self.chain_hash = chain_hash
+        self.is_known = is_known
+        self.batch_size = batch_size
+        self.window = window
+        self.first_block = first_block
+        self.end_block = first_block + number_of_blocks
+        self.chunk_blocks = chunk_blocks
+        self.pending_chunks = self.chunks(first_block)
+        self.peers: Dict[SyncPeer, PeerSyncState] = {}
+        self.requested: Set[int] = set()
+        self.chunks_done = 0
+        self.incomplete_chunks = 0
+        self.marks = marks
+        self.highest_block = 0
+        self.channel_state = channel_state
+        self.query_option = (
+            QUERY_OPTION_TIMESTAMPS | QUERY_OPTION_CHECKSUMS if channel_state is not None else 0
+        )
+        self.up_to_date = 0
+        if chain_hash is not None:
+            self.resume()
+
+    def chunks(self, first_block: int) -> Deque[Tuple[int, int]]:
+        return deque(
+            (first, min(self.chunk_blocks, self.end_block - first))
+            for first in range(first_block, self.end_block, self.chunk_blocks)
+        )
+
+    def resume(self):
+        """Skip the blocks which the chain's block mark says were synced before."""
+        if self.marks is None:
+            return
+        mark = self.marks.get(self.chain_hash)  # pyright: ignore
+        if mark is None or not mark.block:
+            return
+        first_block = max(self.first_block, mark.block - RESUME_BLOCK_MARGIN)
+        self.pending_chunks = self.chunks(first_block)
+        logger.info(f"Resuming gossip sync from block {first_block}")
+
+    @property
+    def complete(self) -> bool:
+        return not self.pending_chunks and all(
+            state.range_query is None and not state.short_channel_ids and not state.queries
+            for state in self.peers.values()
+        )
+
+    async def add_peer(self, peer: SyncPeer, chain_hash: bytes):
+        """Start syncing from a peer, the first peer decides the chain when none was given."""
+        if self.chain_hash is None:
+            self.chain_hash = chain_hash
+            self.resume()
+        if chain_hash != self.chain_hash:
+            logger.info(f"{peer} Not syncing gossip for chain {chain_hash.hex()}")
+            return
+        if peer not in self.peers:
+            self.peers[peer] = PeerSyncState()
+            await self.send_timestamp_filter(peer)
+            await self.pump(peer)
+
+    async def send_timestamp_filter(self, peer: SyncPeer):
+        """Ask a peer for the gossip since its timestamp mark, or the chain's for a new peer."""
+        if self.marks is None:
+            return
+        chain_hash: bytes = self.chain_hash  # pyright: ignore
+        mark = self.marks.get(chain_hash, peer.node_id_bytes) or self.marks.get(chain_hash)
+        if mark is None or not mark.timestamp:
+            return
+        first_timestamp = max(0, mark.timestamp - RESUME_TIMESTAMP_MARGIN)
+        await peer.send(GossipTimestampFilterMessage.create(chain_hash, first_timestamp))
+
+    def observe_gossip(self, peer: SyncPeer, frame: bytes):
+        """Raise the timestamp marks with gossip accepted from a peer."""
+        if self.marks is None or self.chain_hash is None:
+            return
+        timestamp = gossip_timestamp(frame)
+        if timestamp is not None:
+            self.marks.observe_timestamp(self.chain_hash, peer.node_id_bytes, timestamp)
+
+    def save(self):
+        if self.marks is not None:
+            self.marks.save()
+
+    async def remove_peer(self, peer: SyncPeer):
+        """Hand the peer's outstanding work to the remaining peers."""
+        state = self.peers.pop(peer, None)
+        if state is None:
+            return
+        if state.range_query is not None:
+            self.pending_chunks.appendleft(state.range_query)
+        # Unanswered ids are forgotten so they are requested again when another reply lists them
+        self.requested.difference_update(state.short_channel_ids)
+        for batch in state.queries:
+            self.requested.difference_update(batch)
+        for other in list(self.peers):
+            await self.pump(other)
+        self.save()
+
+    def subscribe(self, handlers: HandlerRegistry):
+        """
+        Handle the gossip query replies. Peers are added by PeerManager once connected, a peer
+        which sends a gossip_timestamp_filter first is added then.
+        """
+        handlers.subscribe(GossipTimestampFilterMessage.id, self.handle_gossip_timestamp_filter)
+        handlers.subscribe(ReplyChannelRangeMessage.id, self.handle_reply_channel_range)
+        handlers.subscribe(ReplyShortChannelIDsMessage.id, self.handle_reply_short_channel_ids_end)
+
+    async def handle_gossip_timestamp_filter(
+        self, peer: SyncPeer, message: GossipTimestampFilterMessage
+    ):
+        # A fallback for peers nobody added on connect, add_peer ignores peers already syncing
+        if peer not in self.peers:
+            logger.info(f"{peer} Using GossipTimestampFilterMessage to start gossip sync")
+        await self.add_peer(peer, message.chain_hash.to_bytes())
+
+    async def handle_reply_channel_range(self, peer: SyncPeer, message: ReplyChannelRangeMessage):
+        state = self.peers.get(peer)
+        if state is None or state.range_query is None:
+            return
+        short_channel_ids = message.encoded_short_channel_ids.short_channel_ids()
+        remote = self.remote_state(message, len(short_channel_ids))
+        if remote is not None:
+            self.queue_stale(state, short_channel_ids, *remote)
+        else:
+            for short_channel_id in short_channel_ids:
+                if short_channel_id not in self.requested and not self.is_known(short_channel_id):
+                    self.requested.add(short_channel_id)
+                    state.short_channel_ids.append(short_channel_id)
+        if short_channel_ids:
+            state.highest_block = max(state.highest_block, max(short_channel_ids) >> 40)
+
+        first, number = state.range_query
+        reply_end = message.first_block_num.value + message.number_of_blocks.value
+        if reply_end >= first + number:
+            state.range_query = None
+            self.chunks_done += 1
+            if message.sync_complete.data != b"\x01":
+                self.incomplete_chunks += 1
+                logger.info(f"{peer} Does not hold complete gossip for blocks {first}+{number}")
+            if self.marks is not None and state.highest_block:
+                self.marks.observe_block(
+                    message.chain_hash.to_bytes(), peer.node_id_bytes, state.highest_block
+                )
+            self.highest_block = max(self.highest_block, state.highest_block)
+        await self.pump(peer)
+        self.mark_complete()
+
+    def remote_state(
+        self, message: ReplyChannelRangeMessage, count: int
+    ) -> Optional[Tuple[array, Optional[array]]]:
+        """The peer's timestamps and checksums when we asked for them and they are usable."""
+        if self.channel_state is None:
+            return None
+        try:
+            timestamps = message.timestamps()
+            checksums = message.checksums()
+        except ValueError:
+            return None
+        if timestamps is None or len(timestamps) != 2 * count:
+            return None
+        if checksums is not None and len(checksums) != 2 * count:
+            checksums = None
+        return timestamps, checksums
+
+    def queue_stale(
+        self,
+        state: PeerSyncState,
+        short_channel_ids: array,
+        timestamps: array,
+        checksums: Optional[array],
+    ):
+        """Queue the channels we lack in full, and the updates of others which changed."""
+        local_timestamps, local_checksums = self.channel_state(  # pyright: ignore
+            short_channel_ids,
+            self.chain_hash,  # pyright: ignore
+        )
+        for i, short_channel_id in enumerate(short_channel_ids):
+            if short_channel_id in self.requested:
+                continue
+            if not self.is_known(short_channel_id):
+                flags = QUERY_FLAGS_ALL
+            else:
+                flags = 0
+                for direction in (0, 1):
+                    j = 2 * i + direction
+                    if timestamps[j] > local_timestamps[j] and (
+                        checksums is None or checksums[j] != local_checksums[j]
+                    ):
+                        flags |= QUERY_FLAGS_UPDATES[direction]
+                if not flags:
+                    self.up_to_date += 1
+                    continue
+            self.requested.add(short_channel_id)
+            state.short_channel_ids.append(short_channel_id)
+            state.query_flags[short_channel_id] = flags
+
+    async def handle_reply_short_channel_ids_end(
+        self, peer: SyncPeer, message: ReplyShortChannelIDsMessage
+    ):
+        state = self.peers.get(peer)
+        if state is None or not state.queries:
+            return
+        state.queries.popleft()
+        await self.pump(peer)
+        self.mark_complete()
+
+    def mark_complete(self):
+        """Once everything was queried and answered, the chain is synced up to the highest block."""
+        if self.marks is None or not self.highest_block or not self.complete:
+            return
+        self.marks.observe_block(self.chain_hash, None, self.highest_block)  # pyright: ignore
+        self.save()
+
+    async def pump(self, peer: SyncPeer):
+        """Send the peer as much work as its windows allow."""
+        state = self.peers[peer]
+        chain_hash: bytes = self.chain_hash  # pyright: ignore
+        while state.short_channel_ids and len(state.queries) < self.window:
+            count = min(self.batch_size, len(state.short_channel_ids))
+            batch = [state.short_channel_ids.popleft() for _ in range(count)]
+            state.queries.append(batch)
+            flags = None
+            if state.query_flags:
+                flags = [state.query_flags.pop(scid, QUERY_FLAGS_ALL) for scid in batch]
+            await peer.send(
+                QueryShortChannelIDsMessage.create(chain_hash, batch, ENCODING_ZLIB, flags)
+            )
+        if state.range_query is None and self.pending_chunks:
+            state.range_query = self.pending_chunks.popleft()
+            await peer.send(
+                QueryChannelRangeMessage.create(chain_hash, *state.range_query, self.query_option)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "chunks_pending": len(self.pending_chunks),
+            "chunks_done": self.chunks_done,
+            "incomplete_chunks": self.incomplete_chunks,
+            "short_channel_ids_requested": len(self.requested),
+            "short_channel_ids_queued": sum(len(s.short_channel_ids) for s in self.peers.values()),
+            "short_channel_ids_up_to_date": self.up_to_date,
+        }
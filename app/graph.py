@@ -0,0 +1,319 @@
+import struct
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Self, Tuple
+
+from app.checksums import crc32c_many
+from app.gossip_store import NODE_ANNOUNCEMENT_FEATURES_LEN, GossipStore
+from app.message_decoder import MessageDecoder
+from app.messages import (
+    ChannelAnnouncementMessage,
+    ChannelUpdateMessage,
+    Message,
+    NodeAnnouncementMessage,
+)
+from app.node_table import NodeInfo, NodeTable
+
+# The checksummed part of a channel_update (see app.checksums) rebuilt from the graph columns,
+# htlc_maximum_msat is left out of updates whose message_flags do not have it
+CHECKSUMMED_UPDATE = struct.Struct(">32sQBBHQIIQ")
+CHECKSUMMED_UPDATE_NO_MAXIMUM = struct.Struct(">32sQBBHQII")
+
+
+@dataclass
+class ChannelDirection:
+    """A snapshot of one direction of a channel, built on request from the graph columns."""
+
+    short_channel_id: int
+    direction: int
+    timestamp: int
+    message_flags: int
+    channel_flags: int
+    cltv_expiry_delta: int
+    htlc_minimum_msat: int
+    fee_base_msat: int
+    fee_proportional_millionths: int
+    htlc_maximum_msat: int
+
+
+def node_announcement_fields(frame: bytes) -> Tuple[int, bytes, bytes, int, bytes, bytes]:
+    """
+    Read (timestamp, node_id, features, rgb_color, alias, addresses) from a raw node_announcement
+    frame, addresses being the undecoded descriptors. Raises ValueError when the frame is too short
+    to hold them.
+    """
+    start = NODE_ANNOUNCEMENT_FEATURES_LEN
+    features = start + 2
+    timestamp = features + int.from_bytes(frame[start:features], byteorder="big")
+    node_id = timestamp + 4
+    rgb_color = node_id + 33
+    alias = rgb_color + 3
+    addresses = alias + 32 + 2
+    end = addresses + int.from_bytes(frame[alias + 32 : addresses], byteorder="big")
+    if end > len(frame):
+        raise ValueError(f"node_announcement of {len(frame)} bytes is truncated, needs {end}")
+    return (
+        int.from_bytes(frame[timestamp:node_id], byteorder="big"),
+        frame[node_id:rgb_color],
+        frame[features:timestamp],
+        int.from_bytes(frame[rgb_color:alias], byteorder="big"),
+        frame[alias : alias + 32],
+        frame[addresses:end],
+    )
+
+
+class NetworkGraph:
+    """
+    The channel graph learned from gossip.
+
+    Nodes are interned to integer ids by a NodeTable, which also holds their announcements. The
+    graph is shared by every peer, so its table is the one node id table of the process.
+    Channels and their two directions live in typed arrays indexed by channel number (directions
+    at 2 * channel + direction), so memory per channel is a few dozen bytes of columns plus one
+    dict entry for the short_channel_id lookup.
+    """
+
+    def __init__(self):
+        # Nodes
+        self.nodes = NodeTable()
+        self.node_ids = self.nodes.ids
+        self.node_index = self.nodes.index
+        self.node_timestamps = self.nodes.timestamps
+        self.node_channels: List[array] = []
+        # Channels
+        self.channel_index: Dict[int, int] = {}
+        self.short_channel_ids = array("Q")
+        self.node_1 = array("I")
+        self.node_2 = array("I")
+        # Channel directions
+        self.timestamps = array("I")
+        self.message_flags = array("B")
+        self.channel_flags = array("B")
+        self.cltv_expiry_deltas = array("H")
+        self.htlc_minimum_msat = array("Q")
+        self.fee_base_msat = array("I")
+        self.fee_proportional_millionths = array("I")
+        self.htlc_maximum_msat = array("Q")
+        self.direction_columns = (
+            self.timestamps,
+            self.message_flags,
+            self.channel_flags,
+            self.cltv_expiry_deltas,
+            self.htlc_minimum_msat,
+            self.fee_base_msat,
+            self.fee_proportional_millionths,
+            self.htlc_maximum_msat,
+        )
+
+    @classmethod
+    def from_gossip_store(cls, store: GossipStore) -> Self:
+        """Build the graph from every record of a gossip store, in the order they were received."""
+        graph = cls()
+        for record in store:
+            graph.ingest(MessageDecoder.from_bytes(record.frame, lazy=True))
+        return graph
+
+    def __len__(self) -> int:
+        return len(self.short_channel_ids)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    def intern_node(self, node_id: bytes) -> int:
+        index = self.nodes.intern(node_id)
+        if index == len(self.node_channels):
+            self.node_channels.append(array("I"))
+        return index
+
+    def apply(self, summary: Tuple) -> bool:
+        """Apply a (type id, *fields) summary as made by app.pipeline.summarize."""
+        type_id = summary[0]
+        if type_id == ChannelAnnouncementMessage.id:
+            return self.add_channel(*summary[1:])
+        if type_id == ChannelUpdateMessage.id:
+            return self.update_direction(*summary[1:])
+        if type_id == NodeAnnouncementMessage.id:
+            return self.add_node_announcement(*summary[1:])
+        return False
+
+    def ingest(self, message: Message) -> bool:
+        """Add a gossip message to the graph, returns whether the graph changed."""
+        if message.id == ChannelAnnouncementMessage.id:
+            return self.add_channel_announcement(message)
+        if message.id == ChannelUpdateMessage.id:
+            return self.add_channel_update(message)
+        if message.id == NodeAnnouncementMessage.id:
+            try:
+                fields = node_announcement_fields(message.to_bytes())
+            except ValueError:
+                return False
+            return self.add_node_announcement(*fields)
+        return False
+
+    def add_channel_announcement(self, message: Message) -> bool:
+        return self.add_channel(
+            int.from_bytes(message.short_channel_id.data, byteorder="big"),
+            message.node_id_1.data,
+            message.node_id_2.data,
+        )
+
+    def add_channel(self, short_channel_id: int, node_id_1: bytes, node_id_2: bytes) -> bool:
+        if short_channel_id in self.channel_index:
+            return False
+        channel = len(self.short_channel_ids)
+        node_1 = self.intern_node(node_id_1)
+        node_2 = self.intern_node(node_id_2)
+        self.channel_index[short_channel_id] = channel
+        self.short_channel_ids.append(short_channel_id)
+        self.node_1.append(node_1)
+        self.node_2.append(node_2)
+        self.node_channels[node_1].append(channel)
+        self.node_channels[node_2].append(channel)
+        for column in self.direction_columns:
+            column.extend((0, 0))
+        return True
+
+    def add_channel_update(self, message: Message) -> bool:
+        return self.update_direction(
+            int.from_bytes(message.short_channel_id.data, byteorder="big"),
+            message.timestamp.value,
+            message.message_flags.data[0],
+            message.channel_flags.data[0],
+            message.cltv_expiry_delta.num_bytes,
+            message.htlc_minimum_msat.value,
+            message.fee_base_msat.value,
+            message.fee_proportional_millionths.value,
+            message.htlc_maximum_msat.value,
+        )
+
+    def update_direction(
+        self,
+        short_channel_id: int,
+        timestamp: int,
+        message_flags: int,
+        channel_flags: int,
+        cltv_expiry_delta: int,
+        htlc_minimum_msat: int,
+        fee_base_msat: int,
+        fee_proportional_millionths: int,
+        htlc_maximum_msat: int,
+    ) -> bool:
+        """Apply a channel_update if its channel is known and it is newer than what we hold."""
+        channel = self.channel_index.get(short_channel_id)
+        if channel is None:
+            return False
+        i = 2 * channel + (channel_flags & 1)
+        if timestamp <= self.timestamps[i]:
+            return False
+        self.timestamps[i] = timestamp
+        self.message_flags[i] = message_flags
+        self.channel_flags[i] = channel_flags
+        self.cltv_expiry_deltas[i] = cltv_expiry_delta
+        self.htlc_minimum_msat[i] = htlc_minimum_msat
+        self.fee_base_msat[i] = fee_base_msat
+        self.fee_proportional_millionths[i] = fee_proportional_millionths
+        self.htlc_maximum_msat[i] = htlc_maximum_msat
+        return True
+
+    def add_node_announcement(
+        self,
+        timestamp: int,
+        node_id: bytes,
+        features: bytes = b"",
+        rgb_color: int = 0,
+        alias: bytes = b"",
+        addresses: bytes = b"",
+    ) -> bool:
+        """Record a node_announcement for a node which has an announced channel."""
+        node = self.nodes.get(node_id)
+        if node is None:
+            return False
+        return self.nodes.announce(node, timestamp, features, rgb_color, alias, addresses)
+
+    def has_channel(self, short_channel_id: int) -> bool:
+        return short_channel_id in self.channel_index
+
+    def direction(self, short_channel_id: int, direction: int) -> Optional[ChannelDirection]:
+        """One direction of a channel, None when no channel_update has been seen for it."""
+        channel = self.channel_index.get(short_channel_id)
+        if channel is None:
+            return None
+        i = 2 * channel + direction
+        if self.timestamps[i] == 0:
+            return None
+        return ChannelDirection(
+            short_channel_id,
+            direction,
+            self.timestamps[i],
+            self.message_flags[i],
+            self.channel_flags[i],
+            self.cltv_expiry_deltas[i],
+            self.htlc_minimum_msat[i],
+            self.fee_base_msat[i],
+            self.fee_proportional_millionths[i],
+            self.htlc_maximum_msat[i],
+        )
+
+    def node(self, node_id: bytes) -> Optional[NodeInfo]:
+        """The latest node_announcement of a node, None when none has been seen."""
+        node = self.nodes.get(node_id)
+        return None if node is None else self.nodes.info(node)
+
+    def channel_state(
+        self, short_channel_ids: Iterable[int], chain_hash: bytes
+    ) -> Tuple[array, array]:
+        """
+        The timestamps and checksums of the channel_updates we hold, two per short channel id
+        as in reply_channel_range, zero for directions or channels we have no update for.
+
+        Updates are rebuilt from the columns and checksummed in one batch. Fields of an update
+        which the graph does not keep, like unknown trailing bytes, are not covered, so such an
+        update looks stale to a peer comparing checksums and is fetched again.
+        """
+        timestamps = array("I")
+        rows, positions = [], []
+        for short_channel_id in short_channel_ids:
+            channel = self.channel_index.get(short_channel_id)
+            for direction in (0, 1):
+                timestamp = 0
+                if channel is not None:
+                    i = 2 * channel + direction
+                    timestamp = self.timestamps[i]
+                    if timestamp:
+                        positions.append(len(timestamps))
+                        rows.append(self.checksummed_update(i, short_channel_id, chain_hash))
+                timestamps.append(timestamp)
+        checksums = array("I", bytes(4 * len(timestamps)))
+        for position, checksum in zip(positions, crc32c_many(rows)):
+            checksums[position] = checksum
+        return timestamps, checksums
+
+    def checksummed_update(self, i: int, short_channel_id: int, chain_hash: bytes) -> bytes:
+        values = (
+            chain_hash,
+            short_channel_id,
+            self.message_flags[i],
+            self.channel_flags[i],
+            self.cltv_expiry_deltas[i],
+            self.htlc_minimum_msat[i],
+            self.fee_base_msat[i],
+            self.fee_proportional_millionths[i],
+        )
+        if self.message_flags[i] & 1:
+            return CHECKSUMMED_UPDATE.pack(*values, self.htlc_maximum_msat[i])
+        return CHECKSUMMED_UPDATE_NO_MAXIMUM.pack(*values)
+
+    def nodes_of(self, short_channel_id: int) -> Tuple[bytes, bytes]:
+        channel = self.channel_index[short_channel_id]
+        return self.node_ids[self.node_1[channel]], self.node_ids[self.node_2[channel]]
+
+    def neighbors(self, node_id: bytes) -> Iterator[Tuple[int, bytes]]:
+        """Yields (short_channel_id, peer node_id) for every channel of a node."""
+        node = self.node_index.get(node_id)
+        if node is None:
+            return
+        node_1, node_2, node_ids = self.node_1, self.node_2, self.node_ids
+        for channel in self.node_channels[node]:
+            other = node_2[channel] if node_1[channel] == node else node_1[channel]
+            yield self.short_channel_ids[channel], node_ids[other]
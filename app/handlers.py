@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+
+from app.messages import Message, MessageProperty
+
+# An async handler is called with the peer the message came from and the decoded message
+Handler = Callable[[Any, Message], Awaitable[None]]
+# A prefilter sees the raw frame before anything is decoded, and returns False to skip the handler
+Prefilter = Callable[[bytes], bool]
+
+
+def field_slice(message_class: Type[Message], key: MessageProperty) -> slice:
+    """Where a fixed width field sits in the frames of a message class, for prefilters."""
+    _, start, end = message_class.codec().prefix_offsets[key]
+    return slice(start, end)
+
+
+@dataclass
+class Subscription:
+    handler: Handler
+    prefilter: Optional[Prefilter] = None
+
+
+class HandlerRegistry:
+    """
+    Routes inbound frames to the async handlers subscribed to their type id.
+
+    A frame is decoded only when at least one of its handlers wants it: types nobody subscribed
+    to are counted in discarded and dropped, and frames every prefilter rejects are counted in
+    filtered, in both cases without building a Message.
+    """
+
+    def __init__(self):
+        self.subscriptions: Dict[int, List[Subscription]] = {}
+        self.discarded: Dict[int, int] = {}
+        self.filtered: Dict[int, int] = {}
+
+    def subscribe(self, type_id: int, handler: Handler, prefilter: Optional[Prefilter] = None):
+        self.subscriptions.setdefault(type_id, []).append(Subscription(handler, prefilter))
+
+    def unsubscribe(self, type_id: int, handler: Handler):
+        subscriptions = [s for s in self.subscriptions.get(type_id, []) if s.handler != handler]
+        if subscriptions:
+            self.subscriptions[type_id] = subscriptions
+        else:
+            self.subscriptions.pop(type_id, None)
+
+    def is_subscribed(self, type_id: int) -> bool:
+        return type_id in self.subscriptions
+
+    async def dispatch(
+        self,
+        peer: Any,
+        frame: bytes,
+        decode: Callable[[bytes], Message],
+        skip: Optional[Handler] = None,
+    ) -> Optional[Message]:
+        """
+        Call the handlers of a frame, returning the message when it was decoded.
+
+        A skip handler is left out, for a frame its work was already handed to elsewhere.
+        """
+        type_id = int.from_bytes(frame[:2], byteorder="big")
+        subscriptions = self.subscriptions.get(type_id)
+        if subscriptions is None:
+            self.discarded[type_id] = self.discarded.get(type_id, 0) + 1
+            return None
+        if skip is not None:
+            subscriptions = [s for s in subscriptions if s.handler != skip]
+            if not subscriptions:
+                return None
+        message = None
+        for subscription in subscriptions:
+            if subscription.prefilter is not None and not subscription.prefilter(frame):
+                continue
+            if message is None:
+                message = decode(frame)
+            await subscription.handler(peer, message)
+        if message is None:
+            self.filtered[type_id] = self.filtered.get(type_id, 0) + 1
+        return message
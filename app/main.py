@@ -1,20 +1,59 @@
 import asyncio
 import signal
 
-from app.peer import PeerConnection
+from app.capture import CaptureWriter
+from app.dedup import GossipDeduplicator
+from app.gossip_server import GossipServer
+from app.gossip_store import GossipStore
+from app.gossip_sync import GossipSync
+from app.graph import NetworkGraph
+from app.metrics import Metrics, MetricsServer
+from app.peer_manager import PeerManager
+from app.pipeline import DecodePipeline
+from app.sync_marks import SyncMarks
 from app.util import generate_private_key, parse_args
+from app.verify import GossipVerifier
 
 
 async def main():
-    peers = []
     args = parse_args()
     private_key = generate_private_key()
 
-    peer = PeerConnection(args.host, private_key)
-    peer.send_init()
-    peers.append(peer)
-
-    asyncio.create_task(peer.start())
+    gossip_store = GossipStore(args.gossip_store) if args.gossip_store else None
+    # The graph starts from what the store already holds, so a resumed sync only adds to it
+    graph = NetworkGraph.from_gossip_store(gossip_store) if gossip_store else NetworkGraph()
+    marks = SyncMarks(args.sync_state) if args.sync_state else None
+    verifier = pipeline = None
+    if args.decode_workers:
+        # The workers check signatures as they decode, no separate verifier is needed
+        channel_nodes = graph.nodes_of if args.verify_signatures else None
+        pipeline = DecodePipeline(args.decode_workers, channel_nodes=channel_nodes)
+    elif args.verify_signatures:
+        verifier = GossipVerifier(graph.nodes_of)
+    metrics = Metrics() if args.metrics_port is not None else None
+    capture = CaptureWriter(args.capture) if args.capture else None
+    gossip_server = GossipServer(graph, gossip_store) if args.serve_gossip else None
+    manager = PeerManager(
+        private_key,
+        max_dialing=args.max_dialing,
+        handshake_timeout=args.handshake_timeout,
+        gossip_store=gossip_store,
+        graph=graph,
+        gossip_sync=GossipSync(graph.has_channel, marks=marks, channel_state=graph.channel_state),
+        dedup=GossipDeduplicator(args.dedup_entries, channel_known=graph.has_channel),
+        verifier=verifier,
+        pipeline=pipeline,
+        metrics=metrics,
+        capture=capture,
+        gossip_server=gossip_server,
+    )
+    for host in args.hosts:
+        manager.add(host)
+    await manager.start()
+    metrics_server = None
+    if metrics is not None:
+        metrics_server = MetricsServer(metrics, port=args.metrics_port)
+        await metrics_server.start()
     stop_event = asyncio.Event()
 
     def handle_exit():
@@ -27,6 +66,17 @@ async def main():
 
     try:
         await stop_event.wait()
+        await manager.stop()
+        if metrics_server is not None:
+            await metrics_server.close()
+        if verifier is not None:
+            verifier.close()
+        if pipeline is not None:
+            pipeline.close()
+        if gossip_store is not None:
+            gossip_store.close()
+        if capture is not None:
+            capture.close()
     finally:
         # Just kill all the tasks
         tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
@@ -9,7 +9,7 @@ from app.messages import Message
 def build_message_map():
     message_map = {}
     for _, obj in inspect.getmembers(sys.modules[__name__], inspect.isclass):
-        if issubclass(obj, Message) and hasattr(obj, "id"):
+        if issubclass(obj, Message) and isinstance(obj.id, int):
             message_map[obj.id] = obj
     return message_map
 
@@ -19,10 +19,10 @@ MESSAGE_MAP = build_message_map()
 
 class MessageDecoder:
     @classmethod
-    def from_bytes(cls, data: bytes):
+    def from_bytes(cls, data: bytes, lazy: bool = False):
+        """Decode a message, or with lazy=True wrap it so fields are decoded on first access."""
         message_type = int.from_bytes(data[:2], byteorder="big")
-        message_class = MESSAGE_MAP.get(message_type)
-        if message_class:
-            return message_class.from_bytes(data)
-        else:
-            return Message.from_bytes(data)
+        message_class = MESSAGE_MAP.get(message_type, Message)
+        if lazy:
+            return message_class.lazy_from_bytes(data)
+        return message_class.from_bytes(data)
@@ -1,11 +1,27 @@
-from dataclasses import dataclass
-from typing import Self
-
+import base64
+import ipaddress
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Self, Tuple
+
+# Record types of the init message TLV stream
 TLV_MESSAGE_TYPES = {
     1: "networks",
     3: "remote_addr",
 }
 
+# Encoding types for encoded_short_ids and the other encoded gossip query fields
+ENCODING_UNCOMPRESSED = 0
+ENCODING_ZLIB = 1
+# Bound on the decompressed size of zlib encoded short channel ids (1M ids)
+MAX_DECODED_SHORT_CHANNEL_IDS_BYTES = 8 << 20
+
+# query_option bits of query_channel_range, see Bolt 7
+QUERY_OPTION_TIMESTAMPS = 1
+QUERY_OPTION_CHECKSUMS = 2
+
 # https://github.com/lightning/bolts/blob/master/02-peer-protocol.md
 LIGHTNING_MESSAGE_TYPES = {
     1: "warning",
@@ -60,210 +76,665 @@ LIGHTNING_MESSAGE_TYPES = {
 }
 
 
-@dataclass
+# Elements are slotted, a held message keeps a dozen of them and a __dict__ each would dominate
+@dataclass(slots=True)
 class SerializedElement:
     key = "serialized_element"
+    # struct module format of the element when it has a fixed width, None when variable length
+    struct_format = None
 
     @classmethod
     def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
         """Deserialize the element and then return remaining data as a slice"""
+        el, offset = cls.from_view(memoryview(data), 0)
+        return (el, data[offset:])
+
+    @classmethod
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        """Deserialize the element starting at offset and return the offset just past it.
+
+        Only the bytes that the element keeps are copied out of the view."""
         raise NotImplementedError("Subclasses must implement this method")
 
     def to_bytes(self) -> bytes:
         """Serialize the element and then return the bytes"""
         raise NotImplementedError("Subclasses must implement this method")
 
+    @classmethod
+    def skip(cls, view: memoryview, offset: int) -> int:
+        """Return the offset just past the element starting at offset, without keeping it."""
+        return cls.from_view(view, offset)[1]
+
+    @classmethod
+    def from_struct(cls, value) -> Self:
+        """Build the element from the value unpacked with struct_format."""
+        return cls(value)  # pyright: ignore
+
+    def struct_value(self):
+        """The value to pack with struct_format."""
+        raise NotImplementedError("Fixed width subclasses must implement this method")
+
+    def write_parts(self, parts: List[bytes]):
+        """Append the serialized element to parts, which the caller joins once per message."""
+        parts.append(self.to_bytes())
 
-@dataclass
+
+@dataclass(slots=True)
 class MessageTypeElement(SerializedElement):
     """The initial type of a message, stored in the first two bytes of the message"""
 
     key = "message_type"
+    struct_format = "H"
     id: int
     name: str
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        id = int.from_bytes(data[:2], byteorder="big")
+    def from_struct(cls, value) -> Self:
+        return cls(id=value, name=LIGHTNING_MESSAGE_TYPES.get(value, "unknown"))
+
+    def struct_value(self):
+        return self.id
+
+    @classmethod
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        id = int.from_bytes(view[offset : offset + 2], byteorder="big")
         name = LIGHTNING_MESSAGE_TYPES.get(id, "unknown")
-        return (cls(id=id, name=name), data[2:])
+        return (cls(id=id, name=name), offset + 2)
 
     def to_bytes(self) -> bytes:
         return self.id.to_bytes(2, byteorder="big")
 
 
-@dataclass
+@dataclass(slots=True)
 class SingleByteElement(SerializedElement):
     """A single byte element."""
 
     key = "single_byte_element"
+    struct_format = "1s"
     data: bytes
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        signature = data[:1]
-        return (cls(data=signature), data[1:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        return (cls(data=bytes(view[offset : offset + 1])), offset + 1)
 
     def to_bytes(self) -> bytes:
         return bytes(self.data)
 
+    def struct_value(self):
+        return self.data
 
-@dataclass
+
+@dataclass(slots=True)
 class Fixed8BytesElement(SerializedElement):
     """A fixed 8 byte element."""
 
     key = "bytes_8_element"
+    struct_format = "8s"
     data: bytes
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        signature = data[:8]
-        return (cls(data=signature), data[8:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        return (cls(data=bytes(view[offset : offset + 8])), offset + 8)
 
     def to_bytes(self) -> bytes:
         return bytes(self.data)
 
+    def struct_value(self):
+        return self.data
+
 
 class ShortChannelIDElement(Fixed8BytesElement):
-    pass
+    __slots__ = ()
+
+
+@dataclass(slots=True)
+class RgbColorElement(SerializedElement):
+    """The 3 byte rgb_color of a node_announcement."""
 
+    key = "rgb_color"
+    struct_format = "3s"
+    data: bytes
+
+    @classmethod
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        return (cls(data=bytes(view[offset : offset + 3])), offset + 3)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.data)
 
-@dataclass
+    def struct_value(self):
+        return self.data
+
+    @property
+    def value(self) -> int:
+        return int.from_bytes(self.data, byteorder="big")
+
+
+@dataclass(slots=True)
 class Fixed32BytesElement(SerializedElement):
     """A fixed 32 byte element."""
 
     key = "bytes_32_element"
+    struct_format = "32s"
     data: bytes
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        signature = data[:32]
-        return (cls(data=signature), data[32:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        return (cls(data=bytes(view[offset : offset + 32])), offset + 32)
 
     def to_bytes(self) -> bytes:
         return bytes(self.data)
 
+    def struct_value(self):
+        return self.data
+
 
 class ChainHashElement(Fixed32BytesElement):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+class AliasElement(Fixed32BytesElement):
+    """A node alias, UTF-8 padded with zero bytes to 32 bytes."""
+
+    __slots__ = ()
+
+    @property
+    def text(self) -> str:
+        return bytes(self.data).rstrip(b"\x00").decode("utf-8", errors="replace")
+
+
+@dataclass(slots=True)
 class Fixed33BytesElement(SerializedElement):
     """A fixed 33 byte element."""
 
     key = "bytes_33_element"
+    struct_format = "33s"
     data: bytes
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        signature = data[:33]
-        return (cls(data=signature), data[33:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        return (cls(data=bytes(view[offset : offset + 33])), offset + 33)
 
     def to_bytes(self) -> bytes:
         return bytes(self.data)
 
+    def struct_value(self):
+        return self.data
+
 
 class PointElement(Fixed33BytesElement):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class Fixed64BytesElement(SerializedElement):
     """A fixed 64 byte element."""
 
     key = "bytes_64_element"
+    struct_format = "64s"
     data: bytes
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        signature = data[:64]
-        return (cls(data=signature), data[64:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        return (cls(data=bytes(view[offset : offset + 64])), offset + 64)
 
     def to_bytes(self) -> bytes:
         return bytes(self.data)
 
+    def struct_value(self):
+        return self.data
+
 
 class SignatureElement(Fixed64BytesElement):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class U16VarBytesElement(SerializedElement):
     num_bytes: int
     data: bytes
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        num_bytes = int.from_bytes(data[:2], byteorder="big")
-        bytes_data = data[2 : 2 + num_bytes]
-        return (cls(num_bytes, bytes_data), data[2 + num_bytes :])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        num_bytes = int.from_bytes(view[offset : offset + 2], byteorder="big")
+        start = offset + 2
+        return (cls(num_bytes, bytes(view[start : start + num_bytes])), start + num_bytes)
+
+    @classmethod
+    def skip(cls, view: memoryview, offset: int) -> int:
+        return offset + 2 + int.from_bytes(view[offset : offset + 2], byteorder="big")
 
     def to_bytes(self) -> bytes:
         return self.num_bytes.to_bytes(2, byteorder="big") + bytes(self.data)
 
+    def write_parts(self, parts: List[bytes]):
+        # The data goes in as is, so it is only copied by the final join
+        parts.append(self.num_bytes.to_bytes(2, byteorder="big"))
+        parts.append(self.data)
+
+
+def encode_with_type(encoded: bytes, encoding: int) -> bytes:
+    """Prefix encoded gossip query data with its encoding type, compressing it for zlib."""
+    if encoding == ENCODING_ZLIB:
+        encoded = zlib.compress(encoded)
+    elif encoding != ENCODING_UNCOMPRESSED:
+        raise ValueError(f"Unknown encoding {encoding}")
+    return bytes([encoding]) + encoded
+
+
+def decode_with_type(data: bytes, limit: int = MAX_DECODED_SHORT_CHANNEL_IDS_BYTES) -> bytes:
+    """The payload of data prefixed by an encoding type, at most limit bytes once decompressed."""
+    encoded = data[1:]
+    if data[0] == ENCODING_ZLIB:
+        decompressor = zlib.decompressobj()
+        encoded = decompressor.decompress(encoded, limit)
+        if decompressor.unconsumed_tail:
+            raise ValueError("Encoded data is too large")
+    elif data[0] != ENCODING_UNCOMPRESSED:
+        raise ValueError(f"Unknown encoding {data[0]}")
+    return encoded
+
+
+def pack_big_endian(typecode: str, values: Iterable[int]) -> bytes:
+    items = array(typecode, values)
+    if sys.byteorder == "little":
+        items.byteswap()
+    return items.tobytes()
+
+
+def unpack_big_endian(typecode: str, data: bytes) -> array:
+    items = array(typecode)
+    if len(data) % items.itemsize:
+        raise ValueError(f"Data is not a multiple of {items.itemsize} bytes")
+    items.frombytes(data)
+    if sys.byteorder == "little":
+        items.byteswap()
+    return items
+
 
 class GlobalFeaturesElement(U16VarBytesElement):
-    pass
+    __slots__ = ()
 
 
 class LocalFeaturesElement(U16VarBytesElement):
-    pass
+    __slots__ = ()
 
 
 class EncodedShortChannelIdsElement(U16VarBytesElement):
-    pass
+    """
+    A list of short channel ids, prefixed by an encoding type byte.
+
+    See [encoded_short_ids](https://github.com/lightning/bolts/blob/master/07-routing-gossip.md#query-messages) in Bolt 7.
+    """
+
+    __slots__ = ()
 
+    @classmethod
+    def create(
+        cls, short_channel_ids: Iterable[int], encoding: int = ENCODING_UNCOMPRESSED
+    ) -> Self:
+        data = encode_with_type(pack_big_endian("Q", short_channel_ids), encoding)
+        return cls(len(data), data)
+
+    @property
+    def encoding(self) -> Optional[int]:
+        """The encoding type, None for an empty list which carries no encoding byte."""
+        return self.data[0] if self.data else None
+
+    def short_channel_ids(self) -> array:
+        """Decode the ids into an array('Q'), decompressing them when zlib encoded."""
+        if not self.data:
+            return array("Q")
+        return unpack_big_endian("Q", decode_with_type(self.data))
+
+
+# Address descriptor types of node_announcement, see Bolt 7
+ADDRESS_IPV4 = 1
+ADDRESS_IPV6 = 2
+ADDRESS_TOR_V2 = 3
+ADDRESS_TOR_V3 = 4
+ADDRESS_DNS = 5
+# Length of the address of each fixed length descriptor type, the port follows it
+ADDRESS_LENGTHS = {ADDRESS_IPV4: 4, ADDRESS_IPV6: 16, ADDRESS_TOR_V2: 10, ADDRESS_TOR_V3: 35}
+
+
+class Address(NamedTuple):
+    """One address descriptor of a node_announcement."""
+
+    type: int
+    host: str
+    port: int
+
+    def __str__(self):
+        return (
+            f"[{self.host}]:{self.port}"
+            if self.type == ADDRESS_IPV6
+            else f"{self.host}:{self.port}"
+        )
+
+    def to_bytes(self) -> bytes:
+        if self.type == ADDRESS_IPV4 or self.type == ADDRESS_IPV6:
+            address = ipaddress.ip_address(self.host).packed
+        elif self.type == ADDRESS_TOR_V2 or self.type == ADDRESS_TOR_V3:
+            address = base64.b32decode(self.host.removesuffix(".onion").upper())
+        elif self.type == ADDRESS_DNS:
+            hostname = self.host.encode("ascii")
+            address = bytes([len(hostname)]) + hostname
+        else:
+            raise ValueError(f"Unknown address type {self.type}")
+        return bytes([self.type]) + address + self.port.to_bytes(2, byteorder="big")
+
+
+def parse_addresses(data: bytes) -> List[Address]:
+    """
+    Decode the address descriptors of a node_announcement.
+
+    Parsing stops at the first descriptor of an unknown type, whose length we cannot know, and
+    at a truncated one, as Bolt 7 says to ignore them and everything after.
+    """
+    addresses = []
+    offset = 0
+    while offset < len(data):
+        address_type = data[offset]
+        start = offset + 1
+        length = ADDRESS_LENGTHS.get(address_type)
+        if length is None:
+            if address_type != ADDRESS_DNS or start >= len(data):
+                break
+            length = 1 + data[start]
+        end = start + length
+        if end + 2 > len(data):
+            break
+        address = data[start:end]
+        if address_type == ADDRESS_IPV4 or address_type == ADDRESS_IPV6:
+            host = str(ipaddress.ip_address(address))
+        elif address_type == ADDRESS_DNS:
+            host = address[1:].decode("ascii", errors="replace")
+        else:
+            host = base64.b32encode(address).decode().lower() + ".onion"
+        port = int.from_bytes(data[end : end + 2], byteorder="big")
+        addresses.append(Address(address_type, host, port))
+        offset = end + 2
+    return addresses
+
+
+class AddressesElement(U16VarBytesElement):
+    """
+    The address descriptors of a node_announcement, kept as their raw bytes.
+
+    Descriptors are only decoded when addresses() is called.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, addresses: Iterable[Address]) -> Self:
+        data = b"".join(address.to_bytes() for address in addresses)
+        return cls(len(data), data)
+
+    def addresses(self) -> List[Address]:
+        return parse_addresses(bytes(self.data))
 
-@dataclass
+
+@dataclass(slots=True)
 class U16Element(SerializedElement):
+    struct_format = "H"
     num_bytes: int
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        num_bytes = int.from_bytes(data[:2], byteorder="big")
-        return (cls(num_bytes), data[2:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        num_bytes = int.from_bytes(view[offset : offset + 2], byteorder="big")
+        return (cls(num_bytes), offset + 2)
 
     def to_bytes(self) -> bytes:
         return self.num_bytes.to_bytes(2, byteorder="big")
 
+    def struct_value(self):
+        return self.num_bytes
+
 
-@dataclass
+@dataclass(slots=True)
 class U32Element(SerializedElement):
+    struct_format = "I"
     value: int
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        value = int.from_bytes(data[:4], byteorder="big")
-        return (cls(value), data[4:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        value = int.from_bytes(view[offset : offset + 4], byteorder="big")
+        return (cls(value), offset + 4)
 
     def to_bytes(self) -> bytes:
         return self.value.to_bytes(4, byteorder="big")
 
+    def struct_value(self):
+        return self.value
+
 
-@dataclass
+@dataclass(slots=True)
 class U64Element(SerializedElement):
+    struct_format = "Q"
     value: int
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
-        value = int.from_bytes(data[:8], byteorder="big")
-        return (cls(value), data[8:])
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        value = int.from_bytes(view[offset : offset + 8], byteorder="big")
+        return (cls(value), offset + 8)
 
     def to_bytes(self) -> bytes:
         return self.value.to_bytes(8, byteorder="big")
 
+    def struct_value(self):
+        return self.value
+
 
-@dataclass
+@dataclass(slots=True)
 class RemainderElement(SerializedElement):
     """Special case element when we have bytes at the end that we don't handle yet."""
 
     data: bytes
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> tuple[Self, bytes]:
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
         """Takes all remaining bytes."""
-        return (cls(bytes(data)), b"")
+        return (cls(bytes(view[offset:])), len(view))
 
     def to_bytes(self) -> bytes:
         return bytes(self.data)
+
+    def write_parts(self, parts: List[bytes]):
+        parts.append(self.data)
+
+
+def read_bigsize(view: memoryview, offset: int) -> Tuple[int, int]:
+    """Decode a BigSize integer, see Bolt 1, and return it with the offset just past it."""
+    if offset >= len(view):
+        raise ValueError("Truncated BigSize")
+    first = view[offset]
+    if first < 0xFD:
+        return first, offset + 1
+    width, minimum = {0xFD: (2, 0xFD), 0xFE: (4, 1 << 16), 0xFF: (8, 1 << 32)}[first]
+    end = offset + 1 + width
+    if end > len(view):
+        raise ValueError("Truncated BigSize")
+    value = int.from_bytes(view[offset + 1 : end], byteorder="big")
+    if value < minimum:
+        raise ValueError("BigSize is not minimally encoded")
+    return value, end
+
+
+def bigsize(value: int) -> bytes:
+    if value < 0xFD:
+        return bytes([value])
+    if value < 1 << 16:
+        return b"\xfd" + value.to_bytes(2, byteorder="big")
+    if value < 1 << 32:
+        return b"\xfe" + value.to_bytes(4, byteorder="big")
+    return b"\xff" + value.to_bytes(8, byteorder="big")
+
+
+@dataclass(slots=True)
+class TlvStreamElement(SerializedElement):
+    """
+    A TLV stream, see Bolt 1, which takes the rest of the message and is kept as its raw bytes.
+
+    The first lookup indexes where each record's value sits in one pass, without copying, and a
+    value is only copied out when it is read, so a large stream costs nothing unless it is used.
+    The stream is re-encoded verbatim, records we do not know included.
+    """
+
+    # Names of the record types, for subclasses which know them
+    names = {}
+    data: bytes = b""
+    _index: Optional[Dict[int, Tuple[int, int]]] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_view(cls, view: memoryview, offset: int) -> tuple[Self, int]:
+        return (cls(bytes(view[offset:])), max(len(view), offset))
+
+    @classmethod
+    def skip(cls, view: memoryview, offset: int) -> int:
+        return max(len(view), offset)
+
+    @classmethod
+    def create(cls, records: Mapping[int, bytes]) -> Self:
+        return cls(
+            b"".join(
+                bigsize(type_id) + bigsize(len(records[type_id])) + records[type_id]
+                for type_id in sorted(records)
+            )
+        )
+
+    def to_bytes(self) -> bytes:
+        return self.data
+
+    def size(self) -> int:
+        return len(self.data)
+
+    def write_parts(self, parts: List[bytes]):
+        parts.append(self.data)
+
+    @property
+    def index(self) -> Dict[int, Tuple[int, int]]:
+        """Record type to (start, end) of its value, raises ValueError for a malformed stream."""
+        if self._index is None:
+            view = memoryview(self.data)
+            index = {}
+            offset, last = 0, -1
+            while offset < len(view):
+                type_id, offset = read_bigsize(view, offset)
+                if type_id <= last:
+                    raise ValueError("TLV records are not in strictly increasing order")
+                length, offset = read_bigsize(view, offset)
+                if offset + length > len(view):
+                    raise ValueError(f"TLV record {type_id} is truncated")
+                index[type_id] = (offset, offset + length)
+                offset += length
+                last = type_id
+            self._index = index
+        return self._index
+
+    def types(self) -> List[int]:
+        return list(self.index)
+
+    def __contains__(self, type_id: int) -> bool:
+        return type_id in self.index
+
+    def get(self, type_id: int) -> Optional[bytes]:
+        """The value of a record, None when the stream does not hold one."""
+        span = self.index.get(type_id)
+        return None if span is None else self.data[span[0] : span[1]]
+
+    def unknown_even(self) -> List[int]:
+        """Even record types this stream's names do not cover, which Bolt 1 says to reject."""
+        return [t for t in self.index if t % 2 == 0 and t not in self.names]
+
+    def replace(self, type_id: int, value: Optional[bytes]) -> Self:
+        """A copy with one record set, or removed when value is None, the others kept verbatim."""
+        records = {t: self.data[start:end] for t, (start, end) in self.index.items()}
+        if value is None:
+            records.pop(type_id, None)
+        else:
+            records[type_id] = value
+        return self.create(records)
+
+
+class InitTlvsElement(TlvStreamElement):
+    __slots__ = ()
+    names = TLV_MESSAGE_TYPES
+
+
+class QueryShortChannelIdsTlvsElement(TlvStreamElement):
+    """query_flags, one bigsize per short channel id, bits as in GossipChannelIDQueryFlags."""
+
+    __slots__ = ()
+    names = {1: "query_flags"}
+
+    @classmethod
+    def with_query_flags(
+        cls, query_flags: Iterable[int], encoding: int = ENCODING_UNCOMPRESSED
+    ) -> Self:
+        return cls.create({1: encode_with_type(b"".join(map(bigsize, query_flags)), encoding)})
+
+    def query_flags(self) -> Optional[List[int]]:
+        value = self.get(1)
+        if not value:
+            return None
+        view = memoryview(decode_with_type(value))
+        flags, offset = [], 0
+        while offset < len(view):
+            flag, offset = read_bigsize(view, offset)
+            flags.append(flag)
+        return flags
+
+
+class QueryChannelRangeTlvsElement(TlvStreamElement):
+    __slots__ = ()
+    names = {1: "query_option"}
+
+    @classmethod
+    def with_query_option(cls, query_option: int) -> Self:
+        return cls.create({1: bigsize(query_option)})
+
+    @property
+    def query_option(self) -> int:
+        """The QUERY_OPTION_ bits asked for, 0 when there is no query_option."""
+        value = self.get(1)
+        return read_bigsize(memoryview(value), 0)[0] if value else 0
+
+
+class ReplyChannelRangeTlvsElement(TlvStreamElement):
+    """
+    timestamps_tlv and checksums_tlv, two u32 per short channel id of the reply: one for the
+    channel_update of node_id_1 and one for node_id_2, zero when there is none.
+    """
+
+    __slots__ = ()
+    names = {1: "timestamps_tlv", 3: "checksums_tlv"}
+
+    @classmethod
+    def with_values(
+        cls,
+        timestamps: Optional[Iterable[int]] = None,
+        checksums: Optional[Iterable[int]] = None,
+        encoding: int = ENCODING_UNCOMPRESSED,
+    ) -> Self:
+        records = {}
+        if timestamps is not None:
+            records[1] = encode_with_type(pack_big_endian("I", timestamps), encoding)
+        if checksums is not None:
+            records[3] = pack_big_endian("I", checksums)
+        return cls.create(records)
+
+    def timestamps(self) -> Optional[array]:
+        value = self.get(1)
+        return unpack_big_endian("I", decode_with_type(value)) if value else None
+
+    def checksums(self) -> Optional[array]:
+        value = self.get(3)
+        return None if value is None else unpack_big_endian("I", value)
+
+
+class NodeAnnouncementTlvsElement(TlvStreamElement):
+    """Whatever follows the addresses of a node_announcement, no records are defined yet."""
+
+    __slots__ = ()
@@ -1,19 +1,33 @@
-from dataclasses import dataclass
+from array import array
+from collections.abc import MutableMapping
 from enum import Enum
-from typing import Dict, List, Self, Tuple, Type, TypeAlias, cast
+from typing import Dict, Iterable, List, Optional, Self, Tuple, Type, TypeAlias, cast
 
+from app.codec import MessageCodec
 from app.message_elements import (
+    ENCODING_UNCOMPRESSED,
+    LIGHTNING_MESSAGE_TYPES,
+    Address,
+    AddressesElement,
+    AliasElement,
     ChainHashElement,
     EncodedShortChannelIdsElement,
     GlobalFeaturesElement,
+    InitTlvsElement,
     LocalFeaturesElement,
     MessageTypeElement,
+    NodeAnnouncementTlvsElement,
     PointElement,
+    QueryChannelRangeTlvsElement,
+    QueryShortChannelIdsTlvsElement,
     RemainderElement,
+    ReplyChannelRangeTlvsElement,
+    RgbColorElement,
     SerializedElement,
     ShortChannelIDElement,
     SignatureElement,
     SingleByteElement,
+    TlvStreamElement,
     U16Element,
     U16VarBytesElement,
     U32Element,
@@ -21,9 +35,11 @@ from app.message_elements import (
 )
 
 
-class MessageProperty(Enum):
+class MessageProperty(str, Enum):
     """
     An ElementKey represents the unique names for datatypes which are encoded in documentation, for example see [channel_announcement](https://github.com/lightning/bolts/blob/master/07-routing-gossip.md#the-channel_announcement-message) in Bolt 7.
+
+    The str mixin gives members the C string hash, which keeps building property dicts cheap.
     """
 
     TYPE = "type"
@@ -59,17 +75,227 @@ class MessageProperty(Enum):
     FIRST_BLOCK_NUM = "first_block_num"
     NUMBER_OF_BLOCKS = "number_of_blocks"
     SYNC_COMPLETE = "sync_complete"
+    TLV_STREAM = "tlv_stream"
+    NODE_FEATURES = "features"
+    NODE_ID = "node_id"
+    RGB_COLOR = "rgb_color"
+    ALIAS = "alias"
+    ADDRESSES = "addresses"
 
 
 KeyedElement: TypeAlias = Tuple[MessageProperty, Type[SerializedElement]]
 MessagePropertiesDict: TypeAlias = Dict[MessageProperty, SerializedElement]
 
 
-@dataclass
+class LazyProperties(MutableMapping):
+    """
+    Message properties backed by the raw frame.
+
+    Field offsets are located the first time any field is needed and each element is decoded the
+    first time it is read. Writing a property decodes the rest and detaches from the frame.
+    """
+
+    __slots__ = ("codec", "data", "_offsets", "_decoded", "_detached")
+
+    def __init__(self, codec: MessageCodec, data: bytes):
+        self.codec = codec
+        self.data = data
+        self._offsets = None
+        self._decoded: MessagePropertiesDict = {}
+        self._detached = False
+
+    @property
+    def offsets(self):
+        if self._offsets is None:
+            view = memoryview(self.data)
+            offsets, offset = self.codec.offsets(view)
+            if offset < len(view):
+                offsets = dict(offsets)
+                offsets[MessageProperty.REMAINDER] = (RemainderElement, offset, len(view))
+            self._offsets = offsets
+        return self._offsets
+
+    def __getitem__(self, key: MessageProperty) -> SerializedElement:
+        element = self._decoded.get(key)
+        if element is None:
+            if self._detached:
+                raise KeyError(key)
+            feature, start, _ = self.offsets[key]
+            element, _ = feature.from_view(memoryview(self.data), start)
+            self._decoded[key] = element
+        return element
+
+    def __setitem__(self, key: MessageProperty, element: SerializedElement):
+        self.detach()
+        self._decoded[key] = element
+
+    def __delitem__(self, key: MessageProperty):
+        self.detach()
+        del self._decoded[key]
+
+    def __iter__(self):
+        return iter(self._decoded if self._detached else self.offsets)
+
+    def __len__(self):
+        return len(self._decoded if self._detached else self.offsets)
+
+    def detach(self):
+        """Decode every remaining field so the properties no longer depend on the frame."""
+        if not self._detached:
+            self._decoded = {key: self[key] for key in self.offsets}
+            self._detached = True
+
+    def is_modified(self) -> bool:
+        """True when the frame no longer matches the properties."""
+        if self._detached:
+            return True
+        for key, element in self._decoded.items():
+            _, start, end = self.offsets[key]
+            if element.to_bytes() != self.data[start:end]:
+                return True
+        return False
+
+
+class FieldArray(MutableMapping):
+    """
+    Message properties held in a list indexed by the position of each feature in the message class.
+
+    Fixed width fields stay as the raw values struct unpacked them and are built into elements the
+    first time they are read, so a held message costs a list of ints and bytes rather than a dict
+    of elements. A remainder, when there is one, is kept apart.
+    """
+
+    __slots__ = ("codec", "values", "remainder")
+
+    def __init__(self, codec: MessageCodec, values: List, remainder=None):
+        self.codec = codec
+        self.values = values
+        self.remainder = remainder
+
+    @classmethod
+    def from_dict(cls, codec: MessageCodec, properties: MessagePropertiesDict) -> Self:
+        fields = cls(codec, [None] * len(codec.features))
+        for key, element in properties.items():
+            fields[key] = element
+        return fields
+
+    def __getitem__(self, key: MessageProperty) -> SerializedElement:
+        index = self.codec.index.get(key)
+        if index is None:
+            if key is MessageProperty.REMAINDER and self.remainder is not None:
+                return self.remainder
+            raise KeyError(key)
+        if self.values[index] is None:
+            raise KeyError(key)
+        return self.codec.element_at(self.values, index)
+
+    def __setitem__(self, key: MessageProperty, element: SerializedElement):
+        index = self.codec.index.get(key)
+        if index is not None:
+            self.values[index] = element
+        elif key is MessageProperty.REMAINDER:
+            self.remainder = element
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key: MessageProperty):
+        index = self.codec.index.get(key)
+        if index is not None and self.values[index] is not None:
+            self.values[index] = None
+        elif key is MessageProperty.REMAINDER and self.remainder is not None:
+            self.remainder = None
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for (key, _), value in zip(self.codec.features, self.values):
+            if value is not None:
+                yield key
+        if self.remainder is not None:
+            yield MessageProperty.REMAINDER
+
+    def __len__(self):
+        return sum(value is not None for value in self.values) + (self.remainder is not None)
+
+    def is_complete(self) -> bool:
+        return None not in self.values
+
+
+def accessor(key: MessageProperty) -> property:
+    return property(lambda self: self.properties[key], doc=f"The {key.value} element.")
+
+
 class Message:
-    id: int
-    name: str
-    properties: MessagePropertiesDict
+    """
+    A Lightning message: its type id, name and properties keyed by MessageProperty.
+
+    Messages are slotted and every subclass declares empty __slots__, so a held message is just
+    its three references. Subclasses set id and name as class constants, which take precedence
+    over the per instance values kept for messages of unknown types. An accessor property is
+    defined for each feature of a subclass, e.g. ChannelUpdateMessage.timestamp, so reading a
+    field does not go through __getattr__.
+    """
+
+    __slots__ = ("_id", "_name", "properties")
+
+    def __init__(self, id: int, name: str, properties: MessagePropertiesDict):
+        self._id = id
+        self._name = name
+        # Messages built from a dict of their fields get the compact representation
+        if type(properties) is dict:
+            codec = self.codec()
+            if all(key in codec.index or key is MessageProperty.REMAINDER for key in properties):
+                fields = FieldArray.from_dict(codec, properties)
+                if not fields.is_complete():
+                    self.fill_optional(codec, fields)
+                properties = fields
+        self.properties = properties
+
+    def fill_optional(self, codec: MessageCodec, fields: FieldArray):
+        """
+        Default a missing trailing TLV stream to empty, raises ValueError for any other missing
+        feature rather than failing later when the message is encoded.
+        """
+        missing = []
+        for i, (key, feature) in enumerate(codec.features):
+            if fields.values[i] is not None:
+                continue
+            if i == len(codec.features) - 1 and issubclass(feature, TlvStreamElement):
+                fields.values[i] = feature()
+            else:
+                missing.append(key.value)
+        if missing:
+            raise ValueError(f"{type(self).__name__} is missing {', '.join(missing)}")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for key, _ in cls.features():
+            name = key.name.lower()
+            if not hasattr(cls, name):
+                setattr(cls, name, accessor(key))
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def type(self):
+        return self.properties[MessageProperty.TYPE]
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return (self.id, self.name, self.properties) == (other.id, other.name, other.properties)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(id={self.id!r}, name={self.name!r}, "
+            f"properties={self.properties!r})"
+        )
 
     @classmethod
     def features(cls) -> List[KeyedElement]:
@@ -79,27 +305,48 @@ class Message:
 
     @classmethod
     def from_bytes(cls, data: bytes):
-        properties = {}
-        chunked = bytes(data)
-        for key, feature in cls.features():
-            el, chunked = feature.from_bytes(bytes(chunked))
-            properties[key] = el
-            if feature is MessageTypeElement:
-                el = cast(MessageTypeElement, el)
-                id: int = el.id
-                name: str = el.name
-        if len(chunked) > 0:
-            properties[MessageProperty.REMAINDER], chunked = RemainderElement.from_bytes(chunked)
-        assert len(chunked) == 0, f"Unexpected data left: {chunked}"
-        return cls(id, name, properties)  # pyright: ignore
+        return cls.from_view(memoryview(data))
+
+    @classmethod
+    def codec(cls) -> MessageCodec:
+        """The layout compiled from features(), built once per class."""
+        codec = cls.__dict__.get("_codec")
+        if codec is None:
+            codec = MessageCodec(cls.features())
+            cls._codec = codec  # pyright: ignore
+        return codec
+
+    @classmethod
+    def lazy_from_bytes(cls, data: bytes):
+        """Wrap the frame without decoding it, fields are decoded the first time they are read."""
+        id = int.from_bytes(data[:2], byteorder="big")
+        name = LIGHTNING_MESSAGE_TYPES.get(id, "unknown")
+        return cls(id, name, LazyProperties(cls.codec(), bytes(data)))  # pyright: ignore
+
+    @classmethod
+    def from_view(cls, view: memoryview):
+        """Decode by walking a single cursor over the view, without copying the tail per field."""
+        codec = cls.__dict__.get("_codec") or cls.codec()
+        values, offset = codec.decode_values(view)
+        remainder = RemainderElement.from_view(view, offset)[0] if offset < len(view) else None
+        # The type is the first feature, still a raw int unless the frame was too short to unpack
+        message_type = values[0]
+        id = message_type if type(message_type) is int else message_type.id
+        name = LIGHTNING_MESSAGE_TYPES.get(id, "unknown")
+        return cls(id, name, FieldArray(codec, values, remainder))  # pyright: ignore
 
     def to_bytes(self) -> bytes:
-        data = b""
-        for key, feature in self.features():
-            data += self.properties[key].to_bytes()
+        if isinstance(self.properties, LazyProperties) and not self.properties.is_modified():
+            return self.properties.data
+        # Fields are gathered as parts and joined once, so large fields are copied a single time
+        parts = []
+        if isinstance(self.properties, FieldArray):
+            self.codec().encode_values(self.properties.values, parts)
+        else:
+            self.codec().encode_parts(self.properties, parts)
         if MessageProperty.REMAINDER in self.properties:
-            data += self.properties[MessageProperty.REMAINDER].to_bytes()
-        return data
+            self.properties[MessageProperty.REMAINDER].write_parts(parts)
+        return parts[0] if len(parts) == 1 else b"".join(parts)
 
     def __str__(self):
         out = []
@@ -108,7 +355,7 @@ class Message:
         return f"{self.__class__.__name__}({', '.join(out)})"
 
     def __getattr__(self, name: str):
-        """Fallback for dynamically created properties."""
+        """Fallback for properties without an accessor, like remainder."""
         try:
             return self.properties[MessageProperty[name.upper()]]
         except KeyError:
@@ -132,6 +379,7 @@ class Message:
 
 
 class InitMessage(Message):
+    __slots__ = ()
     id = 16
 
     @classmethod
@@ -139,6 +387,7 @@ class InitMessage(Message):
         return super().features() + [
             (MessageProperty.GLOBAL_FEATURES, U16VarBytesElement),
             (MessageProperty.LOCAL_FEATURES, U16VarBytesElement),
+            (MessageProperty.TLV_STREAM, InitTlvsElement),
         ]
 
     @property
@@ -149,10 +398,23 @@ class InitMessage(Message):
     def local_features(self):
         return cast(LocalFeaturesElement, self.properties[MessageProperty.LOCAL_FEATURES])
 
+    @property
+    def tlv_stream(self):
+        return cast(InitTlvsElement, self.properties[MessageProperty.TLV_STREAM])
+
+    @property
+    def networks(self) -> Optional[List[bytes]]:
+        """The chain hashes the peer is interested in, None when it did not say."""
+        value = self.tlv_stream.get(1)
+        if value is None:
+            return None
+        return [value[i : i + 32] for i in range(0, len(value), 32)]
+
 
 class PingMessage(Message):
-    id: int = 18
-    name: str = "ping"
+    __slots__ = ()
+    id = 18
+    name = "ping"
 
     @classmethod
     def features(cls) -> List[KeyedElement]:
@@ -179,6 +441,7 @@ class PingMessage(Message):
 
 
 class PongMessage(Message):
+    __slots__ = ()
     id = 19
     name = "pong"
 
@@ -212,6 +475,7 @@ class PongMessage(Message):
 
 
 class ChannelAnnouncementMessage(Message):
+    __slots__ = ()
     id = 256
     name = "channel_announcement"
 
@@ -276,7 +540,58 @@ class ChannelAnnouncementMessage(Message):
         return cast(PointElement, self.properties[MessageProperty.BITCOIN_KEY_2])
 
 
+class NodeAnnouncementMessage(Message):
+    __slots__ = ()
+    id = 257
+    name = "node_announcement"
+
+    @classmethod
+    def features(cls) -> List[KeyedElement]:
+        # https://github.com/lightning/bolts/blob/master/07-routing-gossip.md#the-node_announcement-message
+        return super().features() + [
+            (MessageProperty.SIGNATURE, SignatureElement),
+            (MessageProperty.NODE_FEATURES, U16VarBytesElement),
+            (MessageProperty.TIMESTAMP, U32Element),
+            (MessageProperty.NODE_ID, PointElement),
+            (MessageProperty.RGB_COLOR, RgbColorElement),
+            (MessageProperty.ALIAS, AliasElement),
+            (MessageProperty.ADDRESSES, AddressesElement),
+            (MessageProperty.TLV_STREAM, NodeAnnouncementTlvsElement),
+        ]
+
+    @classmethod
+    def create(
+        cls,
+        node_id: bytes,
+        timestamp: int,
+        features: bytes = b"",
+        rgb_color: int = 0,
+        alias: str = "",
+        addresses: Iterable[Address] = (),
+        signature: bytes = bytes(64),
+    ) -> Self:
+        encoded_alias = alias.encode("utf-8")
+        if len(encoded_alias) > 32:
+            raise ValueError("Aliases are at most 32 bytes")
+        return cls(
+            257,
+            "node_announcement",
+            {
+                MessageProperty.TYPE: MessageTypeElement(257, "node_announcement"),
+                MessageProperty.SIGNATURE: SignatureElement(signature),
+                MessageProperty.NODE_FEATURES: U16VarBytesElement(len(features), features),
+                MessageProperty.TIMESTAMP: U32Element(timestamp),
+                MessageProperty.NODE_ID: PointElement(node_id),
+                MessageProperty.RGB_COLOR: RgbColorElement(rgb_color.to_bytes(3, "big")),
+                MessageProperty.ALIAS: AliasElement(encoded_alias.ljust(32, b"\x00")),
+                MessageProperty.ADDRESSES: AddressesElement.create(addresses),
+                MessageProperty.TLV_STREAM: NodeAnnouncementTlvsElement(),
+            },
+        )
+
+
 class ChannelUpdateMessage(Message):
+    __slots__ = ()
     id = 258
     name = "channel_update"
 
@@ -299,6 +614,7 @@ class ChannelUpdateMessage(Message):
 
 
 class GossipTimestampFilterMessage(Message):
+    __slots__ = ()
     id = 265
     name = "gossip_timestamp_filter"
 
@@ -310,6 +626,21 @@ class GossipTimestampFilterMessage(Message):
             (MessageProperty.TIMESTAMP_RANGE, U32Element),
         ]
 
+    @classmethod
+    def create(
+        cls, chain_hash: bytes, first_timestamp: int, timestamp_range: int = 0xFFFFFFFF
+    ) -> Self:
+        return cls(
+            265,
+            "gossip_timestamp_filter",
+            {
+                MessageProperty.TYPE: MessageTypeElement(265, "gossip_timestamp_filter"),
+                MessageProperty.CHAIN_HASH: ChainHashElement(chain_hash),
+                MessageProperty.FIRST_TIMESTAMP: U32Element(first_timestamp),
+                MessageProperty.TIMESTAMP_RANGE: U32Element(timestamp_range),
+            },
+        )
+
     @property
     def chain_hash(self):
         return cast(ChainHashElement, self.properties[MessageProperty.CHAIN_HASH])
@@ -332,6 +663,7 @@ class GossipChannelIDQueryFlags(Enum):
 
 
 class QueryShortChannelIDsMessage(Message):
+    __slots__ = ()
     id = 261
     name = "query_short_channel_ids"
 
@@ -340,8 +672,35 @@ class QueryShortChannelIDsMessage(Message):
         return super().features() + [
             (MessageProperty.CHAIN_HASH, ChainHashElement),
             (MessageProperty.ENCODED_SHORT_CHANNEL_IDS, EncodedShortChannelIdsElement),
+            (MessageProperty.TLV_STREAM, QueryShortChannelIdsTlvsElement),
         ]
 
+    @classmethod
+    def create(
+        cls,
+        chain_hash: bytes,
+        short_channel_ids: Iterable[int],
+        encoding: int = ENCODING_UNCOMPRESSED,
+        query_flags: Optional[Iterable[int]] = None,
+    ) -> Self:
+        tlvs = (
+            QueryShortChannelIdsTlvsElement()
+            if query_flags is None
+            else QueryShortChannelIdsTlvsElement.with_query_flags(query_flags, encoding)
+        )
+        return cls(
+            261,
+            "query_short_channel_ids",
+            {
+                MessageProperty.TYPE: MessageTypeElement(261, "query_short_channel_ids"),
+                MessageProperty.CHAIN_HASH: ChainHashElement(chain_hash),
+                MessageProperty.ENCODED_SHORT_CHANNEL_IDS: EncodedShortChannelIdsElement.create(
+                    short_channel_ids, encoding
+                ),
+                MessageProperty.TLV_STREAM: tlvs,
+            },
+        )
+
     @property
     def chain_hash(self):
         return cast(ChainHashElement, self.properties[MessageProperty.CHAIN_HASH])
@@ -353,8 +712,13 @@ class QueryShortChannelIDsMessage(Message):
             self.properties[MessageProperty.ENCODED_SHORT_CHANNEL_IDS],
         )
 
+    def query_flags(self) -> Optional[List[int]]:
+        """The flags of each short channel id, None when every channel is asked for in full."""
+        return cast(QueryShortChannelIdsTlvsElement, self.tlv_stream).query_flags()
+
 
 class ReplyShortChannelIDsMessage(Message):
+    __slots__ = ()
     id = 262
     name = "reply_short_channel_ids"
 
@@ -365,8 +729,21 @@ class ReplyShortChannelIDsMessage(Message):
             (MessageProperty.FULL_INFORMATION, SingleByteElement),
         ]
 
+    @classmethod
+    def create(cls, chain_hash: bytes, full_information: bool = True) -> Self:
+        return cls(
+            262,
+            "reply_short_channel_ids",
+            {
+                MessageProperty.TYPE: MessageTypeElement(262, "reply_short_channel_ids"),
+                MessageProperty.CHAIN_HASH: ChainHashElement(chain_hash),
+                MessageProperty.FULL_INFORMATION: SingleByteElement(bytes([full_information])),
+            },
+        )
+
 
 class QueryChannelRangeMessage(Message):
+    __slots__ = ()
     id = 263
     name = "query_channel_range"
 
@@ -376,10 +753,18 @@ class QueryChannelRangeMessage(Message):
             (MessageProperty.CHAIN_HASH, ChainHashElement),
             (MessageProperty.FIRST_BLOCK_NUM, U32Element),
             (MessageProperty.NUMBER_OF_BLOCKS, U32Element),
+            (MessageProperty.TLV_STREAM, QueryChannelRangeTlvsElement),
         ]
 
     @classmethod
-    def create(cls, chain_hash: bytes, first_block_num: int, number_of_blocks: int) -> Self:
+    def create(
+        cls, chain_hash: bytes, first_block_num: int, number_of_blocks: int, query_option: int = 0
+    ) -> Self:
+        tlvs = (
+            QueryChannelRangeTlvsElement.with_query_option(query_option)
+            if query_option
+            else QueryChannelRangeTlvsElement()
+        )
         return cls(
             263,
             "query_channel_range",
@@ -388,6 +773,7 @@ class QueryChannelRangeMessage(Message):
                 MessageProperty.CHAIN_HASH: ChainHashElement(chain_hash),
                 MessageProperty.FIRST_BLOCK_NUM: U32Element(first_block_num),
                 MessageProperty.NUMBER_OF_BLOCKS: U32Element(number_of_blocks),
+                MessageProperty.TLV_STREAM: tlvs,
             },
         )
 
@@ -403,8 +789,13 @@ class QueryChannelRangeMessage(Message):
     def number_of_blocks(self):
         return cast(U32Element, self.properties[MessageProperty.NUMBER_OF_BLOCKS])
 
+    @property
+    def query_option(self) -> int:
+        return cast(QueryChannelRangeTlvsElement, self.tlv_stream).query_option
+
 
 class ReplyChannelRangeMessage(Message):
+    __slots__ = ()
     id = 264
     name = "reply_channel_range"
 
@@ -416,8 +807,43 @@ class ReplyChannelRangeMessage(Message):
             (MessageProperty.NUMBER_OF_BLOCKS, U32Element),
             (MessageProperty.SYNC_COMPLETE, SingleByteElement),
             (MessageProperty.ENCODED_SHORT_CHANNEL_IDS, EncodedShortChannelIdsElement),
+            (MessageProperty.TLV_STREAM, ReplyChannelRangeTlvsElement),
         ]
 
+    @classmethod
+    def create(
+        cls,
+        chain_hash: bytes,
+        first_block_num: int,
+        number_of_blocks: int,
+        sync_complete: bool,
+        short_channel_ids: Iterable[int],
+        encoding: int = ENCODING_UNCOMPRESSED,
+        timestamps: Optional[Iterable[int]] = None,
+        checksums: Optional[Iterable[int]] = None,
+    ) -> Self:
+        """timestamps and checksums, when given, hold two values per short channel id."""
+        tlvs = (
+            ReplyChannelRangeTlvsElement()
+            if timestamps is None and checksums is None
+            else ReplyChannelRangeTlvsElement.with_values(timestamps, checksums, encoding)
+        )
+        return cls(
+            264,
+            "reply_channel_range",
+            {
+                MessageProperty.TYPE: MessageTypeElement(264, "reply_channel_range"),
+                MessageProperty.CHAIN_HASH: ChainHashElement(chain_hash),
+                MessageProperty.FIRST_BLOCK_NUM: U32Element(first_block_num),
+                MessageProperty.NUMBER_OF_BLOCKS: U32Element(number_of_blocks),
+                MessageProperty.SYNC_COMPLETE: SingleByteElement(bytes([sync_complete])),
+                MessageProperty.ENCODED_SHORT_CHANNEL_IDS: EncodedShortChannelIdsElement.create(
+                    short_channel_ids, encoding
+                ),
+                MessageProperty.TLV_STREAM: tlvs,
+            },
+        )
+
     @property
     def chain_hash(self):
         return cast(ChainHashElement, self.properties[MessageProperty.CHAIN_HASH])
@@ -440,3 +866,9 @@ class ReplyChannelRangeMessage(Message):
             EncodedShortChannelIdsElement,
             self.properties[MessageProperty.ENCODED_SHORT_CHANNEL_IDS],
         )
+
+    def timestamps(self) -> Optional[array]:
+        return cast(ReplyChannelRangeTlvsElement, self.tlv_stream).timestamps()
+
+    def checksums(self) -> Optional[array]:
+        return cast(ReplyChannelRangeTlvsElement, self.tlv_stream).checksums()
@@ -0,0 +1,232 @@
+import asyncio
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.logger import logger
+from app.message_elements import LIGHTNING_MESSAGE_TYPES
+from app.outbound import PRIORITY_NAMES
+
+# Message types get a slot each, looked up by indexing a 64 KiB table with the raw type bytes so
+# the hot path never hashes a string. Slot 0 collects types we have no name for.
+TYPE_NAMES = ["unknown"] + list(LIGHTNING_MESSAGE_TYPES.values())
+
+
+def build_type_slots() -> bytearray:
+    slots = bytearray(1 << 16)
+    for slot, type_id in enumerate(LIGHTNING_MESSAGE_TYPES, start=1):
+        slots[type_id] = slot
+    return slots
+
+
+TYPE_SLOTS = build_type_slots()
+
+DECODE_SECONDS_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+# Decode latency is timed for one message in this many, the counters still see every message
+DECODE_SAMPLE_INTERVAL = 16
+PING_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUEUE_SECONDS_BUCKETS = (1e-4, 1e-3, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# A gauge or counter callback returns (label values, value) pairs, read only when metrics are
+# scraped
+GaugeSample = Tuple[Tuple[str, ...], float]
+
+
+def type_slot(frame: bytes) -> int:
+    return TYPE_SLOTS[frame[0] << 8 | frame[1]] if len(frame) >= 2 else 0
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """A histogram with fixed buckets, one row of counts per message type slot."""
+
+    def __init__(self, bounds: Sequence[float], rows: int = 1):
+        self.bounds = tuple(bounds)
+        self.width = len(self.bounds) + 1
+        self.counts = array("Q", bytes(8 * self.width * rows))
+        self.sums = array("d", bytes(8 * rows))
+
+    def observe(self, value: float, row: int = 0):
+        self.counts[row * self.width + bisect_left(self.bounds, value)] += 1
+        self.sums[row] += value
+
+    def render(self, name: str, label_names: Sequence[str], row_labels: Sequence[Sequence[str]]):
+        for row, label_values in enumerate(row_labels):
+            counts = self.counts[row * self.width : (row + 1) * self.width]
+            total = sum(counts)
+            if not total:
+                continue
+            cumulative = 0
+            for bound, count in zip((*self.bounds, "+Inf"), counts):
+                cumulative += count
+                bucket = labels((*label_names, "le"), (*label_values, str(bound)))
+                yield f"{name}_bucket{bucket} {cumulative}"
+            yield f"{name}_sum{labels(label_names, label_values)} {self.sums[row]}"
+            yield f"{name}_count{labels(label_names, label_values)} {total}"
+
+
+class PeerMetrics:
+    """Counters of one peer connection, preallocated per message type slot."""
+
+    def __init__(self, peer: str):
+        self.peer = peer
+        self.messages_in = array("Q", bytes(8 * len(TYPE_NAMES)))
+        self.bytes_in = array("Q", bytes(8 * len(TYPE_NAMES)))
+        self.messages_out = array("Q", bytes(8 * len(TYPE_NAMES)))
+        self.bytes_out = array("Q", bytes(8 * len(TYPE_NAMES)))
+        self.ping_seconds = Histogram(PING_SECONDS_BUCKETS)
+        # Time outgoing messages wait to be sent, one row per priority class
+        self.queue_seconds = Histogram(QUEUE_SECONDS_BUCKETS, len(PRIORITY_NAMES))
+
+    def received(self, frame: bytes):
+        slot = TYPE_SLOTS[frame[0] << 8 | frame[1]] if len(frame) >= 2 else 0
+        self.messages_in[slot] += 1
+        self.bytes_in[slot] += len(frame)
+
+    def sent(self, frame: bytes):
+        slot = TYPE_SLOTS[frame[0] << 8 | frame[1]] if len(frame) >= 2 else 0
+        self.messages_out[slot] += 1
+        self.bytes_out[slot] += len(frame)
+
+
+class Metrics:
+    """
+    Process wide metrics, rendered in the Prometheus text format.
+
+    Peers get their own PeerMetrics when they connect. Values that already live elsewhere, like
+    queue depths and reconnect counts, are registered as gauge or counter callbacks and read on
+    scrape.
+    """
+
+    def __init__(self):
+        self.peers: Dict[str, PeerMetrics] = {}
+        self.decode_seconds = Histogram(DECODE_SECONDS_BUCKETS, len(TYPE_NAMES))
+        self.decodes = 0
+        self.callbacks: List[
+            Tuple[str, str, str, Tuple[str, ...], Callable[[], Iterable[GaugeSample]]]
+        ] = []
+
+    def peer(self, peer: str) -> PeerMetrics:
+        """The metrics of a peer, kept across reconnects so counters stay monotonic."""
+        metrics = self.peers.get(peer)
+        if metrics is None:
+            metrics = self.peers[peer] = PeerMetrics(peer)
+        return metrics
+
+    def sample_decode(self) -> bool:
+        """Whether to time this decode, true for one call in DECODE_SAMPLE_INTERVAL."""
+        self.decodes += 1
+        return self.decodes % DECODE_SAMPLE_INTERVAL == 0
+
+    def add_gauge(
+        self,
+        name: str,
+        description: str,
+        label_names: Tuple[str, ...],
+        samples: Callable[[], Iterable[GaugeSample]],
+    ):
+        self.callbacks.append((name, description, "gauge", label_names, samples))
+
+    def add_counter(
+        self,
+        name: str,
+        description: str,
+        label_names: Tuple[str, ...],
+        samples: Callable[[], Iterable[GaugeSample]],
+    ):
+        """Like add_gauge, for values which only ever increase. Names should end in _total."""
+        self.callbacks.append((name, description, "counter", label_names, samples))
+
+    def render(self) -> str:
+        lines = []
+        peers = list(self.peers.values())
+        for name, description, attribute in (
+            ("lmp_messages_received_total", "Messages received", "messages_in"),
+            ("lmp_received_bytes_total", "Bytes of messages received", "bytes_in"),
+            ("lmp_messages_sent_total", "Messages sent", "messages_out"),
+            ("lmp_sent_bytes_total", "Bytes of messages sent", "bytes_out"),
+        ):
+            lines += [f"# HELP {name} {description}.", f"# TYPE {name} counter"]
+            for peer in peers:
+                for slot, value in enumerate(getattr(peer, attribute)):
+                    if value:
+                        label = labels(("peer", "type"), (peer.peer, TYPE_NAMES[slot]))
+                        lines.append(f"{name}{label} {value}")
+
+        name = "lmp_decode_seconds"
+        lines += [
+            f"# HELP {name} Time to decode a received message, sampled.",
+            f"# TYPE {name} histogram",
+        ]
+        lines += self.decode_seconds.render(name, ("type",), [(n,) for n in TYPE_NAMES])
+
+        name = "lmp_ping_rtt_seconds"
+        lines += [f"# HELP {name} Ping to pong round trip time.", f"# TYPE {name} histogram"]
+        for peer in peers:
+            lines += peer.ping_seconds.render(name, ("peer",), [(peer.peer,)])
+
+        name = "lmp_outgoing_queue_seconds"
+        lines += [
+            f"# HELP {name} Time outgoing messages wait in the queue.",
+            f"# TYPE {name} histogram",
+        ]
+        for peer in peers:
+            rows = [(peer.peer, klass) for klass in PRIORITY_NAMES]
+            lines += peer.queue_seconds.render(name, ("peer", "class"), rows)
+
+        for name, description, kind, label_names, samples in self.callbacks:
+            lines += [f"# HELP {name} {description}.", f"# TYPE {name} {kind}"]
+            for label_values, value in samples():
+                lines.append(f"{name}{labels(label_names, label_values)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves Metrics.render at /metrics over plain HTTP, meant for a local Prometheus."""
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server: Optional[asyncio.Server] = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+            if path == b"/metrics":
+                status, body = "200 OK", self.metrics.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
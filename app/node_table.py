@@ -0,0 +1,94 @@
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.message_elements import Address, parse_addresses
+
+
+@dataclass
+class NodeInfo:
+    """A snapshot of a node's latest node_announcement, built on request from the table columns."""
+
+    node_id: bytes
+    timestamp: int
+    features: bytes
+    rgb_color: int
+    alias: str
+    addresses: List[Address]
+
+
+class NodeTable:
+    """
+    Node ids interned to small dense integers, with what their node_announcements said.
+
+    Everything else refers to a node by its number, so a 33 byte id is held once and comparing
+    nodes compares ints. Announcements are kept in columns: timestamps and colors in arrays,
+    aliases and address descriptors as their raw bytes, decoded only for NodeInfo, and feature
+    vectors, which most nodes share, deduplicated.
+    """
+
+    def __init__(self):
+        self.ids: List[bytes] = []
+        self.index: Dict[bytes, int] = {}
+        self.timestamps = array("I")
+        self.colors = array("I")
+        self.features: List[bytes] = []
+        self.aliases: List[bytes] = []
+        self.addresses: List[bytes] = []
+        self.feature_vectors: Dict[bytes, bytes] = {b"": b""}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, node_id: bytes) -> bool:
+        return node_id in self.index
+
+    def get(self, node_id: bytes) -> Optional[int]:
+        """The number of a node, None when it was never interned."""
+        return self.index.get(node_id)
+
+    def intern(self, node_id: bytes) -> int:
+        number = self.index.get(node_id)
+        if number is None:
+            node_id = bytes(node_id)
+            number = self.index[node_id] = len(self.ids)
+            self.ids.append(node_id)
+            self.timestamps.append(0)
+            self.colors.append(0)
+            self.features.append(b"")
+            self.aliases.append(b"")
+            self.addresses.append(b"")
+        return number
+
+    def announce(
+        self,
+        number: int,
+        timestamp: int,
+        features: bytes = b"",
+        rgb_color: int = 0,
+        alias: bytes = b"",
+        addresses: bytes = b"",
+    ) -> bool:
+        """Record a node_announcement if it is newer than the one held, returns whether it was."""
+        if timestamp <= self.timestamps[number]:
+            return False
+        features = bytes(features)
+        self.timestamps[number] = timestamp
+        self.colors[number] = rgb_color
+        self.features[number] = self.feature_vectors.setdefault(features, features)
+        self.aliases[number] = bytes(alias).rstrip(b"\x00")
+        self.addresses[number] = bytes(addresses)
+        return True
+
+    def info(self, number: int) -> Optional[NodeInfo]:
+        """The announcement of a node, None when none has been recorded."""
+        if self.timestamps[number] == 0:
+            return None
+        return NodeInfo(
+            self.ids[number],
+            self.timestamps[number],
+            self.features[number],
+            self.colors[number],
+            self.aliases[number].decode("utf-8", errors="replace"),
+            parse_addresses(self.addresses[number]),
+        )
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+
+from app.messages import Message
+
+# Priority classes, lower goes first
+CONTROL = 0
+QUERY = 1
+GOSSIP = 2
+PRIORITY_NAMES = ("control", "query", "gossip")
+
+# warning, init, error, ping and pong keep the connection alive
+CONTROL_TYPES = frozenset((1, 16, 17, 18, 19))
+# query_short_channel_ids, query_channel_range, reply_channel_range and gossip_timestamp_filter.
+# reply_short_channel_ids_end stays in the gossip class, behind the gossip it ends.
+QUERY_TYPES = frozenset((261, 263, 264, 265))
+
+# Bytes each class may hold before send() waits, indexed by priority
+DEFAULT_LIMITS = (256 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+
+
+def priority(type_id: int) -> int:
+    if type_id in CONTROL_TYPES:
+        return CONTROL
+    if type_id in QUERY_TYPES:
+        return QUERY
+    return GOSSIP
+
+
+class OutboundQueue:
+    """
+    A peer's outgoing messages, one FIFO per priority class with a byte limit each.
+
+    get() always takes from the highest priority class with anything waiting, so pongs are never
+    stuck behind a flood of gossip queries. put() waits while its class is over its limit, which
+    pushes back on whoever produces the messages instead of buffering without bound. A message
+    larger than the limit is still accepted when its class is empty.
+
+    Messages are serialized once, on put, and come out with their frame. observe, when set, is
+    called with the seconds each message spent queued and its priority.
+    """
+
+    def __init__(
+        self,
+        limits: Sequence[int] = DEFAULT_LIMITS,
+        observe: Optional[Callable[[float, int], None]] = None,
+    ):
+        self.limits = tuple(limits)
+        self.observe = observe
+        self.queues: List[Deque[Tuple[Message, bytes, float]]] = [deque() for _ in self.limits]
+        self.sizes = [0] * len(self.limits)
+        self.count = 0
+        self.readable = asyncio.Event()
+        self.writable = [asyncio.Event() for _ in self.limits]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def qsize(self) -> int:
+        return self.count
+
+    def empty(self) -> bool:
+        return not self.count
+
+    def depth(self, priority: int) -> int:
+        """Messages waiting in a priority class."""
+        return len(self.queues[priority])
+
+    def bytes(self, priority: int) -> int:
+        """Bytes waiting in a priority class."""
+        return self.sizes[priority]
+
+    async def put(self, message: Message):
+        frame = message.to_bytes()
+        klass = priority(message.id)
+        while self.sizes[klass] and self.sizes[klass] + len(frame) > self.limits[klass]:
+            self.writable[klass].clear()
+            await self.writable[klass].wait()
+        self.queues[klass].append((message, frame, time.monotonic()))
+        self.sizes[klass] += len(frame)
+        self.count += 1
+        self.readable.set()
+
+    async def get(self) -> Tuple[Message, bytes]:
+        """The next message and its frame, waiting until there is one."""
+        while not self.count:
+            self.readable.clear()
+            await self.readable.wait()
+        return self.get_nowait()
+
+    def get_nowait(self) -> Tuple[Message, bytes]:
+        for klass, queue in enumerate(self.queues):
+            if queue:
+                message, frame, queued_at = queue.popleft()
+                self.sizes[klass] -= len(frame)
+                self.count -= 1
+                self.writable[klass].set()
+                if self.observe is not None:
+                    self.observe(time.monotonic() - queued_at, klass)
+                return message, frame
+        raise asyncio.QueueEmpty
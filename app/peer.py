@@ -1,31 +1,52 @@
 import asyncio
+import time
 import traceback
+from typing import Optional
 
 from pyln.proto.primitives import PrivateKey, PublicKey
-from pyln.proto.wire import LightningConnection, connect
 
+from app.capture import INBOUND, OUTBOUND, CaptureWriter
+from app.dedup import GossipDeduplicator
+from app.gossip_store import GOSSIP_MESSAGE_TYPES, GOSSIP_TYPE_PREFIXES, GossipStore
+from app.gossip_sync import GossipSync
+from app.graph import NetworkGraph
+from app.handlers import HandlerRegistry
 from app.logger import logger
 from app.message_decoder import MessageDecoder
-from app.messages import (
-    GossipTimestampFilterMessage,
-    Message,
-    PingMessage,
-    PongMessage,
-    QueryChannelRangeMessage,
-)
+from app.messages import Message, PingMessage, PongMessage
+from app.metrics import Metrics, type_slot
+from app.outbound import OutboundQueue
+from app.pipeline import DecodePipeline
+from app.transport import AsyncLightningConnection
+from app.verify import GossipVerifier
 
 DEFAULT_PING_INTERVAL = 120
+# Queued messages are coalesced into one socket write up to about this many bytes
+MAX_SEND_BATCH_BYTES = 1 << 20
 
 
 class PeerConnection:
-    lc: LightningConnection
+    lc: AsyncLightningConnection
     local_private_key: PrivateKey
     node_id: PublicKey
     host: str
     port: int
     running: bool
 
-    def __init__(self, s: str, local_private_key: PrivateKey):
+    def __init__(
+        self,
+        s: str,
+        local_private_key: PrivateKey,
+        gossip_store: Optional[GossipStore] = None,
+        graph: Optional[NetworkGraph] = None,
+        gossip_sync: Optional[GossipSync] = None,
+        dedup: Optional[GossipDeduplicator] = None,
+        verifier: Optional[GossipVerifier] = None,
+        pipeline: Optional[DecodePipeline] = None,
+        metrics: Optional[Metrics] = None,
+        capture: Optional[CaptureWriter] = None,
+        handlers: Optional[HandlerRegistry] = None,
+    ):
         node_id, host = s.split("@")
         host, port = host.split(":")
 
@@ -33,37 +54,94 @@ class PeerConnection:
         self.local_private_key = local_private_key
         self.port = int(port)
         self.node_id = PublicKey(bytes.fromhex(node_id))
+        self.node_id_bytes = self.node_id.to_bytes()
         self.running = True
-        self.outgoing_messages = asyncio.Queue()
-
-        self.lc = connect(self.local_private_key, self.node_id, self.host, port=self.port)  # pyright: ignore
+        self.peer_metrics = metrics.peer(str(self)) if metrics is not None else None
+        self.outgoing_messages = OutboundQueue(
+            observe=self.peer_metrics.queue_seconds.observe if self.peer_metrics else None
+        )
+        self.tasks = []
+        self.gossip_store = gossip_store
+        self.graph = graph
+        self.gossip_sync = gossip_sync
+        self.dedup = dedup
+        self.verifier = verifier
+        self.pipeline = pipeline
+        self.metrics = metrics
+        self.ping_sent_at: Optional[float] = None
+        self.capture = capture
+        if handlers is None:
+            gossip = gossip_store is not None or graph is not None or verifier is not None
+            handlers = default_handlers(gossip_sync, gossip)
+        self.handlers = handlers
+
+    async def connect(self):
+        """Open the transport and perform the Bolt 8 handshake."""
+        self.lc = await AsyncLightningConnection.connect(
+            self.local_private_key, self.node_id, self.host, self.port
+        )
 
     def __str__(self):
-        return f"ln://{self.node_id.to_bytes().hex()}@{self.host}:{self.port}"
+        return f"ln://{self.node_id_bytes.hex()}@{self.host}:{self.port}"
 
     async def send(self, message: Message):
-        """Adds a message to the outgoing queue"""
-        logger.info(f"{self} Adding message to outgoing queue: {message}")
+        """Adds a message to the outgoing queue, waiting while its priority class is full"""
+        logger.info("%s Adding message to outgoing queue: %s", self, message.name)
         await self.outgoing_messages.put(message)
 
     async def receive_messages(self):
         """Asynchronously reads incoming messages"""
         while self.running:
             try:
-                data = await asyncio.to_thread(self.lc.read_message)
-                message = MessageDecoder.from_bytes(data)
-                await self.handle_inbound_message(message)
-                logger.info(f"{self} Received: {message}")
+                await self.handle_frame(await self.lc.read_message())
+            except asyncio.IncompleteReadError:
+                logger.info(f"{self} Connection closed by peer")
+                self.running = False
             except ValueError:  # deep error in pyln that we are ignoring for now
                 await asyncio.sleep(1)  # Avoid excessive looping
 
+    async def handle_frame(self, data: bytes):
+        """Record, deduplicate and dispatch one inbound frame."""
+        if self.capture is not None:
+            self.capture.record(data, self.node_id_bytes, INBOUND)
+        if self.peer_metrics is not None:
+            self.peer_metrics.received(data)
+        # Gossip arrives from many peers, repeats are dropped before anything is decoded
+        if self.dedup is not None and self.dedup.is_duplicate(data, str(self)):
+            return
+        skip = None
+        if self.pipeline is not None and data[:2] in GOSSIP_TYPE_PREFIXES:
+            # The pipeline stands in for on_gossip, other gossip handlers are still called
+            await self.pipeline.submit(data, self.accept_summary)
+            skip = PeerConnection.on_gossip
+        # Types without handlers are counted and dropped without being decoded or logged
+        message = await self.handlers.dispatch(self, data, self.decode, skip)
+        if message is None:
+            return
+        # Formatting the whole message decodes every field, so only do it for debug logs.
+        logger.info("%s Received: %s (%d bytes)", self, message.name, len(data))
+        logger.debug("%s Received: %s", self, message)
+
     async def send_messages(self):
         """Sends messages from the queue"""
         while self.running:
             try:
-                msg = await self.outgoing_messages.get()
-                await asyncio.to_thread(self.lc.send_message, msg.to_bytes())
-                logger.info(f"{self} Sent: {msg}")
+                # Everything already queued goes out with the first message in a single write
+                msg, data = await self.outgoing_messages.get()
+                messages, frames, size = [msg], [data], len(data)
+                while size < MAX_SEND_BATCH_BYTES and not self.outgoing_messages.empty():
+                    msg, data = self.outgoing_messages.get_nowait()
+                    messages.append(msg)
+                    frames.append(data)
+                    size += len(data)
+                await self.lc.send_messages(frames)
+                for msg, data in zip(messages, frames):
+                    if self.capture is not None:
+                        self.capture.record(data, self.node_id_bytes, OUTBOUND)
+                    if self.peer_metrics is not None:
+                        self.peer_metrics.sent(data)
+                    logger.info("%s Sent: %s (%d bytes)", self, msg.name, len(data))
+                    logger.debug("%s Sent: %s", self, msg)
             except Exception as e:
                 logger.error(
                     f"{self} Error sending message: {e}. Stack trace: {traceback.format_exc()}"
@@ -75,6 +153,7 @@ class PeerConnection:
         while self.running:
             ping = PingMessage.create(10, bytes.fromhex("aa"))
             logger.info(f"{self} Sending ping")
+            self.ping_sent_at = time.monotonic()
             await self.send(ping)
             await asyncio.sleep(DEFAULT_PING_INTERVAL)
 
@@ -85,27 +164,83 @@ class PeerConnection:
             asyncio.create_task(self.ping_peer()),
         ]
 
+    async def wait_closed(self):
+        """Waits until the first of the peer's tasks ends, e.g. when the connection drops."""
+        await asyncio.wait(self.tasks, return_when=asyncio.FIRST_COMPLETED)
+
     async def stop(self):
         self.running = False
         for task in self.tasks:
             task.cancel()
-
-    async def handle_inbound_message(self, message):
-        if type(message) is PingMessage:
-            pong = PongMessage.create_from_ping(message)
-            logger.info(f"{self} Sending pong")
-            await self.send(pong)
-        elif type(message) is GossipTimestampFilterMessage:
-            # Use this to initiate a gossip request
-            logger.info(
-                f"{self} Using GossipTimestampFilterMessage to initiate a QueryChannelRangeMessage"
-            )
-            query_range_message = QueryChannelRangeMessage.create(
-                message.chain_hash.to_bytes(), 0, 10**6
-            )
-            await self.send(query_range_message)
-
-    def send_init(self):
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if hasattr(self, "lc"):
+            await self.lc.close()
+
+    def decode(self, frame: bytes) -> Message:
+        """Decode a frame that has handlers, timing one decode in DECODE_SAMPLE_INTERVAL."""
+        if self.metrics is not None and self.metrics.sample_decode():
+            start = time.perf_counter()
+            message = MessageDecoder.from_bytes(frame, lazy=True)
+            self.metrics.decode_seconds.observe(time.perf_counter() - start, type_slot(frame))
+            return message
+        return MessageDecoder.from_bytes(frame, lazy=True)
+
+    async def on_ping(self, message: PingMessage):
+        pong = PongMessage.create_from_ping(message)
+        logger.info(f"{self} Sending pong")
+        await self.send(pong)
+
+    async def on_pong(self, message: PongMessage):
+        if self.ping_sent_at is not None and self.peer_metrics is not None:
+            self.peer_metrics.ping_seconds.observe(time.monotonic() - self.ping_sent_at)
+        self.ping_sent_at = None
+
+    async def on_gossip(self, message: Message):
+        if self.verifier is not None:
+            await self.verifier.submit(message, message.to_bytes(), self.accept_gossip)
+        else:
+            self.accept_gossip(message)
+
+    def accept_gossip(self, message: Message):
+        """Store and apply a gossip message, once its signatures are checked when verifying."""
+        if self.gossip_store is not None:
+            self.gossip_store.append(message.to_bytes(), self.node_id_bytes)
+        if self.graph is not None:
+            self.graph.ingest(message)
+        if self.gossip_sync is not None:
+            self.gossip_sync.observe_gossip(self, message.to_bytes())
+
+    def accept_summary(self, frame: bytes, summary: tuple):
+        """Store and apply gossip decoded by the pipeline."""
+        if self.gossip_store is not None:
+            self.gossip_store.append(frame, self.node_id_bytes)
+        if self.graph is not None:
+            self.graph.apply(summary)
+        if self.gossip_sync is not None:
+            self.gossip_sync.observe_gossip(self, frame)
+
+    async def send_init(self):
         # Send an init message, with no global features, and 0b10101010 as local features.
         logger.info(f"{self} Sending hardcoded init message")
-        self.lc.send_message(b"\x00\x10\x00\x00\x00\x01\xaa")
+        init = b"\x00\x10\x00\x00\x00\x01\xaa"
+        await self.lc.send_message(init)
+        if self.capture is not None:
+            self.capture.record(init, self.node_id_bytes, OUTBOUND)
+
+
+def default_handlers(
+    gossip_sync: Optional[GossipSync] = None, gossip: bool = True
+) -> HandlerRegistry:
+    """
+    Handlers for what PeerConnection does itself: answer pings, time pongs, and with gossip,
+    store and apply gossip messages. The gossip sync subscribes to the query replies.
+    """
+    handlers = HandlerRegistry()
+    handlers.subscribe(PingMessage.id, PeerConnection.on_ping)
+    handlers.subscribe(PongMessage.id, PeerConnection.on_pong)
+    if gossip:
+        for gossip_type in GOSSIP_MESSAGE_TYPES:
+            handlers.subscribe(gossip_type, PeerConnection.on_gossip)
+    if gossip_sync is not None:
+        gossip_sync.subscribe(handlers)
+    return handlers
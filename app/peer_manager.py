@@ -0,0 +1,237 @@
+import asyncio
+import random
+import traceback
+from typing import Dict, List, Optional
+
+from pyln.proto.primitives import PrivateKey
+
+from app.capture import CaptureWriter
+from app.dedup import GossipDeduplicator
+from app.gossip_server import GossipServer
+from app.gossip_store import GossipStore
+from app.gossip_sync import BITCOIN_CHAIN_HASH, GossipSync
+from app.graph import NetworkGraph
+from app.handlers import HandlerRegistry
+from app.logger import logger
+from app.message_elements import LIGHTNING_MESSAGE_TYPES
+from app.metrics import Metrics
+from app.outbound import PRIORITY_NAMES
+from app.peer import PeerConnection, default_handlers
+from app.pipeline import DecodePipeline
+from app.verify import GossipVerifier
+
+DEFAULT_MAX_DIALING = 32
+DEFAULT_HANDSHAKE_TIMEOUT = 10
+DEFAULT_INITIAL_BACKOFF = 1
+DEFAULT_MAX_BACKOFF = 300
+
+# Failures of a dial which are logged without a stack trace
+EXPECTED_DIAL_ERRORS = (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError)
+
+
+class PeerManager:
+    """
+    Keeps connections open to many peers from one event loop.
+
+    Each target gets a supervisor task which dials, runs the peer until its connection drops and
+    then redials with exponential backoff. At most max_dialing handshakes are in flight at once.
+    """
+
+    def __init__(
+        self,
+        local_private_key: PrivateKey,
+        max_dialing: int = DEFAULT_MAX_DIALING,
+        handshake_timeout: float = DEFAULT_HANDSHAKE_TIMEOUT,
+        initial_backoff: float = DEFAULT_INITIAL_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        gossip_store: Optional[GossipStore] = None,
+        graph: Optional[NetworkGraph] = None,
+        gossip_sync: Optional[GossipSync] = None,
+        dedup: Optional[GossipDeduplicator] = None,
+        verifier: Optional[GossipVerifier] = None,
+        pipeline: Optional[DecodePipeline] = None,
+        metrics: Optional[Metrics] = None,
+        capture: Optional[CaptureWriter] = None,
+        handlers: Optional[HandlerRegistry] = None,
+        gossip_server: Optional[GossipServer] = None,
+    ):
+        self.local_private_key = local_private_key
+        self.gossip_store = gossip_store
+        self.graph = graph if graph is not None else NetworkGraph()
+        self.gossip_sync = (
+            gossip_sync
+            if gossip_sync is not None
+            else GossipSync(self.graph.has_channel, channel_state=self.graph.channel_state)
+        )
+        self.dedup = (
+            dedup if dedup is not None else GossipDeduplicator(channel_known=self.graph.has_channel)
+        )
+        self.verifier = verifier
+        self.pipeline = pipeline
+        self.metrics = metrics
+        self.capture = capture
+        # One registry is shared by every peer, handlers are called with the peer
+        self.handlers = handlers if handlers is not None else default_handlers(self.gossip_sync)
+        self.gossip_server = gossip_server
+        if gossip_server is not None:
+            gossip_server.subscribe(self.handlers)
+        self.dialing = asyncio.Semaphore(max_dialing)
+        self.handshake_timeout = handshake_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.running = False
+        self.targets: List[str] = []
+        self.peers: Dict[str, PeerConnection] = {}
+        self.reconnects: Dict[str, int] = {}
+        self.supervisors: Dict[str, asyncio.Task] = {}
+        if metrics is not None:
+            self.register_metrics(metrics)
+
+    def register_metrics(self, metrics: Metrics):
+        metrics.add_gauge(
+            "lmp_outgoing_queue_depth",
+            "Messages waiting in a peer's outgoing queue",
+            ("peer", "class"),
+            lambda: [
+                ((str(p), name), p.outgoing_messages.depth(klass))
+                for p in self.peers.values()
+                for klass, name in enumerate(PRIORITY_NAMES)
+            ],
+        )
+        metrics.add_gauge(
+            "lmp_outgoing_queue_bytes",
+            "Bytes waiting in a peer's outgoing queue",
+            ("peer", "class"),
+            lambda: [
+                ((str(p), name), p.outgoing_messages.bytes(klass))
+                for p in self.peers.values()
+                for klass, name in enumerate(PRIORITY_NAMES)
+            ],
+        )
+        metrics.add_gauge(
+            "lmp_skipped_messages",
+            "Messages of types without handlers, dropped without being decoded",
+            ("type",),
+            lambda: [
+                ((LIGHTNING_MESSAGE_TYPES.get(type_id, str(type_id)),), count)
+                for type_id, count in self.handlers.discarded.items()
+            ],
+        )
+        metrics.add_counter(
+            "lmp_reconnects_total",
+            "Times a peer was redialed after a failed dial or a dropped connection",
+            ("address",),
+            lambda: [((address,), count) for address, count in self.reconnects.items()],
+        )
+        if self.gossip_server is not None:
+            server = self.gossip_server
+            metrics.add_gauge(
+                "lmp_gossip_server",
+                "Gossip queries answered, replies served from cache or built, and frames sent",
+                ("counter",),
+                lambda: [((name,), value) for name, value in server.stats().items()],
+            )
+        metrics.add_gauge(
+            "lmp_connected_peers",
+            "Peers with an open connection",
+            (),
+            lambda: [((), len(self.peers))],
+        )
+
+    def add(self, address: str):
+        """Adds a pubkey@host:port target, dialing it right away if the manager is running."""
+        if address in self.targets:
+            return
+        self.targets.append(address)
+        self.reconnects[address] = 0
+        if self.running:
+            self.supervisors[address] = asyncio.create_task(self.supervise(address))
+
+    async def start(self):
+        self.running = True
+        for address in self.targets:
+            if address not in self.supervisors:
+                self.supervisors[address] = asyncio.create_task(self.supervise(address))
+
+    async def stop(self):
+        self.running = False
+        for task in self.supervisors.values():
+            task.cancel()
+        await asyncio.gather(*self.supervisors.values(), return_exceptions=True)
+        self.supervisors.clear()
+        self.gossip_sync.save()
+
+    @property
+    def connected(self) -> List[PeerConnection]:
+        return list(self.peers.values())
+
+    async def dial(self, address: str) -> PeerConnection:
+        peer = PeerConnection(
+            address,
+            self.local_private_key,
+            self.gossip_store,
+            self.graph,
+            self.gossip_sync,
+            self.dedup,
+            self.verifier,
+            self.pipeline,
+            self.metrics,
+            self.capture,
+            self.handlers,
+        )
+        async with self.dialing:
+            try:
+                await asyncio.wait_for(peer.connect(), self.handshake_timeout)
+            except BaseException:
+                await peer.stop()
+                raise
+        return peer
+
+    async def supervise(self, address: str):
+        backoff = self.initial_backoff
+        while self.running:
+            try:
+                peer = await self.dial(address)
+            except Exception as e:
+                # Only cancellation ends a supervisor, anything else is retried
+                if isinstance(e, EXPECTED_DIAL_ERRORS):
+                    logger.info(
+                        f"Failed to connect to {address}: {e!r}, retrying in {backoff:.1f}s"
+                    )
+                else:
+                    logger.error(
+                        f"Failed to connect to {address}: {e!r}, retrying in {backoff:.1f}s. "
+                        f"Stack trace: {traceback.format_exc()}"
+                    )
+                await self.sleep_backoff(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                self.reconnects[address] += 1
+                continue
+
+            backoff = self.initial_backoff
+            self.peers[address] = peer
+            try:
+                await peer.send_init()
+                # Resume right away: our gossip_timestamp_filter and range queries do not wait for
+                # the peer to send its own filter, which some never do
+                await self.gossip_sync.add_peer(
+                    peer, self.gossip_sync.chain_hash or BITCOIN_CHAIN_HASH
+                )
+                await peer.start()
+                await peer.wait_closed()
+                logger.info(f"{peer} Disconnected")
+            except (OSError, asyncio.IncompleteReadError) as e:
+                logger.info(f"{peer} Disconnected: {e!r}")
+            except Exception as e:
+                logger.error(f"{peer} Disconnected: {e!r}. Stack trace: {traceback.format_exc()}")
+            finally:
+                del self.peers[address]
+                self.dedup.remove_source(str(peer))
+                await self.gossip_sync.remove_peer(peer)
+                await peer.stop()
+            self.reconnects[address] += 1
+            await self.sleep_backoff(backoff)
+
+    async def sleep_backoff(self, backoff: float):
+        # Jitter keeps peers which dropped together from redialing in lockstep
+        await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
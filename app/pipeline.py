@@ -0,0 +1,149 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from app.batching import OrderedBatches
+from app.graph import node_announcement_fields
+from app.message_decoder import MessageDecoder
+from app.messages import ChannelAnnouncementMessage, ChannelUpdateMessage, NodeAnnouncementMessage
+from app.verify import ChannelSigners, verify_frame
+
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_BATCH_DELAY = 0.005
+IN_FLIGHT_PER_WORKER = 2
+CHANNEL_ANNOUNCEMENT_PREFIX = ChannelAnnouncementMessage.id.to_bytes(2, byteorder="big")
+CHANNEL_UPDATE_PREFIX = ChannelUpdateMessage.id.to_bytes(2, byteorder="big")
+
+
+def summarize(frame: bytes) -> Optional[Tuple]:
+    """
+    Decode a gossip frame into the plain tuple NetworkGraph.apply takes, None when it is malformed.
+
+    (256, short_channel_id, node_id_1, node_id_2)
+    (257, timestamp, node_id, features, rgb_color, alias, addresses)
+    (258, short_channel_id, timestamp, message_flags, channel_flags, cltv_expiry_delta,
+     htlc_minimum_msat, fee_base_msat, fee_proportional_millionths, htlc_maximum_msat)
+    """
+    try:
+        type_id = int.from_bytes(frame[:2], byteorder="big")
+        if type_id == NodeAnnouncementMessage.id:
+            return (type_id, *node_announcement_fields(frame))
+        message = MessageDecoder.from_bytes(frame)
+        if type_id == ChannelAnnouncementMessage.id:
+            return (
+                type_id,
+                int.from_bytes(message.short_channel_id.data, byteorder="big"),
+                message.node_id_1.data,
+                message.node_id_2.data,
+            )
+        if type_id == ChannelUpdateMessage.id:
+            return (
+                type_id,
+                int.from_bytes(message.short_channel_id.data, byteorder="big"),
+                message.timestamp.value,
+                message.message_flags.data[0],
+                message.channel_flags.data[0],
+                message.cltv_expiry_delta.num_bytes,
+                message.htlc_minimum_msat.value,
+                message.fee_base_msat.value,
+                message.fee_proportional_millionths.value,
+                message.htlc_maximum_msat.value,
+            )
+    except (ValueError, IndexError, AttributeError):
+        pass
+    return None
+
+
+def summarize_batch(frames: Sequence[bytes]) -> List[Optional[Tuple]]:
+    """Summarize a batch of frames, run in a worker process."""
+    return [summarize(frame) for frame in frames]
+
+
+def verify_and_summarize_batch(
+    items: Sequence[Tuple[bytes, Optional[bytes]]],
+) -> List[Union[Tuple, None, bool]]:
+    """Summarize the (frame, signer) pairs whose signatures check out, False for the others."""
+    return [summarize(frame) if verify_frame(frame, signer) else False for frame, signer in items]
+
+
+class DecodePipeline:
+    """
+    Decodes inbound gossip in worker processes instead of on the event loop.
+
+    Raw frames are shipped to the workers in pickled batches and come back as small summary tuples
+    which NetworkGraph.apply takes directly, so the event loop never builds message objects for
+    gossip. Batches are spread over every worker and delivered in submission order, which keeps
+    each peer's gossip in the order it was received.
+
+    With channel_nodes, the workers also check signatures as part of decoding, and frames which
+    fail are dropped. Which node signs a channel_update is tracked on the loop by ChannelSigners,
+    as GossipVerifier does.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_delay: float = DEFAULT_BATCH_DELAY,
+        channel_nodes: Optional[Callable[[int], Tuple[bytes, bytes]]] = None,
+    ):
+        workers = workers or os.cpu_count() or 1
+        if executor is None:
+            executor = ProcessPoolExecutor(workers)
+        self.signers = ChannelSigners(channel_nodes) if channel_nodes is not None else None
+        self.batches = OrderedBatches(
+            executor,
+            summarize_batch if self.signers is None else verify_and_summarize_batch,
+            self.deliver,
+            batch_size,
+            batch_delay,
+            IN_FLIGHT_PER_WORKER * workers,
+        )
+        self.decoded = 0
+        self.malformed = 0
+        self.rejected = 0
+        self.unknown_channel = 0
+
+    async def submit(self, frame: bytes, on_decoded: Callable[[bytes, Tuple], None]):
+        """Queue a raw gossip frame, on_decoded is called with it and its summary."""
+        if self.signers is None:
+            await self.batches.submit(frame, on_decoded)
+            return
+        signer = None
+        prefix = frame[:2]
+        if prefix == CHANNEL_UPDATE_PREFIX:
+            signer = self.signers.signer(frame)
+            if signer is None:
+                # Nothing to check it against, and the graph would drop it anyway
+                self.unknown_channel += 1
+                return
+        elif prefix == CHANNEL_ANNOUNCEMENT_PREFIX:
+            self.signers.announced(frame)
+        await self.batches.submit((frame, signer), on_decoded)
+
+    def deliver(self, items: List, contexts: List[Callable[[bytes, Tuple], None]], summaries):
+        signers = self.signers
+        for item, on_decoded, summary in zip(items, contexts, summaries):
+            if signers is None:
+                frame = item
+            else:
+                frame, signer = item
+                if frame[:2] == CHANNEL_ANNOUNCEMENT_PREFIX:
+                    signers.settled(frame)
+                elif summary and signer is not None and not signers.confirms(frame, signer):
+                    summary = False
+            if not summary:
+                if summary is None:
+                    self.malformed += 1
+                else:
+                    self.rejected += 1
+                continue
+            self.decoded += 1
+            on_decoded(frame, summary)
+
+    async def drain(self):
+        await self.batches.drain()
+
+    def close(self):
+        self.batches.close()
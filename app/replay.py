@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+from pyln.proto.primitives import PrivateKey
+
+from app.capture import INBOUND, read_capture
+from app.graph import NetworkGraph
+from app.peer import PeerConnection
+
+REPLAY_QUEUE_SIZE = 1024
+
+
+class ReplayConnection:
+    """Stands in for AsyncLightningConnection, reading frames queued from a capture."""
+
+    def __init__(self):
+        self.frames: asyncio.Queue[Optional[bytes]] = asyncio.Queue(REPLAY_QUEUE_SIZE)
+        self.sent = 0
+
+    async def read_message(self) -> bytes:
+        frame = await self.frames.get()
+        if frame is None:
+            raise asyncio.IncompleteReadError(b"", None)
+        return frame
+
+    async def send_message(self, message: bytes):
+        self.sent += 1
+
+    async def send_messages(self, messages: Iterable[bytes]):
+        self.sent += sum(1 for _ in messages)
+
+    async def close(self):
+        pass
+
+
+async def replay(
+    path: str, realtime: bool = False, speed: float = 1.0, **peer_options
+) -> Tuple[int, float]:
+    """
+    Feed the inbound frames of a capture through PeerConnection, one per captured peer.
+
+    Frames go through the same receive path as live ones, decoding and handlers included, either
+    as fast as possible or, with realtime, at their captured pace divided by speed. The time
+    between the sessions of a capture that was appended to is skipped. peer_options
+    are passed on to PeerConnection. Returns (frames replayed, seconds taken).
+    """
+    loop = asyncio.get_running_loop()
+    local_private_key = PrivateKey(os.urandom(32))
+    peers: Dict[bytes, PeerConnection] = {}
+    session: Optional[int] = None
+    first = anchor = 0.0
+    count = 0
+    start = loop.time()
+    try:
+        for record in read_capture(path):
+            if record.direction != INBOUND:
+                continue
+            if realtime:
+                if record.session != session:
+                    # Each session's timestamps come from the monotonic clock of its own process
+                    session, first, anchor = record.session, record.timestamp, loop.time()
+                delay = anchor + (record.timestamp - first) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            peer = peers.get(record.peer_id)
+            if peer is None:
+                address = f"{record.peer_id.hex()}@capture:0"
+                peer = peers[record.peer_id] = PeerConnection(
+                    address, local_private_key, **peer_options
+                )
+                peer.lc = ReplayConnection()  # pyright: ignore
+                peer.tasks = [
+                    asyncio.create_task(peer.receive_messages()),
+                    asyncio.create_task(peer.send_messages()),
+                ]
+            await peer.lc.frames.put(record.frame)  # pyright: ignore
+            count += 1
+        for peer in peers.values():
+            await peer.lc.frames.put(None)  # pyright: ignore
+        await asyncio.gather(*(peer.tasks[0] for peer in peers.values()))
+    finally:
+        for peer in peers.values():
+            await peer.stop()
+    return count, loop.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a wire capture into a NetworkGraph")
+    parser.add_argument("capture")
+    parser.add_argument(
+        "--realtime", action="store_true", help="keep the captured pace instead of max speed"
+    )
+    parser.add_argument("--speed", type=float, default=1.0, help="realtime speed up")
+    args = parser.parse_args()
+
+    graph = NetworkGraph()
+    count, elapsed = asyncio.run(replay(args.capture, args.realtime, args.speed, graph=graph))
+    print(f"frames: {count}, {elapsed:.2f}s, {count / max(elapsed, 1e-9):.0f} frames/s")
+    print(f"channels: {len(graph)}, nodes: {graph.num_nodes}")
+
+
+if __name__ == "__main__":
+    main()
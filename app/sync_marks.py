@@ -0,0 +1,88 @@
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+MAGIC = b"LMPMARK\x01"
+# Record: chain hash, peer node id (all zeros for the chain wide mark), newest gossip timestamp,
+# highest block synced
+RECORD = struct.Struct(">32s33sII")
+CHAIN_WIDE = bytes(33)
+
+# Timestamps further ahead of our clock than this are not trusted as marks, a peer with a bad
+# clock would otherwise make us skip everything until it is reached
+MAX_CLOCK_SKEW = 24 * 3600
+
+
+@dataclass
+class Mark:
+    timestamp: int = 0
+    block: int = 0
+
+
+class SyncMarks:
+    """
+    High-water marks of gossip sync, per chain and per peer, persisted so a restart can resume.
+
+    timestamp is the newest gossip timestamp received and block the highest block whose channels
+    have been synced. Each peer has its own marks. The chain wide timestamp is the newest from any
+    peer, the chain wide block only rises once a whole sync has completed. The file is a few
+    fixed size records, rewritten whole and atomically on save.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.marks: Dict[Tuple[bytes, bytes], Mark] = {}
+        self.dirty = False
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, "rb") as f:  # pyright: ignore
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{self.path} is not a sync marks file")
+        end = len(data) - (len(data) - len(MAGIC)) % RECORD.size
+        for chain_hash, peer_id, timestamp, block in RECORD.iter_unpack(data[len(MAGIC) : end]):
+            self.marks[chain_hash, peer_id] = Mark(timestamp, block)
+
+    def save(self):
+        """Write the marks if they changed, through a temporary file so a crash keeps the old."""
+        if self.path is None or not self.dirty:
+            return
+        records = b"".join(
+            RECORD.pack(chain_hash, peer_id, mark.timestamp, mark.block)
+            for (chain_hash, peer_id), mark in self.marks.items()
+        )
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(MAGIC + records)
+        os.replace(temporary, self.path)
+        self.dirty = False
+
+    def get(self, chain_hash: bytes, peer_id: Optional[bytes] = None) -> Optional[Mark]:
+        """The marks of a peer, or the chain wide marks when peer_id is None."""
+        return self.marks.get((chain_hash, CHAIN_WIDE if peer_id is None else peer_id))
+
+    def mark(self, chain_hash: bytes, peer_id: bytes) -> Mark:
+        mark = self.marks.get((chain_hash, peer_id))
+        if mark is None:
+            mark = self.marks[chain_hash, peer_id] = Mark()
+        return mark
+
+    def observe_timestamp(self, chain_hash: bytes, peer_id: bytes, timestamp: int):
+        if timestamp > time.time() + MAX_CLOCK_SKEW:
+            return
+        for key in (peer_id, CHAIN_WIDE):
+            mark = self.mark(chain_hash, key)
+            if timestamp > mark.timestamp:
+                mark.timestamp = timestamp
+                self.dirty = True
+
+    def observe_block(self, chain_hash: bytes, peer_id: Optional[bytes], block: int):
+        """Raise the block mark of a peer, or of the chain when peer_id is None."""
+        mark = self.mark(chain_hash, CHAIN_WIDE if peer_id is None else peer_id)
+        if block > mark.block:
+            mark.block = block
+            self.dirty = True
@@ -1,21 +1,92 @@
 import argparse
 import os
 import sys
+from typing import List
 
 from ecdsa import SECP256k1, SigningKey
 from pyln.proto.primitives import PrivateKey
 
+from app.dedup import DEFAULT_MAX_ENTRIES
+from app.peer_manager import DEFAULT_HANDSHAKE_TIMEOUT, DEFAULT_MAX_DIALING
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
         prog="lightning-mini-peer",
         description="A minimal lightning peer for testing and development",
     )
-    parser.add_argument("host", help="the peer address in pubkey@host:port format")
+    parser.add_argument("hosts", nargs="*", help="peer addresses in pubkey@host:port format")
+    parser.add_argument(
+        "--peers-file", help="a file with one pubkey@host:port address per line to connect to"
+    )
+    parser.add_argument(
+        "--max-dialing",
+        type=int,
+        default=DEFAULT_MAX_DIALING,
+        help="the maximum number of handshakes in flight at once",
+    )
+    parser.add_argument(
+        "--handshake-timeout",
+        type=float,
+        default=DEFAULT_HANDSHAKE_TIMEOUT,
+        help="seconds to wait for a connection and handshake before retrying",
+    )
+    parser.add_argument(
+        "--gossip-store", help="append received gossip to this file, indexed for lookups"
+    )
+    parser.add_argument(
+        "--sync-state",
+        help="keep gossip sync high-water marks in this file and resume from them on restart",
+    )
+    parser.add_argument(
+        "--dedup-entries",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help="gossip frames remembered to drop repeats, about 64 bytes each",
+    )
+    parser.add_argument(
+        "--serve-gossip",
+        action="store_true",
+        help="answer the gossip queries of peers from our graph, and gossip store when given",
+    )
+    parser.add_argument(
+        "--verify-signatures",
+        action="store_true",
+        help="check gossip signatures in a process pool, dropping messages which fail",
+    )
+    parser.add_argument(
+        "--decode-workers",
+        type=int,
+        default=0,
+        help="decode gossip in this many worker processes instead of on the event loop",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--capture", help="record every decrypted frame sent and received to this binary file"
+    )
     if len(sys.argv) < 2:
         parser.print_help()
         sys.exit(1)
-    return parser.parse_args()
+    args = parser.parse_args()
+    args.hosts = list(args.hosts)
+    if args.peers_file:
+        args.hosts += read_peers_file(args.peers_file)
+    if not args.hosts:
+        parser.error("at least one peer address is required")
+    if args.sync_state and not args.gossip_store:
+        parser.error("--sync-state needs --gossip-store to hold the graph it resumes from")
+    return args
+
+
+def read_peers_file(path: str) -> List[str]:
+    """Read peer addresses from a file, ignoring blank lines and # comments."""
+    with open(path, "r") as f:
+        lines = [line.split("#", 1)[0].strip() for line in f]
+    return [line for line in lines if line]
 
 
 def generate_private_key():
@@ -0,0 +1,206 @@
+import hashlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from ecdsa import SECP256k1
+from ecdsa.util import sigdecode_string, sigencode_der
+from pyln.proto.primitives import PublicKey
+
+from app.batching import OrderedBatches
+from app.gossip_store import (
+    CHANNEL_ANNOUNCEMENT_FEATURES_LEN,
+    CHANNEL_UPDATE_CHANNEL_FLAGS,
+    CHANNEL_UPDATE_SCID,
+    NODE_ANNOUNCEMENT_FEATURES_LEN,
+    channel_announcement_ids,
+)
+from app.messages import (
+    ChannelAnnouncementMessage,
+    ChannelUpdateMessage,
+    Message,
+    NodeAnnouncementMessage,
+)
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_BATCH_DELAY = 0.005
+DEFAULT_MAX_IN_FLIGHT = 4
+NODE_KEY_CACHE_SIZE = 1 << 16
+# channel_update and node_announcement sign everything after their one signature
+SIGNED_OFFSET = 2 + 64
+
+
+@lru_cache(maxsize=NODE_KEY_CACHE_SIZE)
+def node_key(node_id: bytes):
+    """A parsed node public key, cached since nodes sign many messages."""
+    return PublicKey(node_id).key
+
+
+def check_signature(signature: bytes, key, digest: bytes) -> bool:
+    """Check a 64 byte compact signature of a digest against a coincurve public key."""
+    order = SECP256k1.order
+    der = sigencode_der(*sigdecode_string(signature, order), order)
+    return key.verify(der, digest, hasher=None)
+
+
+def signed_digest(frame: bytes, start: int) -> bytes:
+    """The double SHA256 of the signed part of a frame, see Bolt 7."""
+    return hashlib.sha256(hashlib.sha256(frame[start:]).digest()).digest()
+
+
+def verify_frame(frame: bytes, signer: Optional[bytes] = None) -> bool:
+    """
+    Check every signature of a raw gossip frame.
+
+    signer is the node_id which signed a channel_update, which the frame itself does not hold.
+    """
+    try:
+        type_id = int.from_bytes(frame[:2], byteorder="big")
+        if type_id == ChannelAnnouncementMessage.id:
+            start = CHANNEL_ANNOUNCEMENT_FEATURES_LEN
+            flen = int.from_bytes(frame[start : start + 2], byteorder="big")
+            keys = start + 2 + flen + 32 + 8
+            if len(frame) < keys + 4 * 33:
+                return False
+            digest = signed_digest(frame, start)
+            # node_id_1, node_id_2, bitcoin_key_1, bitcoin_key_2 in the order of their signatures
+            for i in range(4):
+                key = frame[keys + 33 * i : keys + 33 * (i + 1)]
+                key = node_key(key) if i < 2 else PublicKey(key).key
+                if not check_signature(frame[2 + 64 * i : 66 + 64 * i], key, digest):
+                    return False
+            return True
+        if type_id == ChannelUpdateMessage.id and signer is not None:
+            digest = signed_digest(frame, SIGNED_OFFSET)
+            return check_signature(frame[2:SIGNED_OFFSET], node_key(signer), digest)
+        if type_id == NodeAnnouncementMessage.id:
+            start = NODE_ANNOUNCEMENT_FEATURES_LEN
+            node_id = start + 2 + int.from_bytes(frame[start : start + 2], byteorder="big") + 4
+            digest = signed_digest(frame, SIGNED_OFFSET)
+            key = node_key(frame[node_id : node_id + 33])
+            return check_signature(frame[2:SIGNED_OFFSET], key, digest)
+    except Exception:
+        # Truncated frames, keys off the curve and malformed signatures all fail verification
+        return False
+    return False
+
+
+def verify_batch(items: Sequence[Tuple[bytes, Optional[bytes]]]) -> List[bool]:
+    """Verify (frame, signer) pairs, run in a worker process."""
+    return [verify_frame(frame, signer) for frame, signer in items]
+
+
+class ChannelSigners:
+    """
+    Which node must have signed each channel_update.
+
+    For a channel the graph holds, that is always one of the graph's nodes, never a node named by
+    an announcement awaiting verification, which anyone can send for an existing scid. Channels
+    the graph does not hold yet take the nodes of their pending announcement, and updates checked
+    against those are confirmed once the announcement reached the graph.
+    """
+
+    def __init__(self, channel_nodes: Callable[[int], Tuple[bytes, bytes]]):
+        self.channel_nodes = channel_nodes
+        # Nodes of channel_announcements which are submitted but not yet delivered
+        self.pending: Dict[bytes, Tuple[bytes, bytes]] = {}
+
+    def known(self, scid: bytes) -> Optional[Tuple[bytes, bytes]]:
+        try:
+            return self.channel_nodes(int.from_bytes(scid, byteorder="big"))
+        except KeyError:
+            return None
+
+    def announced(self, frame: bytes):
+        """Note a channel_announcement submitted for verification."""
+        scid, node_id_1, node_id_2 = channel_announcement_ids(frame)
+        if self.known(scid) is None:
+            self.pending[scid] = (node_id_1, node_id_2)
+
+    def settled(self, frame: bytes):
+        """A channel_announcement was verified or rejected."""
+        self.pending.pop(channel_announcement_ids(frame)[0], None)
+
+    def signer(self, frame: bytes) -> Optional[bytes]:
+        """The node_id which must have signed a channel_update, None if its channel is unknown."""
+        scid = frame[CHANNEL_UPDATE_SCID]
+        nodes = self.known(scid)
+        if nodes is None:
+            nodes = self.pending.get(scid)
+            if nodes is None:
+                return None
+        return nodes[frame[CHANNEL_UPDATE_CHANNEL_FLAGS] & 1]
+
+    def confirms(self, frame: bytes, signer: bytes) -> bool:
+        """Whether a verified channel_update's signer is its channel's node in the graph now."""
+        nodes = self.known(frame[CHANNEL_UPDATE_SCID])
+        return nodes is not None and nodes[frame[CHANNEL_UPDATE_CHANNEL_FLAGS] & 1] == signer
+
+
+class GossipVerifier:
+    """
+    Checks gossip signatures in a process pool before the messages are used.
+
+    Messages are verified in OrderedBatches, on separate cores with the default
+    ProcessPoolExecutor. Results are delivered in submission order, so a channel_update is only
+    passed on after the channel_announcement it depends on.
+    """
+
+    def __init__(
+        self,
+        channel_nodes: Callable[[int], Tuple[bytes, bytes]],
+        executor: Optional[Executor] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_delay: float = DEFAULT_BATCH_DELAY,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ):
+        self.signers = ChannelSigners(channel_nodes)
+        self.pending_channels = self.signers.pending
+        self.batches = OrderedBatches(
+            executor if executor is not None else ProcessPoolExecutor(),
+            verify_batch,
+            self.deliver,
+            batch_size,
+            batch_delay,
+            max_in_flight,
+        )
+        self.verified = 0
+        self.rejected = 0
+        self.unknown_channel = 0
+
+    async def submit(self, message: Message, frame: bytes, on_verified: Callable[[Message], None]):
+        """Queue a gossip message, on_verified is called with it once its signatures check out."""
+        signer = None
+        if message.id == ChannelUpdateMessage.id:
+            signer = self.signers.signer(frame)
+            if signer is None:
+                # Nothing to check it against, and the graph would drop it anyway
+                self.unknown_channel += 1
+                return
+        elif message.id == ChannelAnnouncementMessage.id:
+            self.signers.announced(frame)
+        await self.batches.submit((frame, signer), (message, on_verified))
+
+    def deliver(
+        self,
+        items: List[Tuple[bytes, Optional[bytes]]],
+        contexts: List[Tuple[Message, Callable[[Message], None]]],
+        results: List[Optional[bool]],
+    ):
+        for (frame, signer), (message, on_verified), ok in zip(items, contexts, results):
+            if message.id == ChannelAnnouncementMessage.id:
+                self.signers.settled(frame)
+            elif ok and signer is not None:
+                ok = self.signers.confirms(frame, signer)
+            if ok:
+                self.verified += 1
+                on_verified(message)
+            else:
+                self.rejected += 1
+
+    async def drain(self):
+        """Verify everything submitted so far and wait for it to be delivered."""
+        await self.batches.drain()
+
+    def close(self):
+        self.batches.close()
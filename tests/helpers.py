@@ -0,0 +1,24 @@
+"""Fakes shared by the gossip sync and gossip server tests."""
+
+NODE_ID = b"\x02" * 33
+
+
+class FakePeer:
+    """Collects the messages sent to a peer instead of sending them."""
+
+    def __init__(self, node_id: bytes = NODE_ID):
+        self.node_id_bytes = node_id
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def of_type(self, message_type):
+        return [m for m in self.sent if type(m) is message_type]
+
+    def last(self, message_type):
+        return self.of_type(message_type)[-1]
+
+
+def scid(block: int, tx: int = 0) -> int:
+    return block << 40 | tx << 16
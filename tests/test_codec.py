@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.message_decoder import MESSAGE_MAP, MessageDecoder
+from app.messages import (
+    ChannelAnnouncementMessage,
+    ChannelUpdateMessage,
+    GossipTimestampFilterMessage,
+    Message,
+    MessageProperty,
+    QueryChannelRangeMessage,
+)
+
+
+def decode_element_by_element(data: bytes):
+    """Reference decoder which walks features() one element at a time."""
+    message_class = MESSAGE_MAP.get(int.from_bytes(data[:2], "big"), Message)
+    properties = {}
+    chunked = data
+    for key, feature in message_class.features():
+        properties[key], chunked = feature.from_bytes(chunked)
+    return properties, chunked
+
+
+def test_fixed_width_layouts():
+    assert ChannelUpdateMessage.codec().is_fixed_width
+    assert ChannelUpdateMessage.codec().layout.size == 138
+    assert GossipTimestampFilterMessage.codec().is_fixed_width
+    # Only its trailing TLV stream is variable length
+    assert QueryChannelRangeMessage.codec().layout.size == 2 + 32 + 4 + 4
+    assert [key for key, _ in QueryChannelRangeMessage.codec().tail] == [MessageProperty.TLV_STREAM]
+    codec = ChannelAnnouncementMessage.codec()
+    assert not codec.is_fixed_width
+    assert codec.layout.size == 2 + 4 * 64
+    assert codec.tail[0][0] is MessageProperty.CHANNEL_FEATURES
+
+
+def test_codec_is_cached_per_class():
+    assert ChannelUpdateMessage.codec() is ChannelUpdateMessage.codec()
+    assert ChannelUpdateMessage.codec() is not Message.codec()
+
+
+def test_examples_match_element_by_element_decoding():
+    f = open("data/examples", "r")
+    for line in f:
+        data = bytes.fromhex(line)
+        msg = MessageDecoder.from_bytes(data)
+        properties, remainder = decode_element_by_element(data)
+        for key, element in properties.items():
+            assert msg.properties[key] == element
+        if remainder:
+            assert msg.properties[MessageProperty.REMAINDER].data == remainder
+        assert msg.to_bytes() == data
+
+
+def test_truncated_message_falls_back():
+    data = bytes.fromhex("0109" + "00" * 10)
+    msg = MessageDecoder.from_bytes(data)
+    assert type(msg) is GossipTimestampFilterMessage
+    assert msg.chain_hash.data == bytes(10)
@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+np = pytest.importorskip("numpy")
+
+from app.columnar import decode_channel_announcements, decode_channel_updates
+from app.message_decoder import MessageDecoder
+
+
+def load_examples(type_hex: str):
+    with open("data/examples", "r") as f:
+        return [bytes.fromhex(line) for line in f if line.startswith(type_hex)]
+
+
+def test_decode_channel_updates():
+    frames = load_examples("0102")
+    records = decode_channel_updates(frames)
+    assert len(records) == len(frames)
+    for record, frame in zip(records, frames):
+        m = MessageDecoder.from_bytes(frame)
+        assert record["short_channel_id"] == int.from_bytes(m.short_channel_id.data, "big")
+        assert record["timestamp"] == m.timestamp.value
+        assert record["channel_flags"] == m.channel_flags.data[0]
+        assert record["cltv_expiry_delta"] == m.cltv_expiry_delta.num_bytes
+        assert record["fee_base_msat"] == m.fee_base_msat.value
+        assert record["htlc_maximum_msat"] == m.htlc_maximum_msat.value
+        assert record["signature"].tobytes() == m.signature.data
+        assert record["chain_hash"].tobytes() == m.chain_hash.data
+
+
+def test_decode_length_prefixed_buffer():
+    frames = load_examples("0102")
+    buffer = b"".join(len(f).to_bytes(2, "big") + f for f in frames)
+    assert np.array_equal(decode_channel_updates(buffer), decode_channel_updates(frames))
+
+
+def test_decode_channel_announcements():
+    frames = load_examples("0100")
+    records = decode_channel_announcements(frames)
+    m = MessageDecoder.from_bytes(frames[0])
+    assert records[0]["node_id_1"].tobytes() == m.node_id_1.data
+    assert records[0]["bitcoin_key_2"].tobytes() == m.bitcoin_key_2.data
+    assert records[0]["short_channel_id"] == int.from_bytes(m.short_channel_id.data, "big")
+
+
+def test_rejects_other_types_and_short_frames():
+    with pytest.raises(ValueError):
+        decode_channel_updates(load_examples("0100"))
+    with pytest.raises(ValueError):
+        decode_channel_updates([load_examples("0102")[0][:100]])
@@ -0,0 +1,52 @@
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.corpus import channel_updates, synthetic_channel_update
+from app.message_decoder import MessageDecoder
+from app.message_elements import U32Element
+from app.messages import ChannelUpdateMessage, FieldArray, MessageProperty, PingMessage
+
+
+def test_messages_and_elements_have_no_dict():
+    m = MessageDecoder.from_bytes(next(channel_updates(1)))
+    assert isinstance(m.properties, FieldArray)
+    assert not hasattr(m, "__dict__")
+    assert not hasattr(m.timestamp, "__dict__")
+    assert not hasattr(m.short_channel_id, "__dict__")
+
+
+def test_accessors_are_defined_per_class():
+    assert isinstance(ChannelUpdateMessage.__dict__["fee_base_msat"], property)
+    m = MessageDecoder.from_bytes(next(channel_updates(1)))
+    assert m.fee_base_msat is m.properties[MessageProperty.FEE_BASE_MSAT]
+
+
+def test_edits_to_fields_are_encoded():
+    m = MessageDecoder.from_bytes(synthetic_channel_update(1 << 40, 0, 1000))
+    m.timestamp.value = 7
+    m.properties[MessageProperty.FEE_BASE_MSAT] = U32Element(5)
+    assert m.timestamp is m.timestamp
+    assert m.to_bytes() == synthetic_channel_update(1 << 40, 0, 7, fee_base_msat=5)
+
+
+def test_created_messages_are_compact():
+    ping = PingMessage.create(10, b"\xaa")
+    assert isinstance(ping.properties, FieldArray)
+    assert list(ping.properties) == [key for key, _ in PingMessage.features()]
+    assert ping == MessageDecoder.from_bytes(ping.to_bytes())
+
+
+def test_held_channel_updates_are_small():
+    frames = list(channel_updates(10_000))
+    tracemalloc.start()
+    held = [MessageDecoder.from_bytes(frame) for frame in frames]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(held) == len(frames)
+    # A dict of dataclass elements took about 2 KB per message
+    assert size / len(held) < 700
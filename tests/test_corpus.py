@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from app.corpus import channel_updates, init_message, message_samples, reply_channel_range
+from app.message_decoder import MESSAGE_MAP, MessageDecoder
+from app.message_elements import ENCODING_ZLIB
+
+
+def test_samples_cover_every_message_class_and_round_trip():
+    samples = message_samples()
+    assert {int.from_bytes(frame[:2], "big") for _, frame in samples} >= MESSAGE_MAP.keys()
+    for _, frame in samples:
+        message = MessageDecoder.from_bytes(frame)
+        assert type(message) is MESSAGE_MAP[message.id]
+        assert message.to_bytes() == frame
+
+
+def test_corpus_is_deterministic():
+    assert list(channel_updates(100, seed=1)) == list(channel_updates(100, seed=1))
+    assert list(channel_updates(100, seed=1)) != list(channel_updates(100, seed=2))
+    assert message_samples(3) == message_samples(3)
+
+
+def test_large_messages():
+    reply = MessageDecoder.from_bytes(reply_channel_range())
+    assert reply.encoded_short_channel_ids.encoding == ENCODING_ZLIB
+    assert len(reply.encoded_short_channel_ids.short_channel_ids()) == 12_000
+    with pytest.raises(ValueError):
+        reply_channel_range(50_000)
+
+    init = MessageDecoder.from_bytes(init_message(16 * 1024))
+    assert len(init.local_features.data) == 16 * 1024
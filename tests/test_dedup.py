@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.corpus import synthetic_channel_announcement, synthetic_channel_update
+from app.dedup import GossipDeduplicator
+from app.graph import NetworkGraph
+from app.message_decoder import MessageDecoder
+
+
+def test_repeats_are_dropped_and_counted_per_peer():
+    dedup = GossipDeduplicator()
+    update = synthetic_channel_update(1 << 40, 0, 1000)
+    newer = synthetic_channel_update(1 << 40, 0, 1001)
+
+    assert not dedup.is_duplicate(update, "a")
+    assert dedup.is_duplicate(update, "b")
+    assert dedup.is_duplicate(update, "a")
+    assert not dedup.is_duplicate(newer, "b")
+    assert (dedup.counters["a"].hits, dedup.counters["a"].misses) == (1, 1)
+    assert (dedup.counters["b"].hits, dedup.counters["b"].misses) == (1, 1)
+
+
+def test_only_gossip_is_filtered():
+    dedup = GossipDeduplicator()
+    ping = bytes.fromhex("0012000a0001aa")
+    assert not dedup.is_duplicate(ping)
+    assert not dedup.is_duplicate(ping)
+    assert dedup.counters == {}
+
+
+def test_memory_is_bounded():
+    dedup = GossipDeduplicator(max_entries=100)
+    frames = [synthetic_channel_update(1 << 40, 0, t) for t in range(1, 1001)]
+    for frame in frames:
+        assert not dedup.is_duplicate(frame)
+        assert len(dedup) <= 100
+    # The newest half of the budget is always remembered
+    assert all(dedup.is_duplicate(frame) for frame in frames[-50:])
+    assert not dedup.is_duplicate(frames[0])
+
+
+def test_updates_of_unknown_channels_are_not_remembered():
+    graph = NetworkGraph()
+    dedup = GossipDeduplicator(channel_known=graph.has_channel)
+    announcement = synthetic_channel_announcement(1 << 40, b"\x02" * 33, b"\x03" * 33)
+    update = synthetic_channel_update(1 << 40, 0, 1000)
+
+    # Ahead of its channel_announcement the graph drops the update, a later copy must get through
+    assert not dedup.is_duplicate(update, "a")
+    assert not graph.ingest(MessageDecoder.from_bytes(update))
+    assert not dedup.is_duplicate(announcement, "b")
+    assert graph.ingest(MessageDecoder.from_bytes(announcement))
+    assert not dedup.is_duplicate(update, "b")
+    assert graph.ingest(MessageDecoder.from_bytes(update))
+    assert dedup.is_duplicate(update, "a")
+
+    dedup.remove_source("a")
+    assert list(dedup.counters) == ["b"]
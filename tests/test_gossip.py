@@ -1,12 +1,20 @@
 import sys
+from array import array
 from pathlib import Path
 
+import pytest
+
 # Add the project root to sys.path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
 from app.message_decoder import MessageDecoder
-from app.messages import GossipTimestampFilterMessage
+from app.message_elements import (
+    ENCODING_UNCOMPRESSED,
+    ENCODING_ZLIB,
+    EncodedShortChannelIdsElement,
+)
+from app.messages import GossipTimestampFilterMessage, QueryShortChannelIDsMessage
 
 
 def test_gossip_timestamp_filter():
@@ -15,3 +23,36 @@ def test_gossip_timestamp_filter():
     assert type(m) is GossipTimestampFilterMessage
     assert m.first_timestamp.value == 1741083619  # pyright: ignore
     assert m.timestamp_range.value == 0xFFFFFFFF  # pyright: ignore
+
+
+def test_encoded_short_channel_ids():
+    ids = [(700_000 + i) << 40 | i << 16 | (i % 3) for i in range(1000)]
+    for encoding in (ENCODING_UNCOMPRESSED, ENCODING_ZLIB):
+        element = EncodedShortChannelIdsElement.create(ids, encoding)
+        assert element.encoding == encoding
+        assert list(element.short_channel_ids()) == ids
+    raw = EncodedShortChannelIdsElement.create(ids[:2])
+    assert raw.data == b"\x00" + b"".join(i.to_bytes(8, "big") for i in ids[:2])
+    assert EncodedShortChannelIdsElement(0, b"").short_channel_ids() == array("Q")
+
+
+def test_query_short_channel_ids_round_trip():
+    chain_hash = bytes.fromhex("06226e46111a0b59caaf126043eb5bbf28c34f3a5e332a1fc7b2b73cf188910f")
+    ids = [800_000 << 40 | 1 << 16, 800_001 << 40 | 2 << 16 | 1]
+    query = QueryShortChannelIDsMessage.create(chain_hash, ids, ENCODING_ZLIB)
+    m = MessageDecoder.from_bytes(query.to_bytes())
+    assert type(m) is QueryShortChannelIDsMessage
+    assert m.chain_hash.data == chain_hash
+    assert list(m.encoded_short_channel_ids.short_channel_ids()) == ids
+
+
+def test_split_short_channel_ids():
+    np = pytest.importorskip("numpy")
+    from app.columnar import split_short_channel_ids
+
+    ids = EncodedShortChannelIdsElement.create([700_000 << 40 | 5 << 16 | 3]).short_channel_ids()
+    blocks, txs, outputs = split_short_channel_ids(ids)
+    assert blocks.tolist() == [700_000]
+    assert txs.tolist() == [5]
+    assert outputs.tolist() == [3]
+    assert blocks.dtype == np.uint32
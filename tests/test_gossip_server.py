@@ -0,0 +1,207 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.corpus import synthetic_channel_announcement, synthetic_channel_update
+from app.gossip_server import BUCKET_BLOCKS, MAX_FRAME_SIZE, GossipServer
+from app.gossip_store import GossipStore
+from app.gossip_sync import QUERY_FLAGS_UPDATES, GossipSync
+from app.graph import NetworkGraph
+from app.handlers import HandlerRegistry
+from app.message_decoder import MessageDecoder
+from app.message_elements import QUERY_OPTION_CHECKSUMS, QUERY_OPTION_TIMESTAMPS
+from app.messages import (
+    NodeAnnouncementMessage,
+    QueryChannelRangeMessage,
+    QueryShortChannelIDsMessage,
+)
+from app.outbound import GOSSIP, priority
+from tests.helpers import FakePeer, scid
+
+CHAIN_HASH = bytes(32)
+NODE_1, NODE_2 = b"\x02" * 33, b"\x03" * 33
+BOTH = QUERY_OPTION_TIMESTAMPS | QUERY_OPTION_CHECKSUMS
+
+
+class LoopbackPeer:
+    """Delivers what is sent to it to the handlers of the other side, as from partner."""
+
+    def __init__(self, node_id: bytes, handlers: HandlerRegistry):
+        self.node_id_bytes = node_id
+        self.handlers = handlers
+        self.partner = None
+
+    async def send(self, message):
+        await self.handlers.dispatch(self.partner, message.to_bytes(), MessageDecoder.from_bytes)
+
+
+def graph_with(short_channel_ids, timestamp: int = 100) -> NetworkGraph:
+    graph = NetworkGraph()
+    for short_channel_id in short_channel_ids:
+        graph.add_channel(short_channel_id, NODE_1, NODE_2)
+        for direction in (0, 1):
+            frame = synthetic_channel_update(short_channel_id, direction, timestamp)
+            graph.add_channel_update(MessageDecoder.from_bytes(frame, lazy=True))
+    return graph
+
+
+def decode_all(frames):
+    return [MessageDecoder.from_bytes(frame) for frame in frames]
+
+
+def test_replies_cover_the_range_and_fit_in_frames():
+    ids = [scid(500_000 + i // 3, i % 3) for i in range(12_000)]
+    server = GossipServer(graph_with(reversed(ids)))
+    first, number = 495_000, 20_000
+    frames = server.channel_range_replies(CHAIN_HASH, first, number, BOTH)
+    replies = decode_all(frames)
+    assert len(replies) > 4
+    assert all(len(frame) <= MAX_FRAME_SIZE for frame in frames)
+
+    assert replies[0].first_block_num.value == first
+    position = first
+    listed = []
+    for reply in replies:
+        start = reply.first_block_num.value
+        end = start + reply.number_of_blocks.value
+        assert start == position
+        reply_ids = list(reply.encoded_short_channel_ids.short_channel_ids())
+        assert all(start <= i >> 40 < end for i in reply_ids)
+        assert len(reply.timestamps()) == len(reply.checksums()) == 2 * len(reply_ids)
+        listed += reply_ids
+        position = end
+    assert position == first + number
+    assert listed == ids
+
+
+def test_a_block_too_large_for_one_reply_is_split():
+    ids = [scid(500_001, tx) for tx in range(9000)] + [scid(500_002)]
+    server = GossipServer(graph_with(ids))
+    first, number = 500_000, 10
+    frames = server.channel_range_replies(CHAIN_HASH, first, number, BOTH)
+    replies = decode_all(frames)
+    assert len(replies) > 3
+    assert all(len(frame) <= MAX_FRAME_SIZE for frame in frames)
+
+    # Every part of the block covers it, only the last reply reaches the end of the range
+    ranges = [(r.first_block_num.value, r.number_of_blocks.value) for r in replies]
+    assert ranges[0] == (first, 2)
+    assert ranges[1:-1] == [(500_001, 1)] * (len(ranges) - 2)
+    assert ranges[-1] == (500_001, 9)
+    listed = []
+    for reply in replies:
+        start = reply.first_block_num.value
+        reply_ids = list(reply.encoded_short_channel_ids.short_channel_ids())
+        assert all(start <= i >> 40 < start + reply.number_of_blocks.value for i in reply_ids)
+        assert len(reply.timestamps()) == len(reply.checksums()) == 2 * len(reply_ids)
+        listed += reply_ids
+    assert listed == ids
+
+
+def test_empty_blocks_are_coalesced_and_buckets_cached():
+    graph = graph_with([scid(600_100), scid(600_200)])
+    server = GossipServer(graph)
+    replies = decode_all(server.channel_range_replies(CHAIN_HASH, 0, 10**6))
+    ranges = [(r.first_block_num.value, r.number_of_blocks.value) for r in replies]
+    assert ranges == [(0, 600_000), (600_000, BUCKET_BLOCKS), (610_000, 390_000)]
+    assert server.stats()["reply_buckets_built"] == 1
+
+    first = server.channel_range_replies(CHAIN_HASH, 0, 10**6)
+    again = server.channel_range_replies(CHAIN_HASH, 0, 10**6)
+    assert first[1] is again[1]
+    assert server.stats()["reply_buckets_cached"] == 2
+
+    # A channel added to the bucket, even out of order, is listed by the next reply
+    graph.add_channel(scid(600_150), NODE_1, NODE_2)
+    replies = decode_all(server.channel_range_replies(CHAIN_HASH, 0, 10**6))
+    assert list(replies[1].encoded_short_channel_ids.short_channel_ids()) == [
+        scid(600_100),
+        scid(600_150),
+        scid(600_200),
+    ]
+
+    # A range starting inside a bucket is built for just its blocks
+    replies = decode_all(server.channel_range_replies(CHAIN_HASH, 600_150, 10))
+    assert [(r.first_block_num.value, r.number_of_blocks.value) for r in replies] == [(600_150, 10)]
+    assert list(replies[0].encoded_short_channel_ids.short_channel_ids()) == [scid(600_150)]
+
+
+def test_query_short_channel_ids_sends_stored_gossip(tmp_path):
+    node = NodeAnnouncementMessage.create(NODE_1, 50, alias="one").to_bytes()
+    newer_node = NodeAnnouncementMessage.create(NODE_1, 60, alias="one").to_bytes()
+    channels = [scid(1), scid(2)]
+    with GossipStore(str(tmp_path / "gossip")) as store:
+        for short_channel_id in channels:
+            store.append(synthetic_channel_announcement(short_channel_id, NODE_1, NODE_2))
+            store.append(synthetic_channel_update(short_channel_id, 0, 300))
+            store.append(synthetic_channel_update(short_channel_id, 0, 200))
+            store.append(synthetic_channel_update(short_channel_id, 1, 100))
+        store.append(newer_node)
+        store.append(node)
+        server = GossipServer(NetworkGraph.from_gossip_store(store), store)
+
+        peer = FakePeer()
+        query = QueryShortChannelIDsMessage.create(CHAIN_HASH, channels)
+        asyncio.run(server.handle_query_short_channel_ids(peer, query))
+        sent = [message.to_bytes() for message in peer.sent]
+        assert [int.from_bytes(frame[:2], "big") for frame in sent] == [
+            256, 258, 258, 257, 256, 258, 258, 262
+        ]  # fmt: skip
+        assert sent[1] == synthetic_channel_update(scid(1), 0, 300)
+        assert sent[3] == newer_node
+        assert sent[-1][-1] == 1  # full_information
+
+        peer = FakePeer()
+        query = QueryShortChannelIDsMessage.create(
+            CHAIN_HASH, channels, query_flags=[QUERY_FLAGS_UPDATES[1], 0]
+        )
+        asyncio.run(server.handle_query_short_channel_ids(peer, query))
+        sent = [message.to_bytes() for message in peer.sent]
+        assert sent[:-1] == [synthetic_channel_update(scid(1), 1, 100)]
+
+    peer = FakePeer()
+    asyncio.run(GossipServer(NetworkGraph()).handle_query_short_channel_ids(peer, query))
+    assert peer.sent[0].to_bytes()[-1] == 0
+    assert priority(peer.sent[0].id) == GOSSIP
+
+
+def test_sync_from_a_serving_peer(tmp_path):
+    ids = [scid(700_000 + i) for i in range(50)]
+    with GossipStore(str(tmp_path / "gossip")) as store:
+        for short_channel_id in ids:
+            store.append(synthetic_channel_announcement(short_channel_id, NODE_1, NODE_2))
+            for direction in (0, 1):
+                store.append(synthetic_channel_update(short_channel_id, direction, 100))
+        server = GossipServer(NetworkGraph.from_gossip_store(store), store)
+
+        graph = NetworkGraph()
+        sync = GossipSync(
+            graph.has_channel,
+            chain_hash=CHAIN_HASH,
+            first_block=690_000,
+            number_of_blocks=30_000,
+            channel_state=graph.channel_state,
+        )
+        client_handlers, server_handlers = HandlerRegistry(), HandlerRegistry()
+        sync.subscribe(client_handlers)
+        server.subscribe(server_handlers)
+
+        async def ingest(peer, message):
+            graph.ingest(message)
+
+        for type_id in (256, 257, 258):
+            client_handlers.subscribe(type_id, ingest)
+        to_server = LoopbackPeer(NODE_2, server_handlers)
+        to_client = LoopbackPeer(NODE_1, client_handlers)
+        to_server.partner, to_client.partner = to_client, to_server
+
+        asyncio.run(sync.add_peer(to_server, CHAIN_HASH))
+        assert sync.complete
+        assert sorted(graph.short_channel_ids) == ids
+        assert graph.direction(ids[0], 1).timestamp == 100
+        assert server.stats()["channel_range_queries"] == 3
+        assert QueryChannelRangeMessage.id in server_handlers.subscriptions
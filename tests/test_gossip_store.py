@@ -0,0 +1,128 @@
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from app import gossip_store
+from app.gossip_store import GossipStore
+from app.message_decoder import MessageDecoder
+
+PEER = bytes.fromhex("02" + "11" * 32)
+
+
+def load_gossip():
+    with open("data/examples", "r") as f:
+        frames = [bytes.fromhex(line) for line in f]
+    return [f for f in frames if f[:2] in (b"\x01\x00", b"\x01\x01", b"\x01\x02")]
+
+
+def test_append_iterate_and_lookup(tmp_path):
+    frames = load_gossip()
+    path = str(tmp_path / "gossip")
+    with GossipStore(path) as store:
+        for i, frame in enumerate(frames):
+            store.append(frame, PEER, received_at=1000.0 + i)
+        assert [r.frame for r in store] == frames
+
+    store = GossipStore(path)
+    records = list(store)
+    assert [r.frame for r in records] == frames
+    assert records[0].peer_id == PEER
+    assert records[1].received_at == 1001.0
+
+    announcement = MessageDecoder.from_bytes(frames[0])
+    scid = announcement.short_channel_id.data
+    assert [r.type_id for r in store.by_short_channel_id(scid)] == [256, 258, 258, 258]
+    node_records = store.by_node_id(announcement.node_id_1.data)
+    assert node_records[0].frame == frames[0]
+    assert store.by_short_channel_id(bytes(8)) == []
+    store.close()
+
+
+def test_rejects_non_gossip(tmp_path):
+    with GossipStore(str(tmp_path / "gossip")) as store:
+        with pytest.raises(ValueError):
+            store.append(b"\x00\x12\x00\x00\x00\x00")
+
+
+def test_compact_keeps_newest_update_per_direction(tmp_path):
+    frames = load_gossip()
+    path = str(tmp_path / "gossip")
+    with GossipStore(path) as store:
+        for frame in frames:
+            store.append(frame, PEER)
+        store.compact()
+        updates = [r.frame for r in store if r.type_id == 258]
+        timestamps = sorted(MessageDecoder.from_bytes(u).timestamp.value for u in updates)
+        # Direction 1 has two updates, only the newer one survives
+        assert timestamps == [1740550455, 1740750088]
+        assert len(store.by_short_channel_id(frames[-1][98:106])) == 3
+
+    with GossipStore(path) as store:
+        assert len([r for r in store if r.type_id == 258]) == 2
+
+
+def test_recovers_from_torn_writes(tmp_path):
+    frames = load_gossip()
+    path = str(tmp_path / "gossip")
+    with GossipStore(path) as store:
+        for frame in frames:
+            store.append(frame, PEER)
+        size = store.size
+
+    # A record half written to the log, and a torn index entry
+    with open(path, "ab") as f:
+        f.write(b"\x00\x00\x00\x8a\x12\x34")
+    with open(path + ".idx", "ab") as f:
+        f.write(b"\x00" * 10)
+    with GossipStore(path) as store:
+        assert store.size == size
+        assert [r.frame for r in store] == frames
+        store.append(frames[0], PEER)
+        assert len(list(store)) == len(frames) + 1
+
+    # A missing index is rebuilt from the log
+    os.remove(path + ".idx")
+    with GossipStore(path) as store:
+        assert len(store.by_short_channel_id(frames[-1][98:106])) == 5
+
+
+def test_lookups_merge_the_index_file_and_the_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(gossip_store, "TAIL_MERGE_ENTRIES", 4)
+    frames = load_gossip()
+    scid = frames[-1][98:106]
+    path = str(tmp_path / "gossip")
+    with GossipStore(path) as store:
+        for frame in frames:
+            store.append(frame, PEER)
+        # Some entries were merged into the file, the rest are still in the tail
+        assert len(store.entries) and store.tail_entries
+        assert len(store.by_short_channel_id(scid)) == 4
+
+    with GossipStore(path) as store:
+        assert not store.tail_entries
+        offsets = store.lookup(gossip_store.INDEX_SHORT_CHANNEL_ID, scid)
+        assert offsets == sorted(offsets)
+        offset = store.append(frames[-1], PEER)
+        assert store.lookup(gossip_store.INDEX_SHORT_CHANNEL_ID, scid) == offsets + [offset]
+
+
+def test_open_removes_files_left_by_a_crash(tmp_path):
+    frames = load_gossip()
+    path = str(tmp_path / "gossip")
+    with GossipStore(path) as store:
+        for frame in frames:
+            store.append(frame, PEER)
+    for leftover in (path + ".compact", path + ".idx.tmp"):
+        with open(leftover, "wb") as f:
+            f.write(b"\x00" * 100)
+
+    with GossipStore(path) as store:
+        assert [r.frame for r in store] == frames
+    assert not os.path.exists(path + ".compact")
+    assert not os.path.exists(path + ".idx.tmp")
@@ -0,0 +1,103 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.gossip_sync import GossipSync
+from app.messages import (
+    QueryChannelRangeMessage,
+    QueryShortChannelIDsMessage,
+    ReplyChannelRangeMessage,
+    ReplyShortChannelIDsMessage,
+)
+from tests.helpers import FakePeer, scid
+
+CHAIN_HASH = bytes(range(32))
+
+
+def reply(query: QueryChannelRangeMessage, ids, complete: bool = True):
+    first, number = query.first_block_num.value, query.number_of_blocks.value
+    return ReplyChannelRangeMessage.create(CHAIN_HASH, first, number, complete, ids)
+
+
+def test_chunks_are_spread_across_peers():
+    async def run():
+        known = {scid(5)}
+        sync = GossipSync(known.__contains__, number_of_blocks=30, chunk_blocks=10, batch_size=2)
+        a, b = FakePeer(), FakePeer()
+        await sync.add_peer(a, CHAIN_HASH)
+        await sync.add_peer(b, CHAIN_HASH)
+        assert a.last(QueryChannelRangeMessage).first_block_num.value == 0
+        assert b.last(QueryChannelRangeMessage).first_block_num.value == 10
+
+        # a's reply lists one channel we hold and three we do not
+        await sync.handle_reply_channel_range(
+            a, reply(a.last(QueryChannelRangeMessage), [scid(1), scid(5), scid(6), scid(7)])
+        )
+        # One batch in flight, the last chunk is handed to a
+        queries = [m for m in a.sent if type(m) is QueryShortChannelIDsMessage]
+        assert len(queries) == 1
+        assert list(queries[0].encoded_short_channel_ids.short_channel_ids()) == [scid(1), scid(6)]
+        assert a.last(QueryChannelRangeMessage).first_block_num.value == 20
+
+        await sync.handle_reply_short_channel_ids_end(
+            a, ReplyShortChannelIDsMessage.create(CHAIN_HASH)
+        )
+        queries = [m for m in a.sent if type(m) is QueryShortChannelIDsMessage]
+        assert list(queries[1].encoded_short_channel_ids.short_channel_ids()) == [scid(7)]
+
+        # b lists a channel that a already asked for, it is not requested twice
+        await sync.handle_reply_channel_range(
+            b, reply(b.last(QueryChannelRangeMessage), [scid(6), scid(12)], complete=False)
+        )
+        b_ids = b.last(QueryShortChannelIDsMessage).encoded_short_channel_ids.short_channel_ids()
+        assert list(b_ids) == [scid(12)]
+        assert sync.incomplete_chunks == 1
+
+        await sync.handle_reply_channel_range(a, reply(a.last(QueryChannelRangeMessage), []))
+        assert not sync.complete
+        await sync.handle_reply_short_channel_ids_end(
+            a, ReplyShortChannelIDsMessage.create(CHAIN_HASH)
+        )
+        await sync.handle_reply_short_channel_ids_end(
+            b, ReplyShortChannelIDsMessage.create(CHAIN_HASH)
+        )
+        assert sync.complete
+        assert sync.stats()["chunks_done"] == 3
+
+    asyncio.run(run())
+
+
+def test_multi_reply_chunks_and_peer_loss():
+    async def run():
+        sync = GossipSync(lambda _: False, number_of_blocks=20, chunk_blocks=10)
+        a, b = FakePeer(), FakePeer()
+        await sync.add_peer(a, CHAIN_HASH)
+        # A first reply that only covers half of the chunk keeps it in flight
+        await sync.handle_reply_channel_range(
+            a, ReplyChannelRangeMessage.create(CHAIN_HASH, 0, 5, True, [scid(1)])
+        )
+        assert sync.peers[a].range_query == (0, 10)
+
+        # a drops, b picks up its chunk and the id it never got an answer for
+        await sync.remove_peer(a)
+        await sync.add_peer(b, CHAIN_HASH)
+        assert b.last(QueryChannelRangeMessage).first_block_num.value == 0
+        await sync.handle_reply_channel_range(b, reply(b.last(QueryChannelRangeMessage), [scid(1)]))
+        ids = b.last(QueryShortChannelIDsMessage).encoded_short_channel_ids.short_channel_ids()
+        assert list(ids) == [scid(1)]
+
+    asyncio.run(run())
+
+
+def test_other_chains_are_ignored():
+    async def run():
+        sync = GossipSync(lambda _: False, chain_hash=CHAIN_HASH)
+        peer = FakePeer()
+        await sync.add_peer(peer, bytes(32))
+        assert peer.sent == []
+
+    asyncio.run(run())
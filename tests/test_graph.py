@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.corpus import synthetic_gossip
+from app.gossip_store import GossipStore
+from app.graph import NetworkGraph
+from app.message_decoder import MessageDecoder
+
+
+def load_examples():
+    with open("data/examples", "r") as f:
+        return [MessageDecoder.from_bytes(bytes.fromhex(line)) for line in f]
+
+
+def test_ingest_examples():
+    graph = NetworkGraph()
+    for message in load_examples():
+        graph.ingest(message)
+    assert len(graph) == 1
+    assert graph.num_nodes == 2
+
+    announcement = next(m for m in load_examples() if m.id == 256)
+    scid = int.from_bytes(announcement.short_channel_id.data, "big")
+    assert graph.has_channel(scid)
+    assert graph.nodes_of(scid) == (announcement.node_id_1.data, announcement.node_id_2.data)
+    assert list(graph.neighbors(announcement.node_id_1.data)) == [
+        (scid, announcement.node_id_2.data)
+    ]
+
+    # The newer of the two updates for direction 1 wins
+    assert graph.direction(scid, 1).timestamp == 1740750088
+    assert graph.direction(scid, 0).timestamp == 1740550455
+    assert graph.direction(scid, 0).fee_base_msat == 1
+
+    # The example node_announcement is from node_id_1
+    assert graph.node_timestamps[graph.node_index[announcement.node_id_1.data]] == 1740550455
+    assert graph.node_timestamps[graph.node_index[announcement.node_id_2.data]] == 0
+
+
+def test_updates_before_announcement_are_ignored():
+    frames = synthetic_gossip(10, 5)
+    graph = NetworkGraph()
+    assert not graph.ingest(MessageDecoder.from_bytes(frames[1]))
+    assert graph.ingest(MessageDecoder.from_bytes(frames[0]))
+    assert graph.ingest(MessageDecoder.from_bytes(frames[1]))
+    assert not graph.ingest(MessageDecoder.from_bytes(frames[1]))
+
+
+def test_from_gossip_store(tmp_path):
+    frames = synthetic_gossip(200, 50)
+    with GossipStore(str(tmp_path / "gossip")) as store:
+        for frame in frames:
+            store.append(frame)
+        graph = NetworkGraph.from_gossip_store(store)
+    assert len(graph) == 200
+    assert graph.num_nodes <= 50
+    assert sum(len(list(graph.neighbors(node_id))) for node_id in graph.node_ids) == 400
+    for scid in graph.short_channel_ids:
+        assert graph.direction(scid, 0) is not None
+        assert graph.direction(scid, 1) is not None
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from pyln.proto.primitives import PrivateKey
+
+from app.corpus import synthetic_channel_announcement, synthetic_channel_update
+from app.handlers import HandlerRegistry, field_slice
+from app.message_decoder import MessageDecoder
+from app.messages import ChannelUpdateMessage, MessageProperty, PingMessage
+from app.peer import PeerConnection
+
+ANNOUNCEMENT = synthetic_channel_announcement(1 << 40, b"\x02" * 33, b"\x03" * 33)
+
+
+def test_unsubscribed_types_are_never_decoded():
+    def decode(frame):
+        raise AssertionError("decoded")
+
+    async def run():
+        handlers = HandlerRegistry()
+        assert await handlers.dispatch(None, ANNOUNCEMENT, decode) is None
+        assert await handlers.dispatch(None, ANNOUNCEMENT, decode) is None
+        assert handlers.discarded == {256: 2}
+
+    asyncio.run(run())
+
+
+def test_handlers_share_one_decode_and_prefilters_read_raw_fields():
+    tracked = (2 << 40).to_bytes(8, "big")
+    scid = field_slice(ChannelUpdateMessage, MessageProperty.SHORT_CHANNEL_ID)
+    seen, decodes = [], []
+
+    def decode(frame):
+        decodes.append(frame)
+        return MessageDecoder.from_bytes(frame)
+
+    async def first(peer, message):
+        seen.append(("first", message.timestamp.value))
+
+    async def second(peer, message):
+        seen.append(("second", message.timestamp.value))
+
+    async def run():
+        handlers = HandlerRegistry()
+        handlers.subscribe(ChannelUpdateMessage.id, first)
+        handlers.subscribe(ChannelUpdateMessage.id, second, lambda frame: frame[scid] == tracked)
+        await handlers.dispatch(None, synthetic_channel_update(2 << 40, 0, 10), decode)
+        await handlers.dispatch(None, synthetic_channel_update(3 << 40, 0, 11), decode)
+        assert seen == [("first", 10), ("second", 10), ("first", 11)]
+        assert len(decodes) == 2
+
+        handlers.unsubscribe(ChannelUpdateMessage.id, first)
+        assert (
+            await handlers.dispatch(None, synthetic_channel_update(3 << 40, 0, 12), decode) is None
+        )
+        assert handlers.filtered == {ChannelUpdateMessage.id: 1}
+        assert len(decodes) == 2
+
+        handlers.unsubscribe(ChannelUpdateMessage.id, second)
+        assert not handlers.is_subscribed(ChannelUpdateMessage.id)
+
+    asyncio.run(run())
+
+
+def test_peer_without_gossip_consumers_skips_gossip():
+    async def run():
+        node_id = PrivateKey(os.urandom(32)).public_key().to_bytes().hex()
+        peer = PeerConnection(f"{node_id}@127.0.0.1:9735", PrivateKey(os.urandom(32)))
+        await peer.handlers.dispatch(peer, ANNOUNCEMENT, peer.decode)
+        assert peer.handlers.discarded == {256: 1}
+
+        ping = PingMessage.create(4, b"\xaa").to_bytes()
+        await peer.handlers.dispatch(peer, ping, peer.decode)
+        pong, _ = peer.outgoing_messages.get_nowait()
+        assert pong.num_bytes == 4
+
+    asyncio.run(run())
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.message_decoder import MessageDecoder
+from app.message_elements import U32Element
+from app.messages import (
+    GossipTimestampFilterMessage,
+    LazyProperties,
+    MessageProperty,
+    PingMessage,
+    PongMessage,
+)
+
+FILTER_HEX = "010906226e46111a0b59caaf126043eb5bbf28c34f3a5e332a1fc7b2b73cf188910f67c6d3e3ffffffff"
+
+
+def test_lazy_examples_match_eager():
+    f = open("data/examples", "r")
+    for line in f:
+        data = bytes.fromhex(line)
+        lazy = MessageDecoder.from_bytes(data, lazy=True)
+        eager = MessageDecoder.from_bytes(data)
+        assert type(lazy) is type(eager)
+        assert lazy.id == eager.id
+        assert lazy.name == eager.name
+        assert lazy == eager
+        assert str(lazy) == str(eager)
+
+
+def test_lazy_decodes_on_first_access():
+    data = bytes.fromhex(FILTER_HEX)
+    m = MessageDecoder.from_bytes(data, lazy=True)
+    assert type(m) is GossipTimestampFilterMessage
+    assert isinstance(m.properties, LazyProperties)
+    assert m.type_name == "gossip_timestamp_filter"
+    assert len(m.properties._decoded) == 0
+    assert m.first_timestamp.value == 1741083619
+    assert list(m.properties._decoded) == [MessageProperty.FIRST_TIMESTAMP]
+    assert m.to_bytes() is m.properties.data
+
+
+def test_lazy_to_bytes_after_modification():
+    data = bytes.fromhex(FILTER_HEX)
+    m = MessageDecoder.from_bytes(data, lazy=True)
+    m.properties[MessageProperty.TIMESTAMP_RANGE] = U32Element(5)
+    assert m.to_bytes() == data[:-4] + (5).to_bytes(4, "big")
+
+    m = MessageDecoder.from_bytes(data, lazy=True)
+    m.first_timestamp.value = 7
+    assert m.to_bytes() == data[:-8] + (7).to_bytes(4, "big") + data[-4:]
+
+
+def test_lazy_ping_pong():
+    ping = MessageDecoder.from_bytes(PingMessage.create(10, b"\xaa").to_bytes(), lazy=True)
+    pong = PongMessage.create_from_ping(ping)
+    assert pong.num_bytes == 10
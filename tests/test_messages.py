@@ -5,9 +5,13 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
+import pytest
+
 from app.message_decoder import MessageDecoder
+from app.message_elements import MessageTypeElement, U16VarBytesElement
 from app.messages import (
     InitMessage,
+    MessageProperty,
 )
 
 
@@ -44,3 +48,27 @@ def test_examples():
         msg = MessageDecoder.from_bytes(bytes.fromhex(line))
         assert msg.id is not None
         assert msg.name is not None
+
+
+def test_hand_built_message_without_tlv_stream():
+    m = InitMessage(
+        16,
+        "init",
+        {
+            MessageProperty.TYPE: MessageTypeElement(16, "init"),
+            MessageProperty.GLOBAL_FEATURES: U16VarBytesElement(0, b""),
+            MessageProperty.LOCAL_FEATURES: U16VarBytesElement(1, b"\xaa"),
+        },
+    )
+    assert m.tlv_stream.data == b""
+    assert m.to_bytes() == b"\x00\x10\x00\x00\x00\x01\xaa"
+
+    with pytest.raises(ValueError, match="InitMessage is missing local_features"):
+        InitMessage(
+            16,
+            "init",
+            {
+                MessageProperty.TYPE: MessageTypeElement(16, "init"),
+                MessageProperty.GLOBAL_FEATURES: U16VarBytesElement(0, b""),
+            },
+        )
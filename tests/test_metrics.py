@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from pyln.proto.primitives import PrivateKey
+
+from app.corpus import channel_updates
+from app.metrics import Histogram, Metrics, MetricsServer
+from app.peer_manager import PeerManager
+
+PING = bytes.fromhex("0012000a0001aa")
+
+
+def test_counters_by_peer_and_type():
+    metrics = Metrics()
+    peer = metrics.peer("ln://a@127.0.0.1:9735")
+    update = next(channel_updates(1))
+    for frame in (PING, update, update, b"\xff\xf0", b"\x01"):
+        peer.received(frame)
+    peer.sent(PING)
+    assert metrics.peer("ln://a@127.0.0.1:9735") is peer
+
+    text = metrics.render()
+    assert 'lmp_messages_received_total{peer="ln://a@127.0.0.1:9735",type="ping"} 1' in text
+    assert (
+        'lmp_messages_received_total{peer="ln://a@127.0.0.1:9735",type="channel_update"} 2' in text
+    )
+    assert 'lmp_messages_received_total{peer="ln://a@127.0.0.1:9735",type="unknown"} 2' in text
+    line = 'lmp_received_bytes_total{peer="ln://a@127.0.0.1:9735",type="channel_update"}'
+    assert f"{line} {2 * len(update)}" in text
+    assert 'lmp_sent_bytes_total{peer="ln://a@127.0.0.1:9735",type="ping"} 7' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 2), rows=2)
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value, 1)
+    lines = list(histogram.render("h", ("type",), [("a",), ("b",)]))
+    assert lines == [
+        'h_bucket{type="b",le="1"} 1',
+        'h_bucket{type="b",le="2"} 3',
+        'h_bucket{type="b",le="+Inf"} 4',
+        'h_sum{type="b"} 6.5',
+        'h_count{type="b"} 4',
+    ]
+
+
+def test_metrics_endpoint():
+    async def run():
+        metrics = Metrics()
+        manager = PeerManager(PrivateKey(os.urandom(32)), metrics=metrics)
+        manager.add("02" + "00" * 32 + "@127.0.0.1:1")
+        metrics.peer("p").ping_seconds.observe(0.02)
+
+        server = MetricsServer(metrics, port=0)
+        await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = (await reader.read()).decode()
+        writer.close()
+        await server.close()
+
+        assert response.startswith("HTTP/1.1 200 OK")
+        assert "# TYPE lmp_ping_rtt_seconds histogram" in response
+        assert 'lmp_ping_rtt_seconds_bucket{peer="p",le="0.025"} 1' in response
+        assert f'lmp_reconnects_total{{address="02{"00" * 32}@127.0.0.1:1"}} 0' in response
+        assert "# TYPE lmp_reconnects_total counter" in response
+        assert "lmp_connected_peers 0" in response
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.corpus import synthetic_channel_announcement, synthetic_node_announcements
+from app.graph import NetworkGraph, node_announcement_fields
+from app.message_decoder import MessageDecoder
+from app.message_elements import (
+    ADDRESS_DNS,
+    ADDRESS_IPV4,
+    ADDRESS_IPV6,
+    ADDRESS_TOR_V3,
+    Address,
+    parse_addresses,
+)
+from app.messages import NodeAnnouncementMessage
+from app.node_table import NodeTable
+
+NODE_ID = b"\x02" + bytes(range(32))
+ONION = "vww6ybal4bd7szmgncyruucpgfkqahzddi37ktceo3ah7ngmcopnpyyd.onion"
+ADDRESSES = [
+    Address(ADDRESS_IPV4, "203.0.113.7", 9735),
+    Address(ADDRESS_IPV6, "2001:db8::1", 9735),
+    Address(ADDRESS_TOR_V3, ONION, 9735),
+    Address(ADDRESS_DNS, "ln.example.com", 9736),
+]
+
+
+def test_example_node_announcement_decodes():
+    with open("data/examples", "r") as f:
+        frame = next(bytes.fromhex(line) for line in f if line.startswith("0101"))
+    message = MessageDecoder.from_bytes(frame)
+    assert type(message) is NodeAnnouncementMessage
+    assert message.alias.text == "dave"
+    assert message.timestamp.value == 1740550455
+    assert message.addresses.addresses() == []
+    assert message.to_bytes() == frame
+    assert MessageDecoder.from_bytes(frame, lazy=True).node_id == message.node_id
+
+
+def test_create_round_trips_every_address_type():
+    frame = NodeAnnouncementMessage.create(
+        NODE_ID, 1_700_000_000, b"\x08\x00", 0x3399FF, "héllo", ADDRESSES
+    ).to_bytes()
+    message = MessageDecoder.from_bytes(frame)
+    assert message.node_id.data == NODE_ID
+    assert message.node_features.data == b"\x08\x00"
+    assert message.rgb_color.value == 0x3399FF
+    assert message.alias.text == "héllo"
+    assert message.addresses.addresses() == ADDRESSES
+    assert str(ADDRESSES[1]) == "[2001:db8::1]:9735"
+    assert node_announcement_fields(frame) == (
+        1_700_000_000,
+        NODE_ID,
+        b"\x08\x00",
+        0x3399FF,
+        message.alias.data,
+        message.addresses.data,
+    )
+
+
+def test_addresses_stop_at_unknown_or_truncated_descriptors():
+    ipv4 = ADDRESSES[0].to_bytes()
+    assert parse_addresses(ipv4 + b"\x09\x01\x02" + ipv4) == ADDRESSES[:1]
+    assert parse_addresses(ipv4 + ADDRESSES[1].to_bytes()[:-1]) == ADDRESSES[:1]
+    assert parse_addresses(ipv4 + b"\x05\x10ab") == ADDRESSES[:1]
+
+
+def test_node_table_interns_and_keeps_the_newest_announcement():
+    table = NodeTable()
+    frames = list(synthetic_node_announcements(200))
+    numbers = [table.intern(node_announcement_fields(frame)[1]) for frame in frames]
+    assert numbers == list(range(200))
+    assert table.intern(node_announcement_fields(frames[5])[1]) == 5
+    for number, frame in zip(numbers, frames):
+        timestamp, _, *fields = node_announcement_fields(frame)
+        assert table.announce(number, timestamp, *fields)
+        assert not table.announce(number, timestamp, *fields)
+    # Nodes sharing a feature vector share the bytes object
+    assert len({id(features) for features in table.features}) == len(table.feature_vectors) - 1
+
+    message = MessageDecoder.from_bytes(frames[7])
+    info = table.info(7)
+    assert info.node_id == message.node_id.data
+    assert info.alias == "node-7"
+    assert info.addresses == message.addresses.addresses()
+
+
+def test_graph_keeps_announcements_of_nodes_with_channels():
+    graph = NetworkGraph()
+    frame = NodeAnnouncementMessage.create(NODE_ID, 10, alias="a", addresses=ADDRESSES).to_bytes()
+    assert not graph.ingest(MessageDecoder.from_bytes(frame))
+    assert graph.node(NODE_ID) is None
+
+    graph.add_channel(1 << 40, NODE_ID, b"\x03" + bytes(32))
+    assert graph.ingest(MessageDecoder.from_bytes(frame, lazy=True))
+    assert graph.node(NODE_ID).addresses == ADDRESSES
+    assert graph.node(b"\x03" + bytes(32)) is None
+    channel = MessageDecoder.from_bytes(synthetic_channel_announcement(2 << 40, NODE_ID, NODE_ID))
+    assert graph.add_channel_announcement(channel)
+    assert graph.num_nodes == 2
@@ -0,0 +1,72 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.corpus import BITCOIN_CHAIN_HASH
+from app.messages import PingMessage, PongMessage, QueryChannelRangeMessage
+from app.outbound import CONTROL, GOSSIP, QUERY, OutboundQueue, priority
+
+
+def query(first_block: int) -> QueryChannelRangeMessage:
+    return QueryChannelRangeMessage.create(BITCOIN_CHAIN_HASH, first_block, 1000)
+
+
+def test_priority_classes():
+    assert priority(PongMessage.id) == CONTROL
+    assert priority(QueryChannelRangeMessage.id) == QUERY
+    assert priority(258) == GOSSIP
+
+
+def test_control_messages_jump_the_queue():
+    async def run():
+        queue = OutboundQueue()
+        for i in range(3):
+            await queue.put(query(i))
+        ping = PingMessage.create(10, b"\xaa")
+        await queue.put(ping)
+        order = [(await queue.get())[0] for _ in range(4)]
+        assert order[0] is ping
+        assert [m.first_block_num.value for m in order[1:]] == [0, 1, 2]
+        assert queue.empty()
+
+    asyncio.run(run())
+
+
+def test_put_waits_while_the_class_is_full():
+    async def run():
+        waits = []
+        frame_size = len(query(0).to_bytes())
+        queue = OutboundQueue(
+            limits=(1 << 16, 2 * frame_size, 1 << 16), observe=lambda s, c: waits.append(c)
+        )
+        await queue.put(query(0))
+        await queue.put(query(1))
+        blocked = asyncio.create_task(queue.put(query(2)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert (queue.depth(QUERY), queue.bytes(QUERY)) == (2, 2 * frame_size)
+
+        # Other classes are not held up by a full one
+        await queue.put(PingMessage.create(10, b"\xaa"))
+        assert (await queue.get())[0].id == PingMessage.id
+
+        message, frame = await queue.get()
+        assert frame == message.to_bytes()
+        await asyncio.wait_for(blocked, 1)
+        assert queue.depth(QUERY) == 2
+        assert waits == [CONTROL, QUERY]
+
+    asyncio.run(run())
+
+
+def test_oversized_message_is_accepted_when_its_class_is_empty():
+    async def run():
+        queue = OutboundQueue(limits=(16, 16, 16))
+        await asyncio.wait_for(queue.put(query(0)), 1)
+        assert len(queue) == 1
+
+    asyncio.run(run())
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import socket
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from pyln.proto.primitives import PrivateKey
+
+from app.gossip_sync import BITCOIN_CHAIN_HASH, GossipSync
+from app.messages import GossipTimestampFilterMessage, QueryChannelRangeMessage
+from app.peer_manager import PeerManager
+from app.sync_marks import SyncMarks
+from app.transport import AsyncLightningConnection
+from app.util import read_peers_file
+
+
+async def start_node(hang_up: asyncio.Event):
+    """A remote node which answers the handshake and init, then waits for hang_up."""
+    private_key = PrivateKey(os.urandom(32))
+    connections = []
+
+    async def handle(reader, writer):
+        conn = await AsyncLightningConnection.accept(reader, writer, private_key)
+        connections.append(conn)
+        await conn.read_message()
+        await conn.send_message(b"\x00\x10\x00\x00\x00\x00")
+        await hang_up.wait()
+        await conn.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    address = f"{private_key.public_key().to_bytes().hex()}@127.0.0.1:{port}"
+    return server, address, connections
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for(condition, timeout=5.0):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_connects_to_many_peers_and_redials():
+    async def run():
+        hang_up = asyncio.Event()
+        nodes = [await start_node(hang_up) for _ in range(5)]
+        dead = (
+            f"{PrivateKey(os.urandom(32)).public_key().to_bytes().hex()}@127.0.0.1:{unused_port()}"
+        )
+
+        manager = PeerManager(
+            PrivateKey(os.urandom(32)), max_dialing=2, initial_backoff=0.01, max_backoff=0.05
+        )
+        for _, address, _ in nodes:
+            manager.add(address)
+        manager.add(dead)
+        await manager.start()
+
+        await wait_for(lambda: len(manager.connected) == 5)
+        await wait_for(lambda: manager.reconnects[dead] >= 2)
+        assert dead not in manager.peers
+
+        # Every node drops its connection, the manager dials them all again
+        hang_up.set()
+        await wait_for(lambda: all(len(conns) >= 2 for _, _, conns in nodes))
+        assert all(manager.reconnects[address] >= 1 for _, address, _ in nodes)
+
+        await manager.stop()
+        for server, _, _ in nodes:
+            server.close()
+
+    asyncio.run(run())
+
+
+def test_handshake_timeout():
+    async def run():
+        # Accepts the TCP connection but never answers the handshake
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        address = f"{PrivateKey(os.urandom(32)).public_key().to_bytes().hex()}@127.0.0.1:{port}"
+        manager = PeerManager(
+            PrivateKey(os.urandom(32)), handshake_timeout=0.05, initial_backoff=0.01
+        )
+        manager.add(address)
+        await manager.start()
+        await wait_for(lambda: manager.reconnects[address] >= 2)
+        await manager.stop()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_unexpected_errors_are_retried():
+    async def run():
+        address = f"{PrivateKey(os.urandom(32)).public_key().to_bytes().hex()}@127.0.0.1:1"
+        manager = PeerManager(PrivateKey(os.urandom(32)), initial_backoff=0.01, max_backoff=0.01)
+
+        async def dial(address):
+            raise RuntimeError("bug")
+
+        manager.dial = dial
+        manager.add(address)
+        await manager.start()
+        await wait_for(lambda: manager.reconnects[address] >= 2)
+        assert not manager.supervisors[address].done()
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_sync_resumes_without_waiting_for_the_peers_filter(tmp_path):
+    async def run():
+        private_key = PrivateKey(os.urandom(32))
+        received = []
+
+        async def handle(reader, writer):
+            # Answers init, then only listens and never sends a gossip_timestamp_filter
+            conn = await AsyncLightningConnection.accept(reader, writer, private_key)
+            await conn.read_message()
+            await conn.send_message(b"\x00\x10\x00\x00\x00\x00")
+            while True:
+                received.append(int.from_bytes((await conn.read_message())[:2], "big"))
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        marks = SyncMarks(str(tmp_path / "sync"))
+        marks.observe_timestamp(BITCOIN_CHAIN_HASH, b"\x03" * 33, 1_700_000_000)
+        manager = PeerManager(
+            PrivateKey(os.urandom(32)), gossip_sync=GossipSync(lambda scid: False, marks=marks)
+        )
+        manager.add(f"{private_key.public_key().to_bytes().hex()}@127.0.0.1:{port}")
+        await manager.start()
+        await wait_for(lambda: QueryChannelRangeMessage.id in received)
+        assert GossipTimestampFilterMessage.id in received
+        await manager.stop()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_read_peers_file(tmp_path):
+    path = tmp_path / "peers"
+    path.write_text("# testnet\nabc@localhost:9735\n\n  def@127.0.0.1:9736  # second\n")
+    assert read_peers_file(str(path)) == ["abc@localhost:9735", "def@127.0.0.1:9736"]
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from pyln.proto.primitives import PrivateKey
+
+from app.corpus import (
+    signed_channel,
+    synthetic_channel_update,
+    synthetic_gossip,
+    synthetic_node_announcements,
+)
+from app.graph import NetworkGraph
+from app.message_decoder import MessageDecoder
+from app.messages import ChannelUpdateMessage
+from app.peer import PeerConnection, default_handlers
+from app.pipeline import DecodePipeline, summarize
+
+SCID = 600_000 << 40
+
+
+def test_summaries_match_decoded_messages():
+    frames = synthetic_gossip(50, 20)
+    decoded, summarized = NetworkGraph(), NetworkGraph()
+    for frame in frames:
+        assert decoded.ingest(MessageDecoder.from_bytes(frame)) == summarized.apply(
+            summarize(frame)
+        )
+    assert decoded.channel_index == summarized.channel_index
+    assert decoded.node_ids == summarized.node_ids
+    for a, b in zip(decoded.direction_columns, summarized.direction_columns):
+        assert a == b
+
+    assert summarize(frames[1][:50]) is None
+    node_announcement = next(synthetic_node_announcements(1))
+    for length in (70, 140, len(node_announcement) - 1):
+        assert summarize(node_announcement[:length]) is None
+        assert not summarized.ingest(
+            MessageDecoder.from_bytes(node_announcement[:length], lazy=True)
+        )
+
+
+def test_pipeline_delivers_in_order():
+    async def run():
+        frames = synthetic_gossip(100, 30)
+        scid = int.from_bytes(frames[1][98:106], "big")
+        # Newer updates for one direction, the last one received must win
+        frames += [synthetic_channel_update(scid, 0, 1_800_000_000 + t) for t in range(20)]
+        frames.append(b"\x01\x02\x00")
+
+        graph = NetworkGraph()
+        received = []
+
+        def on_decoded(frame, summary):
+            received.append(frame)
+            graph.apply(summary)
+
+        pipeline = DecodePipeline(2, ProcessPoolExecutor(2), batch_size=16)
+        for frame in frames:
+            await pipeline.submit(frame, on_decoded)
+        await pipeline.drain()
+        pipeline.close()
+
+        assert received == frames[:-1]
+        assert (pipeline.decoded, pipeline.malformed) == (len(frames) - 1, 1)
+        assert len(graph) == 100
+        assert graph.direction(scid, 0).timestamp == 1_800_000_019
+
+    asyncio.run(run())
+
+
+def test_pipeline_verifies_signatures():
+    async def run():
+        keys = [os.urandom(32) for _ in range(4)]
+        announcement, update_1, update_2 = signed_channel(SCID, keys, 1_700_000_000)
+        forged, forged_update, _ = signed_channel(SCID, [os.urandom(32) for _ in range(4)], 1)
+        unknown = synthetic_channel_update(SCID + (1 << 40), 0, 1_700_000_000)
+        frames = [
+            announcement,
+            update_1,
+            update_2[:-1] + bytes([update_2[-1] ^ 1]),
+            forged,
+            forged_update,
+            unknown,
+        ]
+
+        graph = NetworkGraph()
+        pipeline = DecodePipeline(
+            1, ProcessPoolExecutor(1), batch_size=2, channel_nodes=graph.nodes_of
+        )
+        for frame in frames:
+            await pipeline.submit(frame, lambda frame, summary: graph.apply(summary))
+        await pipeline.drain()
+        pipeline.close()
+
+        # The forged announcement is signed by its own keys, the graph keeps the channel it holds
+        assert (pipeline.decoded, pipeline.rejected, pipeline.unknown_channel) == (3, 2, 1)
+        assert graph.nodes_of(SCID)[0] == PrivateKey(keys[0]).public_key().to_bytes()
+        assert graph.direction(SCID, 0).timestamp == 1_700_000_000
+        assert graph.direction(SCID, 1) is None
+        assert pipeline.signers.pending == {}
+
+    asyncio.run(run())
+
+
+def test_peer_pipeline_still_calls_other_gossip_handlers():
+    async def run():
+        frames = synthetic_gossip(20, 5)
+        updates = [f for f in frames if f[:2] == b"\x01\x02"]
+        tracked = updates[0][98:106]
+        seen = []
+
+        async def on_update(peer, message):
+            seen.append(message.to_bytes())
+
+        handlers = default_handlers()
+        handlers.subscribe(
+            ChannelUpdateMessage.id, on_update, lambda frame: frame[98:106] == tracked
+        )
+        graph = NetworkGraph()
+        pipeline = DecodePipeline(1, ProcessPoolExecutor(1), batch_size=8)
+        node_id = PrivateKey(os.urandom(32)).public_key().to_bytes().hex()
+        peer = PeerConnection(
+            f"{node_id}@127.0.0.1:9735",
+            PrivateKey(os.urandom(32)),
+            graph=graph,
+            pipeline=pipeline,
+            handlers=handlers,
+        )
+        for frame in frames:
+            await peer.handle_frame(frame)
+        await pipeline.drain()
+        pipeline.close()
+
+        assert pipeline.decoded == len(frames)
+        assert len(graph) == 20
+        assert seen == [f for f in updates if f[98:106] == tracked]
+        assert handlers.filtered == {ChannelUpdateMessage.id: len(updates) - len(seen)}
+
+    asyncio.run(run())
@@ -0,0 +1,133 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.checksums import channel_update_checksum, crc32c, crc32c_many
+from app.corpus import synthetic_channel_announcement, synthetic_channel_update
+from app.gossip_sync import QUERY_FLAGS_ALL, QUERY_FLAGS_UPDATES, GossipSync
+from app.graph import NetworkGraph
+from app.message_decoder import MessageDecoder
+from app.message_elements import ENCODING_ZLIB, QUERY_OPTION_CHECKSUMS, QUERY_OPTION_TIMESTAMPS
+from app.messages import (
+    QueryChannelRangeMessage,
+    QueryShortChannelIDsMessage,
+    ReplyChannelRangeMessage,
+)
+from tests.helpers import FakePeer, scid
+
+CHAIN_HASH = bytes(32)
+NODE_1, NODE_2 = b"\x02" * 33, b"\x03" * 33
+
+
+def test_crc32c():
+    assert crc32c(b"123456789") == 0xE3069283
+    rows = [b"123456789", b"", bytes(range(68)), b"abcdefghi"]
+    assert list(crc32c_many(rows)) == [crc32c(row) for row in rows]
+
+
+def test_query_options_and_flags_round_trip():
+    query = QueryChannelRangeMessage.create(
+        CHAIN_HASH, 0, 100, QUERY_OPTION_TIMESTAMPS | QUERY_OPTION_CHECKSUMS
+    )
+    decoded = MessageDecoder.from_bytes(query.to_bytes())
+    assert decoded.query_option == QUERY_OPTION_TIMESTAMPS | QUERY_OPTION_CHECKSUMS
+    assert (
+        MessageDecoder.from_bytes(
+            QueryChannelRangeMessage.create(CHAIN_HASH, 0, 100).to_bytes()
+        ).query_option
+        == 0
+    )
+
+    ids = [scid(1), scid(2)]
+    for encoding in (0, ENCODING_ZLIB):
+        reply = ReplyChannelRangeMessage.create(
+            CHAIN_HASH, 0, 100, True, ids, encoding, [5, 6, 7, 0], [1, 2, 3, 0]
+        )
+        decoded = MessageDecoder.from_bytes(reply.to_bytes())
+        assert list(decoded.timestamps()) == [5, 6, 7, 0]
+        assert list(decoded.checksums()) == [1, 2, 3, 0]
+        flags = [QUERY_FLAGS_ALL, QUERY_FLAGS_UPDATES[1]]
+        short_ids = QueryShortChannelIDsMessage.create(CHAIN_HASH, ids, encoding, flags)
+        assert MessageDecoder.from_bytes(short_ids.to_bytes()).query_flags() == flags
+    plain = ReplyChannelRangeMessage.create(CHAIN_HASH, 0, 100, True, ids)
+    assert MessageDecoder.from_bytes(plain.to_bytes()).timestamps() is None
+
+
+def test_graph_checksums_match_the_updates():
+    graph = NetworkGraph()
+    graph.add_channel(scid(1), NODE_1, NODE_2)
+    updates = [
+        synthetic_channel_update(scid(1), 0, 100, chain_hash=CHAIN_HASH),
+        synthetic_channel_update(scid(1), 1, 200, fee_base_msat=7, chain_hash=CHAIN_HASH),
+    ]
+    for frame in updates:
+        graph.ingest(MessageDecoder.from_bytes(frame))
+    timestamps, checksums = graph.channel_state([scid(1), scid(9)], CHAIN_HASH)
+    assert list(timestamps) == [100, 200, 0, 0]
+    assert list(checksums) == [channel_update_checksum(f) for f in updates] + [0, 0]
+    # The checksum ignores the timestamp
+    assert channel_update_checksum(synthetic_channel_update(scid(1), 0, 999)) == checksums[0]
+
+
+def test_only_stale_updates_are_requested():
+    async def run():
+        local, remote = NetworkGraph(), NetworkGraph()
+        for graph in (local, remote):
+            for block in range(1, 5):
+                graph.add_channel(scid(block), NODE_1, NODE_2)
+                for direction in (0, 1):
+                    graph.update_direction(scid(block), 100, 1, direction, 144, 1, 1, 1, 10**9)
+        # Channel 2 direction 1 changed fees, channel 3 direction 0 was only refreshed, channel
+        # 5 is new
+        remote.update_direction(scid(2), 200, 1, 1, 144, 1, 5, 1, 10**9)
+        remote.update_direction(scid(3), 200, 1, 0, 144, 1, 1, 1, 10**9)
+        remote.add_channel(scid(5), NODE_1, NODE_2)
+
+        sync = GossipSync(local.has_channel, channel_state=local.channel_state)
+        peer = FakePeer()
+        await sync.add_peer(peer, CHAIN_HASH)
+        (query,) = peer.sent
+        assert query.query_option == QUERY_OPTION_TIMESTAMPS | QUERY_OPTION_CHECKSUMS
+
+        ids = [scid(block) for block in range(1, 6)]
+        reply = ReplyChannelRangeMessage.create(
+            CHAIN_HASH,
+            query.first_block_num.value,
+            query.number_of_blocks.value,
+            True,
+            ids,
+            ENCODING_ZLIB,
+            *remote.channel_state(ids, CHAIN_HASH),
+        )
+        await sync.handle_reply_channel_range(peer, MessageDecoder.from_bytes(reply.to_bytes()))
+        (request,) = [m for m in peer.sent if type(m) is QueryShortChannelIDsMessage]
+        assert list(request.encoded_short_channel_ids.short_channel_ids()) == [scid(2), scid(5)]
+        assert request.query_flags() == [QUERY_FLAGS_UPDATES[1], QUERY_FLAGS_ALL]
+        assert sync.stats()["short_channel_ids_up_to_date"] == 3
+
+    asyncio.run(run())
+
+
+def test_replies_without_timestamps_fall_back_to_unknown_ids():
+    async def run():
+        graph = NetworkGraph()
+        graph.ingest(
+            MessageDecoder.from_bytes(synthetic_channel_announcement(scid(1), NODE_1, NODE_2))
+        )
+        sync = GossipSync(graph.has_channel, channel_state=graph.channel_state)
+        peer = FakePeer()
+        await sync.add_peer(peer, CHAIN_HASH)
+        query = peer.sent[0]
+        reply = ReplyChannelRangeMessage.create(
+            CHAIN_HASH, 0, query.number_of_blocks.value, True, [scid(1), scid(2)]
+        )
+        await sync.handle_reply_channel_range(peer, reply)
+        (request,) = [m for m in peer.sent if type(m) is QueryShortChannelIDsMessage]
+        assert list(request.encoded_short_channel_ids.short_channel_ids()) == [scid(2)]
+        assert request.query_flags() is None
+
+    asyncio.run(run())
@@ -5,7 +5,7 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
-from app.message_elements import MessageTypeElement
+from app.message_elements import MessageTypeElement, U16Element, U16VarBytesElement
 
 
 def test_decode_init_message():
@@ -17,3 +17,17 @@ def test_decode_init_message():
     assert m.id == 16
     assert m.name == "init"
     assert len(new_data) == len(data) - 2
+
+
+def test_decode_elements_from_view():
+    data = bytes.fromhex("0012000a0001aa")
+    view = memoryview(data)
+    (m, offset) = MessageTypeElement.from_view(view, 0)
+    assert m.id == 18
+    assert offset == 2
+    (n, offset) = U16Element.from_view(view, offset)
+    assert n.num_bytes == 10
+    (b, offset) = U16VarBytesElement.from_view(view, offset)
+    assert b.data == b"\xaa"
+    assert type(b.data) is bytes
+    assert offset == len(data)
@@ -0,0 +1,86 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.corpus import synthetic_channel_update
+from app.gossip_sync import RESUME_BLOCK_MARGIN, RESUME_TIMESTAMP_MARGIN, GossipSync
+from app.messages import (
+    GossipTimestampFilterMessage,
+    QueryChannelRangeMessage,
+    ReplyChannelRangeMessage,
+    ReplyShortChannelIDsMessage,
+)
+from app.sync_marks import SyncMarks
+from tests.helpers import FakePeer, scid
+
+CHAIN_HASH = bytes(range(32))
+NOW = int(time.time())
+
+
+def test_marks_round_trip_through_the_file(tmp_path):
+    path = str(tmp_path / "sync")
+    marks = SyncMarks(path)
+    marks.observe_timestamp(CHAIN_HASH, b"\x02" * 33, NOW - 10)
+    marks.observe_timestamp(CHAIN_HASH, b"\x03" * 33, NOW - 20)
+    marks.observe_timestamp(CHAIN_HASH, b"\x03" * 33, NOW + 10**6)  # too far in the future
+    marks.observe_block(CHAIN_HASH, None, 850_000)
+    marks.save()
+
+    loaded = SyncMarks(path)
+    assert loaded.get(CHAIN_HASH).timestamp == NOW - 10
+    assert loaded.get(CHAIN_HASH).block == 850_000
+    assert loaded.get(CHAIN_HASH, b"\x03" * 33).timestamp == NOW - 20
+    assert loaded.get(bytes(32)) is None
+
+
+def test_sync_records_marks_and_resumes_from_them(tmp_path):
+    path = str(tmp_path / "sync")
+
+    async def first_run():
+        marks = SyncMarks(path)
+        known = set()
+        sync = GossipSync(known.__contains__, number_of_blocks=1000, chunk_blocks=500, marks=marks)
+        peer = FakePeer(b"\x02" * 33)
+        await sync.add_peer(peer, CHAIN_HASH)
+        # Nothing to resume from, so no filter and the range starts at block 0
+        assert not peer.of_type(GossipTimestampFilterMessage)
+        for query in peer.of_type(QueryChannelRangeMessage):
+            assert query.first_block_num.value in (0, 500)
+        for first in (0, 500):
+            ids = [scid(first + 400)]
+            reply = ReplyChannelRangeMessage.create(CHAIN_HASH, first, 500, True, ids)
+            await sync.handle_reply_channel_range(peer, reply)
+            known.update(ids)
+            sync.observe_gossip(peer, synthetic_channel_update(ids[0], 0, NOW - first))
+            await sync.handle_reply_short_channel_ids_end(
+                peer, ReplyShortChannelIDsMessage.create(CHAIN_HASH)
+            )
+        assert sync.complete
+        assert marks.get(CHAIN_HASH).block == 900
+        await sync.remove_peer(peer)
+
+    async def second_run():
+        sync = GossipSync(set().__contains__, CHAIN_HASH, 0, 1000, 100, marks=SyncMarks(path))
+        peer = FakePeer(b"\x02" * 33)
+        await sync.add_peer(peer, CHAIN_HASH)
+        (timestamp_filter,) = peer.of_type(GossipTimestampFilterMessage)
+        assert timestamp_filter.first_timestamp.value == NOW - RESUME_TIMESTAMP_MARGIN
+        (query,) = peer.of_type(QueryChannelRangeMessage)
+        assert query.first_block_num.value == 900 - RESUME_BLOCK_MARGIN
+        # Three chunks from the mark on, where the full sync queries ten
+        assert list(sync.pending_chunks) == [(856, 100), (956, 44)]
+
+        # A new peer is filtered from the chain's newest timestamp
+        other = FakePeer(b"\x03" * 33)
+        await sync.add_peer(other, CHAIN_HASH)
+        assert other.of_type(GossipTimestampFilterMessage)[0].first_timestamp.value == (
+            NOW - RESUME_TIMESTAMP_MARGIN
+        )
+
+    asyncio.run(first_run())
+    asyncio.run(second_run())
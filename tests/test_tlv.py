@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from app.corpus import BITCOIN_CHAIN_HASH, init_message
+from app.message_decoder import MessageDecoder
+from app.message_elements import (
+    ReplyChannelRangeTlvsElement,
+    TlvStreamElement,
+    bigsize,
+    read_bigsize,
+)
+from app.messages import MessageProperty, QueryChannelRangeMessage, ReplyChannelRangeMessage
+
+
+def test_bigsize_round_trip_and_minimal_encoding():
+    for value in (0, 0xFC, 0xFD, 0xFFFF, 1 << 16, (1 << 32) - 1, 1 << 32, (1 << 64) - 1):
+        encoded = bigsize(value)
+        assert read_bigsize(memoryview(encoded), 0) == (value, len(encoded))
+    for encoded in (b"\xfd\x00\xfc", b"\xfe\x00\x00\xff\xff", b"\xff" + bytes(4) + b"\xff" * 4):
+        with pytest.raises(ValueError):
+            read_bigsize(memoryview(encoded), 0)
+    with pytest.raises(ValueError):
+        read_bigsize(memoryview(b"\xfd\x01"), 0)
+
+
+def test_records_are_indexed_on_first_lookup():
+    timestamps = bytes(4000)
+    stream = ReplyChannelRangeTlvsElement.create({1: timestamps, 7: b"odd", 3: b"sums"})
+    frame = (
+        ReplyChannelRangeMessage.create(BITCOIN_CHAIN_HASH, 0, 10, True, [1 << 40]).to_bytes()
+        + stream.to_bytes()
+    )
+    message = MessageDecoder.from_bytes(frame)
+    tlvs = message.tlv_stream
+    assert tlvs._index is None
+    assert tlvs.get(3) == b"sums"
+    assert tlvs.types() == [1, 3, 7]
+    assert tlvs.get(1) == timestamps
+    assert tlvs.get(5) is None
+    assert tlvs.unknown_even() == []
+    assert message.to_bytes() == frame
+
+    lazy = MessageDecoder.from_bytes(frame, lazy=True)
+    assert lazy.first_block_num.value == 0
+    assert MessageProperty.TLV_STREAM not in lazy.properties._decoded
+    assert lazy.to_bytes() is lazy.properties.data
+
+
+def test_replace_keeps_other_records_verbatim():
+    stream = TlvStreamElement.create({1: b"a", 9: b"unknown"})
+    assert (
+        stream.replace(3, b"b").data
+        == TlvStreamElement.create({1: b"a", 3: b"b", 9: b"unknown"}).data
+    )
+    assert stream.replace(1, None).types() == [9]
+    assert TlvStreamElement.create({2: b""}).unknown_even() == [2]
+
+
+def test_malformed_streams_fail_only_when_read():
+    frame = QueryChannelRangeMessage.create(BITCOIN_CHAIN_HASH, 0, 10).to_bytes()
+    for tlvs in (b"\x03\x00\x01\x00", b"\x01\x05ab"):
+        message = MessageDecoder.from_bytes(frame + tlvs)
+        assert message.to_bytes() == frame + tlvs
+        with pytest.raises(ValueError):
+            message.tlv_stream.types()
+
+
+def test_init_networks():
+    frame = init_message(2) + TlvStreamElement.create({1: BITCOIN_CHAIN_HASH * 2}).to_bytes()
+    message = MessageDecoder.from_bytes(frame)
+    assert message.networks == [BITCOIN_CHAIN_HASH, BITCOIN_CHAIN_HASH]
+    assert MessageDecoder.from_bytes(init_message(2)).networks is None
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from pyln.proto.primitives import PrivateKey
+from pyln.proto.wire import connect
+
+from app.messages import PingMessage
+from app.peer import PeerConnection
+from app.transport import AsyncLightningConnection
+
+
+async def echo_server(private_key: PrivateKey, num_messages: int):
+    async def handle(reader, writer):
+        conn = await AsyncLightningConnection.accept(reader, writer, private_key)
+        for _ in range(num_messages):
+            await conn.send_message(await conn.read_message())
+        await conn.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_async_handshake_and_echo():
+    async def run():
+        server_key, client_key = PrivateKey(os.urandom(32)), PrivateKey(os.urandom(32))
+        # More than 500 round trips, so both directions rotate keys
+        server, port = await echo_server(server_key, 1100)
+        conn = await AsyncLightningConnection.connect(
+            client_key, server_key.public_key(), "127.0.0.1", port
+        )
+        assert conn.remote_pubkey == server_key.public_key()
+        for i in range(1100):
+            message = i.to_bytes(4, "big") * (i % 50)
+            await conn.send_message(message)
+            assert await conn.read_message() == message
+        await conn.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_interoperates_with_blocking_pyln_connection():
+    async def run():
+        server_key, client_key = PrivateKey(os.urandom(32)), PrivateKey(os.urandom(32))
+        server, port = await echo_server(server_key, 3)
+
+        def blocking_client():
+            lc = connect(client_key, server_key.public_key(), "127.0.0.1", port)
+            replies = []
+            for message in [b"\x00\x12", b"hello", bytes(65535)]:
+                lc.send_message(message)
+                replies.append(lc.read_message())
+            return replies
+
+        replies = await asyncio.to_thread(blocking_client)
+        assert replies == [b"\x00\x12", b"hello", bytes(65535)]
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_burst_is_sent_in_one_write():
+    async def run():
+        server_key, client_key = PrivateKey(os.urandom(32)), PrivateKey(os.urandom(32))
+        # One burst longer than the 1000 message key rotation interval
+        server, port = await echo_server(server_key, 1200)
+        conn = await AsyncLightningConnection.connect(
+            client_key, server_key.public_key(), "127.0.0.1", port
+        )
+        messages = [i.to_bytes(4, "big") * (i % 20) for i in range(1200)]
+        writes = []
+        writelines = conn.writer.writelines
+        conn.writer.writelines = lambda chunks: writes.append(chunks) or writelines(chunks)
+        await conn.send_messages(messages)
+        assert len(writes) == 1
+        assert [await conn.read_message() for _ in messages] == messages
+        await conn.close()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_peer_coalesces_queued_messages():
+    class RecordingConnection:
+        def __init__(self):
+            self.writes = []
+
+        async def send_messages(self, frames):
+            self.writes.append(list(frames))
+
+    async def run():
+        node_id = PrivateKey(os.urandom(32)).public_key().to_bytes().hex()
+        peer = PeerConnection(f"{node_id}@127.0.0.1:9735", PrivateKey(os.urandom(32)))
+        peer.lc = RecordingConnection()  # pyright: ignore
+        pings = [PingMessage.create(i, b"\xaa") for i in range(5)]
+        for ping in pings:
+            await peer.send(ping)
+        task = asyncio.create_task(peer.send_messages())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        assert peer.lc.writes == [[ping.to_bytes() for ping in pings]]
+
+    asyncio.run(run())
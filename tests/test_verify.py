@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from pyln.proto.primitives import PrivateKey
+
+from app.corpus import sign, signed_channel, synthetic_channel_update
+from app.graph import NetworkGraph
+from app.message_decoder import MessageDecoder
+from app.verify import GossipVerifier, verify_frame
+
+SCID = 600_000 << 40
+
+
+def tamper(frame: bytes) -> bytes:
+    return frame[:-1] + bytes([frame[-1] ^ 1])
+
+
+def test_verify_frame():
+    keys = [os.urandom(32) for _ in range(4)]
+    node_1, node_2 = (PrivateKey(key).public_key().to_bytes() for key in keys[:2])
+    announcement, update_1, update_2 = signed_channel(SCID, keys, 1_700_000_000)
+
+    assert verify_frame(announcement)
+    assert not verify_frame(tamper(announcement))
+    assert verify_frame(update_1, node_1)
+    assert verify_frame(update_2, node_2)
+    assert not verify_frame(update_2, node_1)
+    assert not verify_frame(tamper(update_1), node_1)
+    assert not verify_frame(update_1[:40], node_1)
+
+    node_announcement = (
+        (257).to_bytes(2, "big")
+        + bytes(64)
+        + (0).to_bytes(2, "big")
+        + (1_700_000_000).to_bytes(4, "big")
+        + node_1
+        + bytes(3 + 32)
+        + (0).to_bytes(2, "big")
+    )
+    assert verify_frame(sign(node_announcement, keys[:1], 2 + 64))
+    assert not verify_frame(sign(node_announcement, keys[1:2], 2 + 64))
+
+
+def test_only_verified_gossip_is_delivered():
+    async def run():
+        keys = [os.urandom(32) for _ in range(4)]
+        announcement, update_1, update_2 = signed_channel(SCID, keys, 1_700_000_000)
+        forged = signed_channel(SCID + 1, [os.urandom(32) for _ in range(4)], 1_700_000_000)[0]
+        forged = forged[:2] + bytes(64) + forged[66:]
+        frames = [
+            announcement,
+            update_1,
+            tamper(update_2),
+            forged,
+            synthetic_channel_update(SCID + 2, 0, 1_700_000_000),
+        ]
+
+        graph = NetworkGraph()
+        verifier = GossipVerifier(graph.nodes_of, ProcessPoolExecutor(1), batch_size=2)
+        for frame in frames:
+            await verifier.submit(MessageDecoder.from_bytes(frame, lazy=True), frame, graph.ingest)
+        await verifier.drain()
+        verifier.close()
+
+        assert (verifier.verified, verifier.rejected, verifier.unknown_channel) == (2, 2, 1)
+        assert len(graph) == 1 and graph.has_channel(SCID)
+        assert graph.direction(SCID, 0) is not None
+        assert graph.direction(SCID, 1) is None
+        assert verifier.pending_channels == {}
+
+    asyncio.run(run())
+
+
+def test_forged_announcement_can_not_sign_for_a_known_channel():
+    async def run():
+        keys = [os.urandom(32) for _ in range(4)]
+        announcement, update_1, _ = signed_channel(SCID, keys, 1_700_000_000)
+        # The attacker announces the same scid with their own keys and signs an update with them
+        attacker_keys = [os.urandom(32) for _ in range(4)]
+        forged, forged_update, _ = signed_channel(SCID, attacker_keys, 1_700_000_100)
+
+        graph = NetworkGraph()
+        graph.ingest(MessageDecoder.from_bytes(announcement, lazy=True))
+        graph.ingest(MessageDecoder.from_bytes(update_1, lazy=True))
+        verifier = GossipVerifier(graph.nodes_of, ProcessPoolExecutor(1), batch_size=1)
+        for frame in (forged, forged_update):
+            await verifier.submit(MessageDecoder.from_bytes(frame, lazy=True), frame, graph.ingest)
+        await verifier.drain()
+
+        assert graph.nodes_of(SCID) == (
+            PrivateKey(keys[0]).public_key().to_bytes(),
+            PrivateKey(keys[1]).public_key().to_bytes(),
+        )
+        assert graph.direction(SCID, 0).timestamp == 1_700_000_000
+        assert verifier.pending_channels == {}
+
+        # Updates checked against a pending announcement are dropped when it was rejected
+        other = SCID + (1 << 40)
+        announcement, update_1, _ = signed_channel(other, attacker_keys, 1_700_000_000)
+        announcement = tamper(announcement)
+        for frame in (announcement, update_1):
+            await verifier.submit(MessageDecoder.from_bytes(frame, lazy=True), frame, graph.ingest)
+        await verifier.drain()
+        verifier.close()
+        assert not graph.has_channel(other)
+        assert graph.direction(other, 0) is None
+
+    asyncio.run(run())